@@ -0,0 +1,13 @@
+"""
+ASGI entry point, serving the app with any ASGI server, e.g.:
+
+    uvicorn asgi:app
+"""
+from gudlft.asgi import AsyncApp
+from server import app as flask_app
+
+
+app = AsyncApp(
+    flask_app,
+    read_workers=flask_app.config['ASGI_READ_WORKERS'],
+    write_workers=flask_app.config['ASGI_WRITE_WORKERS'])
@@ -0,0 +1 @@
+"""Benchmarks for the GUDLFT registration server."""
@@ -0,0 +1,170 @@
+"""
+Load test comparing the WSGI and ASGI serving modes under concurrent connections.
+
+Concurrent connections send a mix of page requests (index, showSummary, book) and bookings
+(purchasePlaces) to the app imported in a fresh interpreter, on a generated dataset persisted
+in snapshot mode.
+
+- In wsgi mode every request runs on one pool of threads, like a threaded WSGI server.
+- In asgi mode requests go through the ASGI adapter of asgi.py, which serves bookings and pages
+  from separate pools of the same total size.
+
+Throughput and the latency of page requests, which should not wait behind bookings, are reported
+for each mode.
+
+Usage:
+    python -m benchmarks.bench_asgi --connections 64 --requests 3000 --booking-ratio 0.2
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from urllib.parse import quote, urlencode
+
+from benchmarks.bench_routes import summarize
+from benchmarks.generate_data import write_dataset
+
+
+MODES = ('wsgi', 'asgi')
+
+
+def make_requests(registry, count, booking_ratio, seed=1):
+    """Return `count` (method, path, form) requests, bookings making up `booking_ratio` of them."""
+    rng = random.Random(seed)
+    clubs = registry.clubs
+    now = datetime.now()
+    upcoming = [comp for comp in registry.competitions if comp.starts_at >= now]
+    requests = []
+    for _ in range(count):
+        club = rng.choice(clubs)
+        competition = rng.choice(upcoming)
+        if rng.random() < booking_ratio:
+            requests.append(('POST', '/purchasePlaces', {'club': club.name, 'competition': competition.name, 'places': 1}))
+        else:
+            requests.append(rng.choice([
+                ('GET', '/', None),
+                ('POST', '/showSummary', {'email': club.email}),
+                ('GET', f'/book/{quote(competition.name)}/{quote(club.name)}', None)
+            ]))
+    return requests
+
+
+def make_scope(method, path, body):
+    """Build the ASGI scope of a request."""
+    return {
+        'type': 'http', 'method': method, 'path': path, 'query_string': b'', 'http_version': '1.1', 'scheme': 'http',
+        'headers': [(b'host', b'localhost'), (b'content-type', b'application/x-www-form-urlencoded'),
+                    (b'content-length', str(len(body)).encode())],
+        'server': ('localhost', 80), 'client': ('127.0.0.1', 50000)
+    }
+
+
+def run_worker(mode, connections, count, booking_ratio, threads, write_threads):
+    """Import the server, run the load test in the given mode and print the results as JSON."""
+    import server
+    from gudlft.asgi import AsyncApp, build_environ, call_wsgi
+
+    requests = make_requests(server.app.extensions['gudlft'].registry, count, booking_ratio)
+    if mode == 'asgi':
+        asgi_app = AsyncApp(server.app, read_workers=threads - write_threads, write_workers=write_threads)
+    else:
+        pool = ThreadPoolExecutor(max_workers=threads)
+
+    async def send_request(method, path, form):
+        body = urlencode(form).encode() if form else b''
+        scope = make_scope(method, path, body)
+        if mode == 'wsgi':
+            loop = asyncio.get_running_loop()
+            status, _, _ = await loop.run_in_executor(pool, call_wsgi, server.app, build_environ(scope, body))
+            return status
+        messages = []
+
+        async def receive():
+            return {'type': 'http.request', 'body': body, 'more_body': False}
+
+        async def send(message):
+            messages.append(message)
+        await asgi_app(scope, receive, send)
+        return messages[0]['status']
+
+    timings = {'page': [], 'booking': []}
+
+    async def connection(queue):
+        while queue:
+            method, path, form = queue.pop()
+            started = time.perf_counter()
+            status = await send_request(method, path, form)
+            timings['booking' if path == '/purchasePlaces' else 'page'].append(time.perf_counter() - started)
+            if status not in (200, 400):
+                raise RuntimeError(f'{path} answered {status}')
+
+    async def main():
+        queue = list(reversed(requests))
+        started = time.perf_counter()
+        await asyncio.gather(*(connection(queue) for _ in range(connections)))
+        return time.perf_counter() - started
+
+    elapsed = asyncio.run(main())
+    print(json.dumps({
+        'throughput_rps': count / elapsed,
+        'page': summarize(timings['page']),
+        'booking': summarize(timings['booking']) if timings['booking'] else None
+    }))
+
+
+def run_mode(args, mode):
+    """Benchmark a serving mode in a fresh interpreter, on a fresh copy of the dataset."""
+    with tempfile.TemporaryDirectory() as directory:
+        clubs_path, competitions_path = write_dataset(directory, args.clubs, args.competitions)
+        env = dict(
+            os.environ,
+            GUDLFT_PERSISTENCE_MODE='snapshot',
+            GUDLFT_CLUBS_DATA_PATH=clubs_path,
+            GUDLFT_COMPETITIONS_DATA_PATH=competitions_path,
+            # Every request comes from one client, which the rate limiter would throttle
+            GUDLFT_RATE_LIMIT_PER_SECOND='0')
+        env.pop('FLASK_ENV', None)
+        output = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.bench_asgi', '--worker', mode,
+             '--connections', str(args.connections), '--requests', str(args.requests),
+             '--booking-ratio', str(args.booking_ratio), '--threads', str(args.threads),
+             '--write-threads', str(args.write_threads)],
+            env=env, check=True, stdout=subprocess.PIPE, universal_newlines=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--connections', type=int, default=64, help='concurrent connections')
+    parser.add_argument('--requests', type=int, default=3000, help='requests per mode')
+    parser.add_argument('--booking-ratio', type=float, default=0.2, help='share of the requests that are bookings')
+    parser.add_argument('--threads', type=int, default=16, help='threads serving requests, in total')
+    parser.add_argument('--write-threads', type=int, default=4, help='threads serving bookings in asgi mode')
+    parser.add_argument('--clubs', type=int, default=5000, help='number of clubs in the dataset')
+    parser.add_argument('--competitions', type=int, default=500, help='number of competitions in the dataset')
+    parser.add_argument('--worker', choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.worker, args.connections, args.requests, args.booking_ratio, args.threads, args.write_threads)
+        return
+
+    print(f'{args.requests} requests over {args.connections} connections, {args.booking_ratio:.0%} bookings, '
+          f'{args.threads} threads')
+    print(f"{'mode':<6}{'req/s':>10}{'page p50 ms':>14}{'page p99 ms':>14}{'booking p50 ms':>17}{'booking p99 ms':>17}")
+    for mode in MODES:
+        result = run_mode(args, mode)
+        page, booking = result['page'], result['booking'] or {'p50_ms': 0, 'p99_ms': 0}
+        print(f"{mode:<6}{result['throughput_rps']:>10.0f}{page['p50_ms']:>14.1f}{page['p99_ms']:>14.1f}"
+              f"{booking['p50_ms']:>17.1f}{booking['p99_ms']:>17.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+"""
+Measure worker cold starts with and without precompiled templates.
+
+Each restart runs a fresh interpreter importing server.py, then times the load of the clubs and
+competitions, which creating the app leaves to the first request, and the first and the hundredth
+request of the index, showSummary and book pages. Workers are started:
+
+- in debug mode (FLASK_ENV=development), where templates are compiled on first use and reloaded
+  when they change;
+- in production mode, where templates are compiled at startup through a bytecode cache on disk,
+  empty before the first restart and reused by the following ones.
+
+With --startup-budget, the command fails when importing server.py takes longer than the budget in
+production mode.
+
+Usage:
+    python -m benchmarks.bench_cold_start --restarts 5 --clubs 100 --startup-budget 250
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from urllib.parse import quote
+
+from benchmarks.generate_data import write_dataset
+
+
+MODES = ('debug', 'production')
+
+
+def run_worker(requests):
+    """Import the server, time its first requests and print the results as JSON."""
+    started = time.perf_counter()
+    import server
+    startup = time.perf_counter() - started
+
+    started = time.perf_counter()
+    state = server.app.extensions['gudlft']
+    state.load()
+    load = time.perf_counter() - started
+
+    client = server.app.test_client()
+    club = state.registry.clubs[0]
+    now = datetime.now()
+    competition = next(comp for comp in state.registry.competitions if comp.starts_at >= now)
+    pages = {
+        'index': lambda: client.get('/'),
+        'showSummary': lambda: client.post('/showSummary', data={'email': club.email}),
+        'book': lambda: client.get(f'/book/{quote(competition.name)}/{quote(club.name)}')
+    }
+
+    def timed(call):
+        started = time.perf_counter()
+        call()
+        return time.perf_counter() - started
+
+    first = {name: timed(call) for name, call in pages.items()}
+    for _ in range(requests - 2):
+        for call in pages.values():
+            call()
+    last = {name: timed(call) for name, call in pages.items()}
+    print(json.dumps({'startup': startup, 'load': load, 'first': first, 'last': last}))
+
+
+def run_restart(mode, directory, clubs_path, competitions_path, requests):
+    """Start one worker in the given mode and return its timings."""
+    env = dict(
+        os.environ,
+        GUDLFT_CLUBS_DATA_PATH=clubs_path,
+        GUDLFT_COMPETITIONS_DATA_PATH=competitions_path,
+        GUDLFT_TEMPLATE_CACHE_DIR=os.path.join(directory, 'jinja'),
+        # Every request comes from one client, which the rate limiter would throttle
+        GUDLFT_RATE_LIMIT_PER_SECOND='0')
+    env.pop('FLASK_DEBUG', None)
+    if mode == 'debug':
+        env['FLASK_ENV'] = 'development'
+    else:
+        env.pop('FLASK_ENV', None)
+    output = subprocess.run(
+        [sys.executable, '-m', 'benchmarks.bench_cold_start', '--worker', '--requests', str(requests)],
+        env=env, check=True, stdout=subprocess.PIPE, universal_newlines=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--restarts', type=int, default=5, help='worker starts per mode')
+    parser.add_argument('--requests', type=int, default=100, help='requests per page and worker')
+    parser.add_argument('--clubs', type=int, default=100, help='number of clubs in the dataset')
+    parser.add_argument('--competitions', type=int, default=50, help='number of competitions in the dataset')
+    parser.add_argument('--startup-budget', type=float, help='fail when a production import takes longer, in ms')
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.requests)
+        return
+
+    print(f"{'mode':<12}{'restart':>8}{'startup ms':>12}{'load ms':>10}" + ''.join(
+        f'{name + " 1st/" + str(args.requests) + "th ms":>26}' for name in ('index', 'showSummary', 'book')))
+    slowest = 0
+    for mode in MODES:
+        with tempfile.TemporaryDirectory() as directory:
+            clubs_path, competitions_path = write_dataset(directory, args.clubs, args.competitions)
+            for restart in range(1, args.restarts + 1):
+                result = run_restart(mode, directory, clubs_path, competitions_path, args.requests)
+                print(f"{mode:<12}{restart:>8}{result['startup'] * 1000:>12.1f}{result['load'] * 1000:>10.1f}" + ''.join(
+                    f"{result['first'][name] * 1000:>17.2f} / {result['last'][name] * 1000:>6.2f}"
+                    for name in ('index', 'showSummary', 'book')))
+                if mode == 'production':
+                    slowest = max(slowest, result['startup'] * 1000)
+
+    if args.startup_budget is not None and slowest > args.startup_budget:
+        print(f'Startup over budget: {slowest:.1f} ms > {args.startup_budget:.1f} ms')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""
+Measure the bytes saved by response compression and its CPU cost, per page size.
+
+Every dataset size is served by a fresh interpreter importing server.py. The points board and a
+club summary page are rendered uncompressed, then compressed with every available encoding and
+level; the compressed size and the time taken per page are reported.
+
+Usage:
+    python -m benchmarks.bench_compression --sizes 10 1000 10000 --levels 1 6 9
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.generate_data import write_dataset
+
+
+def run_worker(levels, repeat):
+    """Render the pages of the dataset given by the environment, compress them and print the results as JSON."""
+    import server
+    from gudlft.compression import ResponseCompressor
+
+    client = server.app.test_client()
+    pages = {
+        'index': client.get('/').data,
+        'showSummary': client.post('/showSummary', data={'email': server.app.extensions['gudlft'].registry.clubs[0].email}).data
+    }
+    encoders = ResponseCompressor().encoders
+    results = []
+    for page, data in pages.items():
+        for encoding, encode in encoders.items():
+            for level in levels:
+                started = time.perf_counter()
+                for _ in range(repeat):
+                    compressed = encode(data, level)
+                elapsed = (time.perf_counter() - started) / repeat
+                results.append({
+                    'page': page, 'encoding': encoding, 'level': level,
+                    'raw_bytes': len(data), 'compressed_bytes': len(compressed), 'ms': elapsed * 1000
+                })
+    print(json.dumps(results))
+
+
+def run_size(size, competitions, levels, repeat):
+    """Benchmark one dataset size in a fresh interpreter and return its results."""
+    with tempfile.TemporaryDirectory() as directory:
+        clubs_path, competitions_path = write_dataset(directory, size, competitions)
+        env = dict(os.environ, GUDLFT_CLUBS_DATA_PATH=clubs_path, GUDLFT_COMPETITIONS_DATA_PATH=competitions_path)
+        env.pop('FLASK_ENV', None)
+        output = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.bench_compression', '--worker', '--repeat', str(repeat),
+             '--levels'] + [str(level) for level in levels],
+            env=env, check=True, stdout=subprocess.PIPE, universal_newlines=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', nargs='+', type=int, default=[10, 1000, 10000], help='numbers of clubs')
+    parser.add_argument('--competitions', type=int, default=200, help='number of competitions in the dataset')
+    parser.add_argument('--levels', nargs='+', type=int, default=[1, 6, 9], help='compression levels')
+    parser.add_argument('--repeat', type=int, default=20, help='compressions timed per page and level')
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.levels, args.repeat)
+        return
+
+    print(f"{'clubs':>8}  {'page':<12}{'encoding':<10}{'level':>6}{'raw KB':>10}{'sent KB':>10}{'saved':>8}{'ms/page':>10}")
+    for size in args.sizes:
+        for result in run_size(size, args.competitions, args.levels, args.repeat):
+            saved = 1 - result['compressed_bytes'] / result['raw_bytes']
+            print(f"{size:>8}  {result['page']:<12}{result['encoding']:<10}{result['level']:>6}"
+                  f"{result['raw_bytes'] / 1024:>10.1f}{result['compressed_bytes'] / 1024:>10.1f}"
+                  f"{saved:>8.0%}{result['ms']:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""
+Measure booking throughput against the group commit window.
+
+Concurrent threads book one place at a time through the booking engine and persist every booking
+before the next one, as purchasePlaces does. Each persistence mode is run without group commit,
+then with every window size given, on a fresh copy of a generated dataset.
+
+Usage:
+    python -m benchmarks.bench_group_commit --windows 0 0.001 0.005 0.02 --threads 32
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from benchmarks.generate_data import write_dataset
+from gudlft.booking import BookingEngine
+from gudlft.group_commit import GroupCommitter
+from gudlft.registry import Registry
+from gudlft.storage import create_storage
+
+
+def run(mode, window, threads, bookings, clubs, competitions):
+    """
+    Book on a fresh dataset and return the throughput and the number of writes.
+
+    A window of None disables group commit.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        clubs_path, competitions_path = write_dataset(directory, clubs, competitions)
+        config = {
+            'PERSISTENCE_MODE': mode,
+            'CLUBS_DATA_PATH': clubs_path,
+            'COMPETITIONS_DATA_PATH': competitions_path,
+            'JOURNAL_PATH': os.path.join(directory, 'bookings.journal'),
+            'JOURNAL_COMPACT_BYTES': 1024 * 1024,
+            'JOURNAL_COMPACT_SECONDS': 300
+        }
+        storage = create_storage(config)
+        registry = Registry(*storage.load())
+        engine = BookingEngine(registry, storage)
+
+        # Count the writes made by the storage
+        writes = []
+        write_bookings = storage.write_bookings
+
+        def counting_write(registry, batch):
+            writes.append(len(batch))
+            write_bookings(registry, batch)
+        storage.write_bookings = counting_write
+        storage.group_commit = GroupCommitter(counting_write, window) if window is not None else None
+
+        now = datetime.now()
+        upcoming = [comp for comp in registry.competitions if comp.starts_at >= now]
+        counter = iter(range(bookings))
+        lock = threading.Lock()
+
+        def worker():
+            while True:
+                with lock:
+                    i = next(counter, None)
+                if i is None:
+                    return
+                club = registry.clubs[i % len(registry.clubs)]
+                competition = upcoming[i % len(upcoming)]
+                engine.book(club, competition, 1)
+                storage.persist_bookings(registry, [(club, competition, 1)])
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            for future in [executor.submit(worker) for _ in range(threads)]:
+                future.result()
+        elapsed = time.perf_counter() - started
+        storage.close()
+        return bookings / elapsed, len(writes)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--modes', nargs='+', default=['snapshot', 'journal'], help='persistence modes to run')
+    parser.add_argument('--windows', nargs='+', type=float, default=[0, 0.001, 0.005, 0.02],
+                        help='group commit windows, in seconds')
+    parser.add_argument('--threads', type=int, default=32, help='concurrent booking threads')
+    parser.add_argument('--bookings', type=int, default=2000, help='bookings per run')
+    parser.add_argument('--clubs', type=int, default=1000, help='number of clubs in the dataset')
+    parser.add_argument('--competitions', type=int, default=100, help='number of competitions in the dataset')
+    args = parser.parse_args()
+
+    print(f'{args.bookings} bookings from {args.threads} threads, {args.clubs} clubs, {args.competitions} competitions')
+    print(f"{'mode':<10}{'window ms':>12}{'bookings/s':>14}{'writes':>10}{'per write':>12}")
+    for mode in args.modes:
+        for window in [None] + args.windows:
+            throughput, writes = run(mode, window, args.threads, args.bookings, args.clubs, args.competitions)
+            label = 'off' if window is None else f'{window * 1000:g}'
+            print(f'{mode:<10}{label:>12}{throughput:>14.0f}{writes:>10}{args.bookings / writes:>12.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""
+Compare loading the data files with json.load and with the streaming loader.
+
+Each loader builds a registry from generated clubs and competitions files in a fresh interpreter,
+once to time it and once under tracemalloc to measure the peak memory allocated by Python while
+loading, which tracing would otherwise slow down.
+
+Usage:
+    python -m benchmarks.bench_loader --clubs 1000000 --competitions 100000
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.generate_data import write_dataset
+
+
+LOADERS = ('json', 'streaming')
+
+
+def run_worker(loader, measure, clubs_path, competitions_path):
+    """Build a registry with the given loader and print the load time or peak memory as JSON."""
+    from gudlft.loader import iter_records
+    from gudlft.registry import Registry
+
+    if measure == 'memory':
+        tracemalloc.start()
+    started = time.perf_counter()
+    if loader == 'json':
+        with open(clubs_path) as c:
+            clubs = json.load(c)['clubs']
+        with open(competitions_path) as c:
+            competitions = json.load(c)['competitions']
+    else:
+        clubs = iter_records(clubs_path, 'clubs')
+        competitions = iter_records(competitions_path, 'competitions')
+    registry = Registry(clubs, competitions)
+    elapsed = time.perf_counter() - started
+
+    if measure == 'memory':
+        current, peak = tracemalloc.get_traced_memory()
+        print(json.dumps({'retained_mb': current / (1024 * 1024), 'peak_mb': peak / (1024 * 1024)}))
+    else:
+        print(json.dumps({'records': len(registry.clubs) + len(registry.competitions), 'load_s': elapsed}))
+
+
+def measure(loader, what, paths):
+    """Run a worker measuring `what` ('time' or 'memory') for a loader and return its results."""
+    output = subprocess.run(
+        [sys.executable, '-m', 'benchmarks.bench_loader', '--worker', loader, what, *paths],
+        check=True, capture_output=True, text=True).stdout
+    return json.loads(output)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clubs', type=int, default=200000, help='number of clubs')
+    parser.add_argument('--competitions', type=int, default=20000, help='number of competitions')
+    parser.add_argument('--worker', nargs=4, metavar=('LOADER', 'MEASURE', 'CLUBS', 'COMPETITIONS'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(*args.worker)
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        paths = write_dataset(directory, args.clubs, args.competitions)
+        size_mb = sum(os.path.getsize(path) for path in paths) / (1024 * 1024)
+        print(f'{args.clubs} clubs, {args.competitions} competitions, {size_mb:.1f} MB of JSON')
+        print(f"{'loader':<12}{'load s':>10}{'peak MB':>10}{'retained MB':>14}")
+        for loader in LOADERS:
+            timing = measure(loader, 'time', paths)
+            memory = measure(loader, 'memory', paths)
+            print(f"{loader:<12}{timing['load_s']:>10.2f}{memory['peak_mb']:>10.0f}{memory['retained_mb']:>14.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""
+Measure the cost of successful and failed logins on /showSummary as the number of clubs grows.
+
+Each size runs in a fresh interpreter importing server.py, with rate limiting disabled. Logins
+with the email of a club, with an unknown email, and with a new unknown email on every request
+are timed, so a failed login can be compared with a successful one at every size:
+
+- valid: the email of a club, with its case changed;
+- repeated miss: the same unknown email, as a client retrying it would send;
+- new miss: a different unknown email on every request.
+
+Usage:
+    python -m benchmarks.bench_login --sizes 10 1000 10000 --requests 500
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.generate_data import write_dataset
+
+
+def run_worker(requests):
+    """Time the logins against the dataset given by the environment and print the results as JSON."""
+    import server
+
+    client = server.app.test_client()
+    email = server.app.extensions['gudlft'].registry.clubs[0].email.upper()
+    kinds = {
+        'valid': lambda i: email,
+        'repeated_miss': lambda i: 'nobody@example.com',
+        'new_miss': lambda i: f'nobody{i}@example.com'
+    }
+    results = {}
+    for kind, make_email in kinds.items():
+        latencies = []
+        for i in range(requests):
+            started = time.perf_counter()
+            client.post('/showSummary', data={'email': make_email(i)})
+            latencies.append(time.perf_counter() - started)
+        results[kind] = statistics.median(latencies)
+    print(json.dumps(results))
+
+
+def run_size(args, clubs):
+    """Benchmark one number of clubs in a fresh interpreter, on a fresh dataset."""
+    with tempfile.TemporaryDirectory() as directory:
+        clubs_path, competitions_path = write_dataset(directory, clubs, args.competitions)
+        env = dict(
+            os.environ,
+            GUDLFT_PERSISTENCE_MODE='snapshot',
+            GUDLFT_CLUBS_DATA_PATH=clubs_path,
+            GUDLFT_COMPETITIONS_DATA_PATH=competitions_path,
+            GUDLFT_RATE_LIMIT_PER_SECOND='0')
+        env.pop('FLASK_ENV', None)
+        output = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.bench_login', '--worker', '--requests', str(args.requests)],
+            env=env, check=True, stdout=subprocess.PIPE, universal_newlines=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 1000, 10000], help='numbers of clubs to benchmark')
+    parser.add_argument('--requests', type=int, default=500, help='logins of each kind per size')
+    parser.add_argument('--competitions', type=int, default=40, help='number of competitions in the dataset')
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.requests)
+        return
+
+    print(f"{'clubs':>8}{'valid ms':>12}{'repeated miss ms':>18}{'new miss ms':>13}")
+    for clubs in args.sizes:
+        result = run_size(args, clubs)
+        print(f"{clubs:>8}{result['valid'] * 1000:>12.2f}{result['repeated_miss'] * 1000:>18.2f}"
+              f"{result['new_miss'] * 1000:>13.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""
+Compare the memory held by clubs and competitions stored as dictionaries and as typed records.
+
+Generated clubs and competitions are decoded from JSON, as when the data files are loaded, and
+kept either as the decoded dictionaries or as `Club` and `Competition` records. The memory
+retained by each representation is measured with tracemalloc.
+
+Usage:
+    python -m benchmarks.bench_records --clubs 1000000 --competitions 100000
+"""
+import argparse
+import json
+import tracemalloc
+
+from benchmarks.generate_data import generate_clubs, generate_competitions
+from gudlft.records import Club, Competition, parse_date
+
+
+def measure(build):
+    """Return the memory, in bytes, retained by the objects `build` returns."""
+    tracemalloc.start()
+    try:
+        objects = build()
+        current, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del objects
+    return current
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clubs', type=int, default=200000, help='number of clubs')
+    parser.add_argument('--competitions', type=int, default=20000, help='number of competitions')
+    args = parser.parse_args()
+
+    clubs_json = json.dumps(generate_clubs(args.clubs))
+    competitions_json = json.dumps(generate_competitions(args.competitions))
+
+    def dictionaries():
+        # The previous representation also kept the parsed date of every competition in a separate index
+        competitions = json.loads(competitions_json)
+        dates = {comp['name']: parse_date(comp['date']) for comp in competitions}
+        return json.loads(clubs_json), competitions, dates
+
+    def records():
+        return ([Club.from_dict(club) for club in json.loads(clubs_json)],
+                [Competition.from_dict(comp) for comp in json.loads(competitions_json)])
+
+    results = {'dictionaries': measure(dictionaries), 'records': measure(records)}
+    count = args.clubs + args.competitions
+    print(f'{args.clubs} clubs, {args.competitions} competitions')
+    print(f"{'representation':<16}{'MB':>10}{'bytes/record':>14}")
+    for name, size in results.items():
+        print(f'{name:<16}{size / (1024 * 1024):>10.1f}{size / count:>14.0f}')
+    print(f"records use {1 - results['records'] / results['dictionaries']:.0%} less memory")
+
+
+if __name__ == '__main__':
+    main()
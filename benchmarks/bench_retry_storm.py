@@ -0,0 +1,147 @@
+"""
+Measure how a retry storm from one club affects the other clubs, with and without rate limiting.
+
+Each mode runs in a fresh interpreter importing server.py. Storm threads post bookings of a single
+club from a single address at a fixed rate, as a misbehaving integration retrying in a loop would,
+while client threads, each a different club and address, load their summary page and book a place
+now and then. The latency of the clients' requests and the share of storm requests refused are
+reported:
+
+- unlimited: rate limiting disabled, every storm request is served;
+- limited: the default limits, storm requests over their rate are refused with 429.
+
+Usage:
+    python -m benchmarks.bench_retry_storm --storm-rate 500 --clients 8 --duration 10
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+from benchmarks.generate_data import write_dataset
+
+
+MODES = {'unlimited': '0', 'limited': None}
+
+
+def run_worker(storm_threads, storm_rate, clients, duration):
+    """Run the storm and the clients against the dataset given by the environment and print the results as JSON."""
+    import server
+
+    registry = server.app.extensions['gudlft'].registry
+    clubs = registry.clubs
+    now = datetime.now()
+    upcoming = [comp for comp in registry.competitions if comp.starts_at >= now]
+    stop = threading.Event()
+    storm_statuses = []
+    latencies = []
+    client_statuses = []
+
+    def book(client, club, index):
+        competition = upcoming[index % len(upcoming)]
+        return client.post('/purchasePlaces', data={'club': club.name, 'competition': competition.name, 'places': 1})
+
+    def storm():
+        client = server.app.test_client()
+        client.environ_base['REMOTE_ADDR'] = '10.0.0.1'
+        interval = storm_threads / storm_rate
+        next_request = time.perf_counter()
+        index = 0
+        while not stop.is_set():
+            # Requests keep arriving at the storm rate, however long the previous ones took
+            next_request += interval
+            storm_statuses.append(book(client, clubs[0], index).status_code)
+            index += 1
+            time.sleep(max(0, next_request - time.perf_counter()))
+
+    def client_loop(number):
+        client = server.app.test_client()
+        client.environ_base['REMOTE_ADDR'] = f'10.0.1.{number}'
+        club = clubs[number + 1]
+        index = 0
+        while not stop.is_set():
+            started = time.perf_counter()
+            if index % 5 == 4:
+                response = book(client, club, index)
+            else:
+                response = client.post('/showSummary', data={'email': club.email})
+            client_statuses.append(response.status_code)
+            latencies.append(time.perf_counter() - started)
+            index += 1
+            # A person clicking through the pages
+            time.sleep(0.25)
+
+    threads = [threading.Thread(target=storm) for _ in range(storm_threads)]
+    threads += [threading.Thread(target=client_loop, args=(number,)) for number in range(clients)]
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    quantiles = statistics.quantiles(latencies, n=100)
+    print(json.dumps({
+        'storm_requests': len(storm_statuses),
+        'storm_refused': sum(status in (429, 503) for status in storm_statuses),
+        'client_requests': len(latencies),
+        'client_refused': sum(status in (429, 503) for status in client_statuses),
+        'client_p50': quantiles[49],
+        'client_p99': quantiles[98]
+    }))
+
+
+def run_mode(args, rate):
+    """Benchmark one mode in a fresh interpreter, on a fresh copy of the dataset."""
+    with tempfile.TemporaryDirectory() as directory:
+        clubs_path, competitions_path = write_dataset(directory, args.clubs, args.competitions)
+        env = dict(
+            os.environ,
+            GUDLFT_PERSISTENCE_MODE='snapshot',
+            GUDLFT_CLUBS_DATA_PATH=clubs_path,
+            GUDLFT_COMPETITIONS_DATA_PATH=competitions_path)
+        env.pop('FLASK_ENV', None)
+        env.pop('GUDLFT_RATE_LIMIT_PER_SECOND', None)
+        if rate is not None:
+            env['GUDLFT_RATE_LIMIT_PER_SECOND'] = rate
+        output = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.bench_retry_storm', '--worker',
+             '--storm-threads', str(args.storm_threads), '--storm-rate', str(args.storm_rate),
+             '--clients', str(args.clients),
+             '--duration', str(args.duration)],
+            env=env, check=True, stdout=subprocess.PIPE, universal_newlines=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--storm-threads', type=int, default=16, help='threads posting requests for the storming club')
+    parser.add_argument('--storm-rate', type=float, default=500, help='requests per second sent by the storm')
+    parser.add_argument('--clients', type=int, default=8, help='well-behaved clients, each a different club')
+    parser.add_argument('--duration', type=float, default=5, help='seconds the storm lasts')
+    parser.add_argument('--clubs', type=int, default=1000, help='number of clubs in the dataset')
+    parser.add_argument('--competitions', type=int, default=400, help='number of competitions in the dataset')
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.storm_threads, args.storm_rate, args.clients, args.duration)
+        return
+
+    print(f"{'mode':<12}{'storm req':>10}{'refused':>9}{'client req':>12}{'refused':>9}"
+          f"{'client p50 ms':>15}{'client p99 ms':>15}")
+    for mode, rate in MODES.items():
+        result = run_mode(args, rate)
+        print(f"{mode:<12}{result['storm_requests']:>10}{result['storm_refused'] / result['storm_requests']:>9.0%}"
+              f"{result['client_requests']:>12}{result['client_refused']:>9}"
+              f"{result['client_p50'] * 1000:>15.1f}{result['client_p99'] * 1000:>15.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,168 @@
+"""
+Benchmark the index, showSummary, book and purchasePlaces routes against synthetic datasets.
+
+Every dataset size is served by a fresh interpreter importing server.py, and every route is called
+through the Flask test client. Latency percentiles and throughput are reported per route.
+
+Usage:
+    python -m benchmarks.bench_routes --sizes 10 1000 100000
+    python -m benchmarks.bench_routes --save benchmarks/baseline.json
+    python -m benchmarks.bench_routes --compare benchmarks/baseline.json
+
+With --compare, the exit status is 1 when a route's median or 99th percentile latency got slower
+than the baseline by more than the tolerance.
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from urllib.parse import quote
+
+from benchmarks.generate_data import write_dataset
+
+
+ROUTES = ('index', 'showSummary', 'book', 'purchasePlaces')
+
+
+def percentile(sorted_values, fraction):
+    """Return the value below which `fraction` of the sorted values fall."""
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def summarize(timings):
+    """Summarize request durations, in seconds, as latency percentiles in milliseconds and throughput."""
+    ordered = sorted(timings)
+    total = sum(ordered)
+    return {
+        'requests': len(ordered),
+        'mean_ms': total / len(ordered) * 1000,
+        'p50_ms': percentile(ordered, 0.50) * 1000,
+        'p90_ms': percentile(ordered, 0.90) * 1000,
+        'p99_ms': percentile(ordered, 0.99) * 1000,
+        'throughput_rps': len(ordered) / total if total else float('inf')
+    }
+
+
+def run_worker(requests, warmup):
+    """Import the server on the dataset given by the environment, call every route and print the results as JSON."""
+    started = time.perf_counter()
+    import server
+    # The data is loaded by the first request otherwise, startup covers the load as well
+    registry = server.app.extensions['gudlft'].registry
+    startup = time.perf_counter() - started
+
+    client = server.app.test_client()
+    clubs = registry.clubs
+    now = datetime.now()
+    upcoming = [comp for comp in registry.competitions if comp.starts_at >= now]
+    rng = random.Random(1)
+
+    def call(name):
+        club = rng.choice(clubs)
+        competition = rng.choice(upcoming)
+        if name == 'index':
+            return client.get('/')
+        if name == 'showSummary':
+            return client.post('/showSummary', data={'email': club['email']})
+        if name == 'book':
+            return client.get(f"/book/{quote(competition['name'])}/{quote(club['name'])}")
+        return client.post('/purchasePlaces', data={'club': club['name'], 'competition': competition['name'], 'places': 1})
+
+    results = {}
+    for name in ROUTES:
+        for _ in range(warmup):
+            call(name)
+        timings = []
+        for _ in range(requests):
+            started = time.perf_counter()
+            response = call(name)
+            timings.append(time.perf_counter() - started)
+            if response.status_code != 200:
+                raise RuntimeError(f'{name} answered {response.status_code}')
+        results[name] = summarize(timings)
+    print(json.dumps({'startup_s': startup, 'routes': results}))
+
+
+def run_size(size, requests, warmup):
+    """Generate a dataset of `size` clubs and competitions and benchmark it in a fresh interpreter."""
+    with tempfile.TemporaryDirectory() as directory:
+        clubs_path, competitions_path = write_dataset(directory, size, size)
+        env = dict(
+            os.environ,
+            GUDLFT_CLUBS_DATA_PATH=clubs_path,
+            GUDLFT_COMPETITIONS_DATA_PATH=competitions_path,
+            GUDLFT_JOURNAL_PATH=os.path.join(directory, 'bookings.journal'),
+            GUDLFT_SQLITE_PATH=os.path.join(directory, 'gudlft.db'),
+            # Every request comes from one client, which the rate limiter would throttle
+            GUDLFT_RATE_LIMIT_PER_SECOND='0')
+        env.pop('FLASK_ENV', None)
+        output = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.bench_routes', '--worker', '--requests', str(requests), '--warmup', str(warmup)],
+            env=env, check=True, stdout=subprocess.PIPE, universal_newlines=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def print_results(results):
+    print(f"{'size':>9} {'route':<15} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'req/s':>10}")
+    for size, result in results.items():
+        print(f"{size:>9} {'(startup)':<15} {result['startup_s'] * 1000:>9.1f}")
+        for name, stats in result['routes'].items():
+            print(f"{size:>9} {name:<15} {stats['p50_ms']:>9.3f} {stats['p90_ms']:>9.3f} {stats['p99_ms']:>9.3f} {stats['throughput_rps']:>10.0f}")
+
+
+def compare(results, baseline, tolerance):
+    """Return the regressions of `results` against `baseline`, as printable lines."""
+    regressions = []
+    for size, result in results.items():
+        if size not in baseline:
+            continue
+        for name, stats in result['routes'].items():
+            reference = baseline[size]['routes'].get(name)
+            if reference is None:
+                continue
+            for metric in ('p50_ms', 'p99_ms'):
+                if stats[metric] > reference[metric] * (1 + tolerance):
+                    regressions.append(
+                        f'{size} {name} {metric}: {stats[metric]:.3f} ms vs {reference[metric]:.3f} ms in the baseline')
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 1000, 10000],
+                        help='numbers of clubs and of competitions to generate (10 to 1000000)')
+    parser.add_argument('--requests', type=int, default=200, help='measured requests per route')
+    parser.add_argument('--warmup', type=int, default=20, help='unmeasured requests per route')
+    parser.add_argument('--save', metavar='PATH', help='save the results as a baseline')
+    parser.add_argument('--compare', metavar='PATH', help='compare the results with a saved baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed slowdown against the baseline')
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.requests, args.warmup)
+        return
+
+    results = {str(size): run_size(size, args.requests, args.warmup) for size in args.sizes}
+    print_results(results)
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=4)
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for line in regressions:
+            print('REGRESSION', line)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""
+Generate synthetic clubs.json and competitions.json datasets.
+
+Usage:
+    python -m benchmarks.generate_data --clubs 100000 --competitions 10000 --output /tmp/gudlft-data
+"""
+import argparse
+import json
+import os
+import random
+from datetime import datetime, timedelta
+
+from gudlft.records import DATE_FORMAT
+
+
+def generate_clubs(count, points=1000):
+    """Return `count` clubs with unique names and emails, each holding `points` points."""
+    return [
+        {'name': f'Club {i:07d}', 'email': f'club{i}@example.com', 'points': str(points)}
+        for i in range(count)
+    ]
+
+
+def generate_competitions(count, places=100000, seed=0):
+    """
+    Return `count` competitions with unique names, half of them in the past and half upcoming.
+
+    Dates are spread over ten years around now, in a shuffled order like hand-edited files.
+    """
+    rng = random.Random(seed)
+    now = datetime.now()
+    competitions = []
+    for i in range(count):
+        offset = timedelta(days=rng.randint(1, 5 * 365), seconds=rng.randint(0, 86399))
+        date = now - offset if i % 2 else now + offset
+        competitions.append({'name': f'Competition {i:07d}', 'date': date.strftime(DATE_FORMAT), 'numberOfPlaces': str(places)})
+    return competitions
+
+
+def write_dataset(directory, clubs, competitions):
+    """
+    Write the clubs and competitions files in the format of the data files shipped with the app.
+
+    Returns:
+        tuple: The paths of the clubs and competitions files.
+    """
+    os.makedirs(directory, exist_ok=True)
+    clubs_path = os.path.join(directory, 'clubs.json')
+    competitions_path = os.path.join(directory, 'competitions.json')
+    with open(clubs_path, 'w') as c:
+        json.dump({'clubs': generate_clubs(clubs)}, c, indent=4)
+    with open(competitions_path, 'w') as c:
+        json.dump({'competitions': generate_competitions(competitions)}, c, indent=4)
+    return clubs_path, competitions_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clubs', type=int, default=1000, help='number of clubs')
+    parser.add_argument('--competitions', type=int, default=1000, help='number of competitions')
+    parser.add_argument('--output', required=True, help='directory receiving clubs.json and competitions.json')
+    args = parser.parse_args()
+    for path in write_dataset(args.output, args.clubs, args.competitions):
+        print(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1 @@
+"""Support modules for the GUDLFT registration server."""
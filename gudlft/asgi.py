@@ -0,0 +1,138 @@
+"""ASGI adapter serving the Flask app from separate read and write thread pools."""
+import asyncio
+import io
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+
+# Routes that book places, and so wait for the data to be persisted
+WRITE_PATHS = ('/purchasePlaces', '/api/bookings')
+
+
+def build_environ(scope, body):
+    """Build the WSGI environ of an ASGI HTTP request."""
+    server_name, server_port = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server_name,
+        'SERVER_PORT': str(server_port),
+        'SERVER_PROTOCOL': 'HTTP/' + scope.get('http_version', '1.1'),
+        'REMOTE_ADDR': scope['client'][0] if scope.get('client') else '',
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            environ[name] = value
+            continue
+        key = 'HTTP_' + name
+        environ[key] = environ[key] + ',' + value if key in environ else value
+    return environ
+
+
+def call_wsgi(wsgi_app, environ):
+    """
+    Run a WSGI app to completion.
+
+    The whole body is produced in the calling thread, as streamed Flask responses are bound to
+    the thread that started them.
+
+    Returns:
+        tuple: The status code, the header list and the body chunks.
+    """
+    response = {}
+    chunks = []
+
+    def start_response(status, headers, exc_info=None):
+        if exc_info is not None and response:
+            raise exc_info[1].with_traceback(exc_info[2])
+        response['status'] = int(status.split(' ', 1)[0])
+        response['headers'] = headers
+        return chunks.append
+
+    iterable = wsgi_app(environ, start_response)
+    try:
+        for chunk in iterable:
+            if chunk:
+                chunks.append(chunk)
+    finally:
+        if hasattr(iterable, 'close'):
+            iterable.close()
+    return response['status'], response['headers'], chunks
+
+
+class AsyncApp:
+    """
+    ASGI application serving a WSGI app without blocking the event loop.
+
+    Requests run in thread pools: one for the booking routes in `write_paths`, which wait for
+    their bookings to be durably written, and one for every other route. Read-only pages are
+    therefore never queued behind slow writes, however many bookings are in flight.
+
+    Args:
+        wsgi_app (callable): The WSGI application to serve.
+        read_workers (int): Threads serving read-only requests.
+        write_workers (int): Threads serving booking requests.
+        write_paths (tuple): Paths of the routes served by the write threads.
+    """
+
+    def __init__(self, wsgi_app, read_workers=16, write_workers=4, write_paths=WRITE_PATHS):
+        self.wsgi_app = wsgi_app
+        self.write_paths = write_paths
+        self.read_executor = ThreadPoolExecutor(max_workers=read_workers, thread_name_prefix='gudlft-read')
+        self.write_executor = ThreadPoolExecutor(max_workers=write_workers, thread_name_prefix='gudlft-write')
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self._http(scope, receive, send)
+        else:
+            raise ValueError(f"Unsupported ASGI scope type: {scope['type']}")
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await asyncio.get_running_loop().run_in_executor(None, self.close)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _http(self, scope, receive, send):
+        body = []
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return
+            body.append(message.get('body', b''))
+            if not message.get('more_body', False):
+                break
+
+        executor = self.write_executor if scope['path'] in self.write_paths else self.read_executor
+        environ = build_environ(scope, b''.join(body))
+        loop = asyncio.get_running_loop()
+        status, headers, chunks = await loop.run_in_executor(executor, call_wsgi, self.wsgi_app, environ)
+
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers]
+        })
+        await send({'type': 'http.response.body', 'body': b''.join(chunks)})
+
+    def close(self):
+        """Wait for the running requests and stop the thread pools."""
+        self.read_executor.shutdown(wait=True)
+        self.write_executor.shutdown(wait=True)
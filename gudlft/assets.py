@@ -0,0 +1,124 @@
+"""Build step for the static assets: minified, fingerprinted and precompressed copies."""
+import gzip
+import hashlib
+import json
+import os
+import re
+import shutil
+
+try:
+    import brotli
+except ImportError:  # Optional: without it only gzip variants are built
+    brotli = None
+
+
+# Directory of the built assets within the static folder, and the manifest mapping source names to built ones
+BUILD_DIR = 'dist'
+MANIFEST_NAME = 'manifest.json'
+
+# Built assets never change under the same name, so clients may keep them for a year
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+# Encodings of the precompressed variants, by file suffix, in order of preference
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+CSS_COMMENT = re.compile(r'/\*.*?\*/', re.S)
+CSS_LICENSE = re.compile(r'(/\*!.*?\*/)', re.S)
+CSS_SPACE = re.compile(r'\s+')
+CSS_PUNCTUATION = re.compile(r'\s*([{};:,>])\s*')
+
+
+def minify_css(text):
+    """
+    Return a stylesheet without comments and insignificant whitespace.
+
+    Comments opened with /*! (licenses) are kept as they are.
+    """
+    parts = CSS_LICENSE.split(text)
+    for i in range(0, len(parts), 2):
+        part = CSS_COMMENT.sub('', parts[i])
+        part = CSS_SPACE.sub(' ', part)
+        # A space before ':' only matters in selectors such as 'a :hover', which the stylesheets never use
+        part = CSS_PUNCTUATION.sub(r'\1', part)
+        parts[i] = part.replace(';}', '}').strip()
+    return '\n'.join(part for part in parts if part)
+
+
+def fingerprint(name, data):
+    """Return the name of a built asset: the source name with a hash of its content before the extension."""
+    root, extension = os.path.splitext(name)
+    return f'{root}.{hashlib.sha256(data).hexdigest()[:12]}{extension}'
+
+
+def build_assets(static_folder):
+    """
+    Build every stylesheet and script of the static folder into its build directory.
+
+    Each asset is minified (stylesheets only), written under a fingerprinted name, and
+    precompressed with gzip, and with brotli when it is installed. The previous build is
+    replaced, and a manifest maps each source path, relative to the static folder, to the path of
+    its built copy.
+
+    Returns:
+        dict: The manifest.
+    """
+    build_folder = os.path.join(static_folder, BUILD_DIR)
+    shutil.rmtree(build_folder, ignore_errors=True)
+    manifest = {}
+    for directory, subdirectories, filenames in os.walk(static_folder):
+        subdirectories[:] = sorted(d for d in subdirectories if os.path.join(directory, d) != build_folder)
+        for filename in sorted(filenames):
+            if not filename.endswith(('.css', '.js')):
+                continue
+            source = os.path.relpath(os.path.join(directory, filename), static_folder).replace(os.sep, '/')
+            with open(os.path.join(directory, filename), 'rb') as f:
+                data = f.read()
+            if filename.endswith('.css'):
+                data = minify_css(data.decode('utf-8')).encode('utf-8')
+            built = f'{BUILD_DIR}/{fingerprint(source, data)}'
+            write_variants(os.path.join(static_folder, built), data)
+            manifest[source] = built
+
+    with open(os.path.join(build_folder, MANIFEST_NAME), 'w') as f:
+        json.dump(manifest, f, indent=4, sort_keys=True)
+    return manifest
+
+
+def write_variants(path, data):
+    """Write an asset and its precompressed variants."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+    # mtime=0 keeps the compressed files identical from one build to the next
+    with open(path + '.gz', 'wb') as f:
+        f.write(gzip.compress(data, compresslevel=9, mtime=0))
+    if brotli is not None:
+        with open(path + '.br', 'wb') as f:
+            f.write(brotli.compress(data, quality=11))
+
+
+def load_manifest(static_folder):
+    """Return the manifest of the last build, or an empty one when the assets were never built."""
+    try:
+        with open(os.path.join(static_folder, BUILD_DIR, MANIFEST_NAME)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def precompressed_variant(static_folder, filename, accept_encodings):
+    """
+    Return the precompressed variant of a built asset accepted by the client.
+
+    Args:
+        static_folder (str): The static folder.
+        filename (str): Path of the built asset, relative to the static folder.
+        accept_encodings (werkzeug.datastructures.Accept): The client's Accept-Encoding header.
+
+    Returns:
+        tuple: The variant path, relative to the static folder, and its encoding, or (None, None).
+    """
+    for encoding, suffix in ENCODINGS:
+        if accept_encodings[encoding] and os.path.isfile(os.path.join(static_folder, filename + suffix)):
+            return filename + suffix, encoding
+    return None, None
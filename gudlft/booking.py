@@ -0,0 +1,130 @@
+"""Booking engine applying the booking rules and debits atomically."""
+import threading
+from contextlib import ExitStack
+from datetime import datetime
+
+from gudlft.storage import Storage
+
+
+MAX_PLACES_PER_COMPETITION = 12
+
+
+class BookingError(Exception):
+    """
+    Raised when a booking request breaks one of the booking rules.
+
+    `position` is the index of the refused booking within a batch.
+    """
+
+    def __init__(self, message, position=0):
+        super().__init__(message)
+        self.position = position
+
+
+class KeyedLocks:
+    """Hands out one lock per key, created on first use."""
+
+    def __init__(self):
+        self._guard = threading.Lock()
+        self._locks = {}
+
+    def __getitem__(self, key):
+        lock = self._locks.get(key)
+        if lock is None:
+            with self._guard:
+                lock = self._locks.setdefault(key, threading.Lock())
+        return lock
+
+
+class BookingEngine:
+    """
+    Checks and applies bookings against a registry.
+
+    The checks and the debits of a booking run while holding the competition's lock and then the
+    club's lock, so concurrent bookings can neither oversell places nor overdraw points, while
+    bookings for other competitions and clubs proceed in parallel. Competition locks are always
+    taken before club locks, each in name order, which rules out deadlocks between bookings.
+
+    Args:
+        registry (Registry): The registry holding the clubs and competitions to book.
+        storage (Storage): The storage backend, which may check bookings against shared state.
+    """
+
+    def __init__(self, registry, storage=None):
+        self.registry = registry
+        self.storage = storage if storage is not None else Storage()
+        self._competition_locks = KeyedLocks()
+        self._club_locks = KeyedLocks()
+
+    def book(self, club, competition, places):
+        """
+        Book places in a competition for a club.
+
+        Args:
+            club (Club): The booking club, as found in the registry.
+            competition (Competition): The competition to book, as found in the registry.
+            places (int): Number of places requested.
+
+        Returns:
+            tuple: The club and competition records debited by the booking.
+
+        Raises:
+            BookingError: If the booking breaks a rule; nothing is debited in that case.
+        """
+        club, competition, _ = self.book_many([(club, competition, places)])[0]
+        return club, competition
+
+    def book_many(self, bookings):
+        """
+        Book a batch of places, all or nothing.
+
+        Each booking is checked once the previous ones are applied, so bookings of the same club or
+        competition within a batch add up.
+
+        Args:
+            bookings (list): (club, competition, places) tuples, with records found in the registry.
+
+        Returns:
+            list: The (club, competition, places) tuples booked, with the debited records.
+
+        Raises:
+            BookingError: If any booking breaks a rule; nothing is debited in that case.
+        """
+        competition_names = sorted({competition['name'] for _, competition, _ in bookings})
+        club_names = sorted({club['name'] for club, _, _ in bookings})
+        with ExitStack() as stack:
+            for name in competition_names:
+                stack.enter_context(self._competition_locks[name])
+            for name in club_names:
+                stack.enter_context(self._club_locks[name])
+            return self.storage.book(self.registry, bookings, self._check_booking)
+
+    def _check_booking(self, position, club, competition, places):
+        """Check one booking of a batch, recording its position in the error."""
+        try:
+            self._check(club, competition, places)
+        except BookingError as error:
+            error.position = position
+            raise
+
+    def _check(self, club, competition, places):
+        """Apply the booking rules, in the order their errors are reported."""
+        # Cannot book places for past competitions
+        if competition.starts_at < datetime.now():
+            raise BookingError('Cannot book places for past competitions')
+
+        # Check for valid number of places
+        if places <= 0:
+            raise BookingError('You must book at least 1 place.')
+
+        # Cannot book more places than available
+        if places > competition.places:
+            raise BookingError('Cannot book more places than are available.')
+
+        # Cannot book more than 12 places per competition, counting the places the club already booked in it
+        if club.booked_places(competition.name) + places > MAX_PLACES_PER_COMPETITION:
+            raise BookingError('Cannot book more than 12 places per competition')
+
+        # Cannot use more than points allowed
+        if places > club.points:
+            raise BookingError('Not enough points')
@@ -0,0 +1,110 @@
+"""Caches for data that only changes when a booking is made."""
+import threading
+from collections import OrderedDict
+
+
+class PointsBoard:
+    """
+    Caches the club list shown on the public points board.
+
+    The list is reloaded only when its key changes. Callers build the key from the digest of the
+    club balances, which every booking changes, and from the storage signature, which changes when
+    the data files are edited by another program.
+    """
+
+    def __init__(self):
+        self._entry = None
+
+    def clubs(self, key, load_clubs):
+        """
+        Return the cached clubs for this key, loading them with `load_clubs` on a miss.
+
+        Args:
+            key (tuple): Identifies the version of the data the clubs are loaded from.
+            load_clubs (callable): Returns the current list of clubs.
+        """
+        entry = self._entry
+        if entry is None or entry[0] != key:
+            entry = (key, load_clubs())
+            self._entry = entry
+        return entry[1]
+
+
+class FragmentCache:
+    """
+    Caches rendered HTML fragments.
+
+    Row fragments are grouped by the record they display and keyed by every value they are
+    rendered from, so a stale row is never served. Invalidating a group after a booking frees
+    the rows of the touched club or competition while every other row stays cached. Whole tables
+    are joined from the cached rows and kept in a small LRU keyed by data version.
+
+    Hit and miss counters cover both rows and tables; they are not synchronized, so they are
+    approximate under concurrent requests.
+
+    Args:
+        max_fragments (int): Number of cached rows above which the row cache is cleared.
+        max_tables (int): Number of joined tables kept.
+    """
+
+    def __init__(self, max_fragments=100000, max_tables=256):
+        self.max_fragments = max_fragments
+        self.max_tables = max_tables
+        self._lock = threading.Lock()
+        self._groups = {}
+        self._fragment_count = 0
+        self._tables = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def fragment(self, group, key, render):
+        """
+        Return the cached fragment for this group and key, rendering it with `render` on a miss.
+
+        Args:
+            group (tuple): The record the fragment displays, e.g. ('competition', name).
+            key (tuple): The values the fragment is rendered from.
+            render (callable): Renders the fragment.
+        """
+        fragments = self._groups.get(group)
+        if fragments is not None:
+            html = fragments.get(key)
+            if html is not None:
+                self.hits += 1
+                return html
+        self.misses += 1
+        html = render()
+        with self._lock:
+            if self._fragment_count >= self.max_fragments:
+                self._groups.clear()
+                self._fragment_count = 0
+            self._groups.setdefault(group, {})[key] = html
+            self._fragment_count += 1
+        return html
+
+    def table(self, key, build):
+        """Return the cached table for this key, building it with `build` on a miss."""
+        with self._lock:
+            html = self._tables.get(key)
+            if html is not None:
+                self._tables.move_to_end(key)
+                self.hits += 1
+                return html
+        self.misses += 1
+        html = build()
+        with self._lock:
+            self._tables[key] = html
+            if len(self._tables) > self.max_tables:
+                self._tables.popitem(last=False)
+        return html
+
+    def invalidate(self, group):
+        """Drop the fragments rendered for a club or competition."""
+        with self._lock:
+            fragments = self._groups.pop(group, None)
+            if fragments is not None:
+                self._fragment_count -= len(fragments)
+
+    def stats(self):
+        """Return the hit and miss counters and the number of cached rows and tables."""
+        return {'hits': self.hits, 'misses': self.misses, 'fragments': self._fragment_count, 'tables': len(self._tables)}
@@ -0,0 +1,132 @@
+"""Compression of the rendered responses, negotiated from Accept-Encoding."""
+import gzip
+import threading
+from collections import OrderedDict
+
+try:
+    import brotli
+except ImportError:  # Optional: without it responses are only gzipped
+    brotli = None
+
+
+# Content types worth compressing; images and the built static assets are sent as they are
+COMPRESSIBLE_TYPES = ('text/html', 'text/plain', 'application/json')
+
+
+def gzip_compress(data, level):
+    """Return gzipped data, without a timestamp so equal inputs give equal outputs."""
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+def brotli_compress(data, level):
+    """Return brotli-compressed data, at the brotli quality matching the gzip level."""
+    return brotli.compress(data, quality=min(11, level))
+
+
+class ResponseCompressor:
+    """
+    Compresses response bodies with the best encoding the client accepts.
+
+    Only complete bodies of compressible content types and of at least `min_size` bytes are
+    compressed: streamed responses, files and responses already encoded are left alone. The
+    compressed bodies of responses carrying an ETag are kept in a small LRU keyed by the ETag and
+    the encoding, so a cacheable page such as the points board is compressed once per version.
+
+    A compressed response gets a weak ETag, as its bytes differ from the identity encoding; weak
+    comparison still matches it on conditional requests.
+
+    Args:
+        min_size (int): Smallest body, in bytes, that is compressed.
+        level (int): Compression level, 1 (fastest) to 9 (smallest).
+        max_entries (int): Number of compressed bodies kept.
+    """
+
+    def __init__(self, min_size=500, level=6, max_entries=64):
+        self.min_size = min_size
+        self.level = level
+        self.max_entries = max_entries
+        self.encoders = OrderedDict()
+        if brotli is not None:
+            self.encoders['br'] = brotli_compress
+        self.encoders['gzip'] = gzip_compress
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def negotiate(self, accept_encodings):
+        """Return the preferred encoding accepted by the client, or None."""
+        for encoding in self.encoders:
+            if accept_encodings[encoding]:
+                return encoding
+        return None
+
+    def compressible(self, response):
+        """Tell whether a response body can be compressed."""
+        return (
+            response.status_code == 200
+            and not response.direct_passthrough
+            and not response.is_streamed
+            and 'Content-Encoding' not in response.headers
+            and response.mimetype in COMPRESSIBLE_TYPES
+        )
+
+    def compress(self, response, accept_encodings):
+        """
+        Compress a response in place, when the client accepts it and it is worth it.
+
+        A tagged response gets a weak tag whenever the client negotiates an encoding, whether or
+        not its body is large enough to be compressed, and so does the 304 answering a
+        revalidation of it: both carry the same validators and `Vary` header.
+
+        Args:
+            response (flask.Response): The response to send.
+            accept_encodings (werkzeug.datastructures.Accept): The client's Accept-Encoding header.
+
+        Returns:
+            flask.Response: The same response.
+        """
+        if response.status_code == 304:
+            self._set_validators(response, accept_encodings)
+            return response
+        if not self.compressible(response):
+            return response
+        encoding = self._set_validators(response, accept_encodings)
+        data = response.get_data()
+        if encoding is None or len(data) < self.min_size:
+            return response
+
+        etag, _ = response.get_etag()
+        if etag is None:
+            compressed = self.encoders[encoding](data, self.level)
+        else:
+            compressed = self._cached(etag, encoding, data)
+        response.set_data(compressed)
+        response.headers['Content-Encoding'] = encoding
+        return response
+
+    def _set_validators(self, response, accept_encodings):
+        """Vary the response on Accept-Encoding and weaken its tag when an encoding is negotiated, returning it."""
+        response.vary.add('Accept-Encoding')
+        encoding = self.negotiate(accept_encodings)
+        etag, weak = response.get_etag()
+        if encoding is not None and etag is not None and not weak:
+            response.set_etag(etag, weak=True)
+        return encoding
+
+    def _cached(self, etag, encoding, data):
+        """Return the compressed body of a tagged response, compressing it on a miss."""
+        key = (etag, encoding)
+        with self._lock:
+            compressed = self._cache.get(key)
+            if compressed is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return compressed
+            self.misses += 1
+        compressed = self.encoders[encoding](data, self.level)
+        with self._lock:
+            self._cache[key] = compressed
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return compressed
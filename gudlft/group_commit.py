@@ -0,0 +1,92 @@
+"""Group commit: persist the bookings of concurrent requests in one durable write."""
+import threading
+import time
+
+
+class Batch:
+    """Bookings persisted by the same write, and the outcome of that write."""
+
+    def __init__(self):
+        self.bookings = []
+        self.registry = None
+        self.has_leader = False
+        self.done = False
+        self.error = None
+
+
+class GroupCommitter:
+    """
+    Coalesces the bookings committed by concurrent threads into batches written together.
+
+    The first thread committing to a batch leads it: it waits for the previous write to finish,
+    and for up to `window` seconds, while other threads add their bookings to the batch, then
+    writes the whole batch at once. Every thread returns, or raises the error of the write, once
+    the batch holding its bookings is durable. A batch is closed when it holds `max_batch`
+    bookings, and the following bookings start a new one.
+
+    With a window of 0 there is no added wait: bookings only share a write when they arrive
+    while the previous one is in progress.
+
+    Args:
+        write (callable): Called with the registry and the bookings of a batch; makes them durable.
+        window (float): Seconds a batch stays open for more bookings.
+        max_batch (int): Number of bookings that closes a batch.
+    """
+
+    def __init__(self, write, window=0.0, max_batch=100):
+        self._write = write
+        self.window = window
+        self.max_batch = max_batch
+        self._condition = threading.Condition()
+        self._batch = Batch()
+        self._writing = False
+
+    def commit(self, registry, bookings):
+        """
+        Add bookings to the open batch and block until it is written.
+
+        Raises:
+            Exception: The error raised by the write of the batch.
+        """
+        with self._condition:
+            batch = self._batch
+            if len(batch.bookings) >= self.max_batch:
+                batch = self._batch = Batch()
+            batch.bookings.extend(bookings)
+            batch.registry = registry
+            if batch.has_leader:
+                if len(batch.bookings) >= self.max_batch:
+                    self._condition.notify_all()
+                while not batch.done:
+                    self._condition.wait()
+                if batch.error is not None:
+                    raise batch.error
+                return
+            batch.has_leader = True
+            self._wait_for_turn(batch)
+            if self._batch is batch:
+                self._batch = Batch()
+            self._writing = True
+
+        try:
+            self._write(batch.registry, batch.bookings)
+        except BaseException as error:
+            batch.error = error
+            raise
+        finally:
+            with self._condition:
+                batch.done = True
+                self._writing = False
+                self._condition.notify_all()
+
+    def _wait_for_turn(self, batch):
+        """Wait until no write is in progress and the batch is full or its window is over. Called with the lock held."""
+        deadline = time.monotonic() + self.window
+        while True:
+            if self._writing:
+                self._condition.wait()
+                continue
+            remaining = deadline - time.monotonic()
+            if len(batch.bookings) >= self.max_batch or remaining <= 0:
+                return
+            self._condition.wait(remaining)
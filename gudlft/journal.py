@@ -0,0 +1,221 @@
+"""Append-only booking journal used instead of rewriting the JSON files on every booking."""
+import json
+import os
+import threading
+import time
+
+from gudlft.loader import load_records
+from gudlft.snapshot import write_atomic
+
+
+def read_snapshot(path, key):
+    """
+    Read a JSON snapshot file.
+
+    Args:
+        path (str): Path of the clubs or competitions file.
+        key (str): Top-level key holding the records ('clubs' or 'competitions').
+
+    Returns:
+        tuple: The list of records and the journal sequence number the snapshot includes
+               (0 for files that were never compacted).
+    """
+    extra = {}
+    items = load_records(path, key, extra)
+    return items, extra.get('sequence', 0)
+
+
+def write_snapshot(path, key, items, sequence):
+    """Atomically replace a JSON snapshot file, recording the last journal sequence number it includes."""
+    write_atomic(path, {key: items, 'sequence': sequence})
+
+
+def read_records(path, extra=None):
+    """
+    Yield the booking records stored in a journal file.
+
+    A truncated last line, left by a crash in the middle of an append, is ignored.
+
+    Args:
+        path (str): Path of the journal file.
+        extra (dict): If given, receives the byte offset where the complete lines end, under 'end',
+                      once the file has been read.
+    """
+    end = 0
+    if os.path.exists(path):
+        with open(path, 'rb') as f:
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                end += len(line)
+                yield json.loads(line)
+    if extra is not None:
+        extra['end'] = end
+
+
+def apply_records(clubs, competitions, records, clubs_sequence, competitions_sequence):
+    """
+    Apply journal records to club and competition lists in place.
+
+    Each side is only debited for records newer than the snapshot it was loaded from, so a crash
+    between writing the two snapshot files never applies a booking twice.
+
+    Returns:
+        int: The highest sequence number seen, including the snapshot ones.
+    """
+    clubs_by_name = {club['name']: club for club in clubs}
+    competitions_by_name = {comp['name']: comp for comp in competitions}
+    sequence = max(clubs_sequence, competitions_sequence)
+    for record in records:
+        if record['seq'] > clubs_sequence:
+            club = clubs_by_name[record['club']]
+            club['points'] = str(int(club['points']) - record['places'])
+            booked = club.setdefault('bookings', {})
+            booked[record['competition']] = int(booked.get(record['competition'], 0)) + record['places']
+        if record['seq'] > competitions_sequence:
+            competition = competitions_by_name[record['competition']]
+            competition['numberOfPlaces'] = int(competition['numberOfPlaces']) - record['places']
+        sequence = max(sequence, record['seq'])
+    return sequence
+
+
+class BookingJournal:
+    """
+    Write-ahead journal of bookings stored next to the clubs and competitions snapshots.
+
+    Each booking is appended as one compact JSON line and fsynced. Once the journal grows past
+    `max_bytes`, or `max_age` seconds passed since the last compaction, a background thread folds
+    it into the snapshot files. The journal is rotated aside first so that bookings keep being
+    appended while the snapshots are rewritten. A compaction that failed leaves the rotated journal
+    in place and its error in `compaction_error`; the next compaction folds it in before rotating
+    the journal again, so its bookings are never overwritten.
+
+    Args:
+        path (str): Path of the journal file.
+        clubs_path (str): Path of the clubs snapshot.
+        competitions_path (str): Path of the competitions snapshot.
+        max_bytes (int): Journal size that triggers a compaction.
+        max_age (float): Seconds after which a non-empty journal is compacted.
+    """
+
+    def __init__(self, path, clubs_path, competitions_path, max_bytes=1024 * 1024, max_age=300):
+        self.path = path
+        self.compacting_path = path + '.compacting'
+        self.clubs_path = clubs_path
+        self.competitions_path = competitions_path
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._sequence = 0
+        self._file = None
+        self._compactor = None
+        self._last_compaction = time.monotonic()
+        self.compaction_error = None
+
+    def recover(self):
+        """
+        Load the snapshots and replay the journal on top of them.
+
+        A compaction interrupted by a crash is finished before the journal is reopened, and a record
+        cut short by a crash is cut off the journal, so the next booking starts on a line of its own.
+
+        Returns:
+            tuple: The recovered club and competition lists.
+        """
+        if os.path.exists(self.compacting_path):
+            self._compact_rotated()
+        clubs, clubs_sequence = read_snapshot(self.clubs_path, 'clubs')
+        competitions, competitions_sequence = read_snapshot(self.competitions_path, 'competitions')
+        extra = {}
+        self._sequence = apply_records(
+            clubs, competitions, read_records(self.path, extra), clubs_sequence, competitions_sequence)
+        if os.path.exists(self.path) and os.path.getsize(self.path) > extra['end']:
+            with open(self.path, 'r+b') as f:
+                f.truncate(extra['end'])
+                f.flush()
+                os.fsync(f.fileno())
+        self._file = open(self.path, 'a')
+        return clubs, competitions
+
+    def append(self, club_name, competition_name, places):
+        """Durably append a booking, then start a compaction if a threshold was reached."""
+        self.append_many([(club_name, competition_name, places)])
+
+    def append_many(self, bookings):
+        """Durably append (club name, competition name, places) bookings with a single fsync."""
+        with self._lock:
+            lines = []
+            for club_name, competition_name, places in bookings:
+                self._sequence += 1
+                record = {'seq': self._sequence, 'club': club_name, 'competition': competition_name, 'places': places}
+                lines.append(json.dumps(record, separators=(',', ':')) + '\n')
+            self._file.write(''.join(lines))
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            if self._needs_compaction():
+                self._start_compaction()
+
+    def _needs_compaction(self):
+        size = self._file.tell()
+        if size >= self.max_bytes:
+            return True
+        return size > 0 and time.monotonic() - self._last_compaction >= self.max_age
+
+    def _start_compaction(self):
+        """Rotate the journal aside and compact it in a background thread. Called with the lock held."""
+        if self._compactor is not None and self._compactor.is_alive():
+            return
+        if os.path.exists(self.compacting_path):
+            # Left by a compaction that failed: rotating over it would lose its bookings
+            try:
+                self._compact_rotated()
+            except Exception as error:
+                self.compaction_error = error
+                return
+        self._file.close()
+        os.replace(self.path, self.compacting_path)
+        self._file = open(self.path, 'a')
+        self._last_compaction = time.monotonic()
+        self._compactor = threading.Thread(target=self._run_compaction, daemon=True)
+        self._compactor.start()
+
+    def _run_compaction(self):
+        """Compact the rotated journal, recording the error if it fails."""
+        try:
+            self._compact_rotated()
+        except Exception as error:
+            self.compaction_error = error
+        else:
+            self.compaction_error = None
+
+    def _compact_rotated(self):
+        """Fold the rotated journal into the snapshot files and remove it."""
+        clubs, clubs_sequence = read_snapshot(self.clubs_path, 'clubs')
+        competitions, competitions_sequence = read_snapshot(self.competitions_path, 'competitions')
+        sequence = apply_records(
+            clubs, competitions, read_records(self.compacting_path), clubs_sequence, competitions_sequence)
+        write_snapshot(self.clubs_path, 'clubs', clubs, sequence)
+        write_snapshot(self.competitions_path, 'competitions', competitions, sequence)
+        os.remove(self.compacting_path)
+
+    def checkpoint(self, clubs, competitions):
+        """Write complete snapshots of the given records and empty the journal."""
+        with self._lock:
+            self.wait_for_compaction()
+            write_snapshot(self.clubs_path, 'clubs', clubs, self._sequence)
+            write_snapshot(self.competitions_path, 'competitions', competitions, self._sequence)
+            self._file.truncate(0)
+            self._last_compaction = time.monotonic()
+
+    def wait_for_compaction(self):
+        """Block until a running background compaction has finished."""
+        if self._compactor is not None:
+            self._compactor.join()
+
+    def close(self):
+        """Wait for a running compaction and close the journal file."""
+        self.wait_for_compaction()
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
@@ -0,0 +1,156 @@
+"""Streaming loader reading the records of the JSON data files one at a time."""
+import json
+import re
+
+
+# Characters read from the file at a time
+CHUNK_SIZE = 1 << 20
+
+# Whitespace, optionally followed by a separator, between JSON tokens
+SEPARATOR = re.compile(r'[ \t\n\r]*([,:]?)[ \t\n\r]*')
+
+
+class StreamingReader:
+    """
+    Incremental JSON reader over a file, decoding one value at a time from a bounded buffer.
+
+    Args:
+        f (file): File opened in text mode.
+        chunk_size (int): Number of characters read from the file at a time.
+    """
+
+    def __init__(self, f, chunk_size=CHUNK_SIZE):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.buffer = ''
+        self.position = 0
+        self.eof = False
+
+    def _fill(self):
+        """Append the next chunk of the file to the unread part of the buffer. Returns False at the end of the file."""
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.position:] + chunk
+        self.position = 0
+        return True
+
+    def skip(self):
+        """Skip whitespace and return the separator (',' or ':') found, or ''."""
+        while True:
+            match = SEPARATOR.match(self.buffer, self.position)
+            # The match must stop before the end of the buffer to be sure it is complete
+            if match.end() < len(self.buffer) or self.eof:
+                self.position = match.end()
+                return match.group(1)
+            self._fill()
+
+    def expect(self, token):
+        """Consume a one-character structural token, returning whether it was found."""
+        self.skip()
+        while self.position >= len(self.buffer):
+            if not self._fill():
+                return False
+        if self.buffer[self.position] == token:
+            self.position += 1
+            return True
+        return False
+
+    def value(self):
+        """Decode the next value, reading more of the file until it is complete."""
+        self.skip()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.position)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise
+            # A number or literal ending the buffer may continue in the next chunk
+            if end == len(self.buffer) and not self.eof and self._fill():
+                continue
+            self.position = end
+            return value
+
+    def values(self):
+        """
+        Decode the array items available in the buffer in one go, or the next item if none is complete.
+
+        The buffered items up to the last '}' are decoded as a single array. That only succeeds
+        when the '}' closes an item, as cutting inside a string or a nested object leaves the
+        array unterminated, and the decoder shares one copy of each key between the items.
+        """
+        self.skip()
+        end = len(self.buffer)
+        # At the end of the file the last '}' closes the document, the one before closes the last item
+        for _ in range(2):
+            end = self.buffer.rfind('}', self.position, end)
+            if end == -1:
+                break
+            try:
+                items = json.loads('[' + self.buffer[self.position:end + 1] + ']')
+            except json.JSONDecodeError:
+                continue
+            self.position = end + 1
+            return items
+        return [self.value()]
+
+    def error(self, message):
+        return json.JSONDecodeError(message, self.buffer, self.position)
+
+
+def iter_records(path, key, extra=None, chunk_size=CHUNK_SIZE):
+    """
+    Yield the records of the array stored under `key` in a JSON data file, one at a time.
+
+    Only the record being decoded and one chunk of the file are held in memory, instead of the
+    whole document as with `json.load`.
+
+    Args:
+        path (str): Path of the clubs or competitions file.
+        key (str): Top-level key holding the records ('clubs' or 'competitions').
+        extra (dict): If given, filled with the other top-level values of the file.
+        chunk_size (int): Number of characters read from the file at a time.
+
+    Raises:
+        json.JSONDecodeError: If the file is not a JSON object.
+        KeyError: If the file has no `key` array.
+    """
+    found = False
+    with open(path) as f:
+        reader = StreamingReader(f, chunk_size)
+        if not reader.expect('{'):
+            raise reader.error('Expected a JSON object')
+        if reader.expect('}'):
+            raise KeyError(key)
+        while True:
+            name = reader.value()
+            if reader.skip() != ':':
+                raise reader.error("Expected ':'")
+            if name == key and reader.expect('['):
+                found = True
+                if not reader.expect(']'):
+                    while True:
+                        yield from reader.values()
+                        separator = reader.skip()
+                        if separator != ',':
+                            break
+                    if not reader.expect(']'):
+                        raise reader.error("Expected ',' or ']'")
+            elif extra is not None:
+                extra[name] = reader.value()
+            else:
+                reader.value()
+            if reader.skip() != ',':
+                break
+        if not reader.expect('}'):
+            raise reader.error("Expected ',' or '}'")
+    if not found:
+        raise KeyError(key)
+
+
+def load_records(path, key, extra=None, chunk_size=CHUNK_SIZE):
+    """Return the list of records stored under `key` in a JSON data file, read with `iter_records`."""
+    return list(iter_records(path, key, extra, chunk_size))
@@ -0,0 +1,182 @@
+"""Request timing instrumentation exposed in the Prometheus text format, and sampled request profiling."""
+import cProfile
+import os
+import random
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+
+# Upper bounds, in seconds, of the latency histogram buckets
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+def format_labels(names, values):
+    """Format label names and values as a Prometheus label set."""
+    pairs = []
+    for name, value in zip(names, values):
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pairs.append(f'{name}="{value}"')
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Histogram:
+    """
+    Latency histogram with one series per combination of label values.
+
+    Args:
+        name (str): Metric name.
+        description (str): Help text.
+        label_names (tuple): Names of the labels identifying a series.
+        buckets (tuple): Increasing upper bounds of the buckets.
+    """
+
+    def __init__(self, name, description, label_names, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.description = description
+        self.label_names = label_names
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def observe(self, labels, value):
+        """Record a value for the series identified by the `labels` values."""
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # Counts per bucket plus the +Inf bucket, then the sum of the observed values
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def render(self):
+        """Return the histogram in the Prometheus text format."""
+        lines = [f'# HELP {self.name} {self.description}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = {labels: list(values) for labels, values in self._series.items()}
+        for labels, values in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), values):
+                cumulative += count
+                bucket_labels = format_labels(self.label_names + ('le',), labels + (bound,))
+                lines.append(f'{self.name}_bucket{bucket_labels} {cumulative}')
+            series_labels = format_labels(self.label_names, labels)
+            lines.append(f'{self.name}_sum{series_labels} {values[-1]}')
+            lines.append(f'{self.name}_count{series_labels} {cumulative}')
+        return lines
+
+
+class Counter:
+    """
+    Monotonic counter with one series per combination of label values.
+
+    Args:
+        name (str): Metric name, ending with _total.
+        description (str): Help text.
+        label_names (tuple): Names of the labels identifying a series.
+    """
+
+    def __init__(self, name, description, label_names=()):
+        self.name = name
+        self.description = description
+        self.label_names = label_names
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def inc(self, labels=(), amount=1):
+        """Add `amount` to the series identified by the `labels` values."""
+        with self._lock:
+            self._series[labels] = self._series.get(labels, 0) + amount
+
+    def render(self):
+        """Return the counter in the Prometheus text format."""
+        lines = [f'# HELP {self.name} {self.description}', f'# TYPE {self.name} counter']
+        with self._lock:
+            series = dict(self._series)
+        for labels, value in sorted(series.items()):
+            lines.append(f'{self.name}{format_labels(self.label_names, labels)} {value}')
+        return lines
+
+
+class Metrics:
+    """
+    Collects per-route request latencies, the time spent in parts of each request, and request counts.
+
+    Additional values computed at scrape time, such as cache counters, can be registered with
+    `add_collector`.
+    """
+
+    def __init__(self):
+        self.requests = Histogram(
+            'gudlft_request_duration_seconds', 'Request latency by route.', ('route', 'method'))
+        self.spans = Histogram(
+            'gudlft_request_span_seconds', 'Time spent in each part of a request, by route.', ('route', 'span'))
+        self.responses = Counter(
+            'gudlft_responses_total', 'Responses sent, by route and status code.', ('route', 'status'))
+        self._collectors = []
+
+    @contextmanager
+    def span(self, route, name):
+        """Time the enclosed block as the `name` part of a request to `route`."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.spans.observe((route, name), time.perf_counter() - started)
+
+    def observe_request(self, route, method, status, seconds):
+        """Record a finished request."""
+        self.requests.observe((route, method), seconds)
+        self.responses.inc((route, status))
+
+    def add_collector(self, collect):
+        """Register a callable returning extra lines of Prometheus text at every scrape."""
+        self._collectors.append(collect)
+
+    def render(self):
+        """Return every metric in the Prometheus text format."""
+        lines = self.requests.render() + self.spans.render() + self.responses.render()
+        for collect in self._collectors:
+            lines.extend(collect())
+        return '\n'.join(lines) + '\n'
+
+
+class RequestProfiler:
+    """
+    Profiles a random sample of requests with cProfile and dumps the stats of each to its own file.
+
+    The sample rate and output directory are read from the configuration on every request, so
+    profiling can be switched on and off at runtime. A request is not profiled while another
+    thread is, as only one profiler can be active at a time.
+
+    Args:
+        config (dict): Application configuration providing `PROFILE_SAMPLE_RATE` (0 disables
+                       profiling, 1 profiles every request) and `PROFILE_DIR`.
+    """
+
+    def __init__(self, config):
+        self.config = config
+
+    def start(self):
+        """Return an enabled profiler if the current request is sampled, otherwise None."""
+        rate = self.config['PROFILE_SAMPLE_RATE']
+        if rate <= 0 or random.random() >= rate:
+            return None
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Another profiler is already active
+            return None
+        return profile
+
+    def stop(self, profile, route):
+        """Disable the profiler and dump its stats, returning the path of the stats file."""
+        profile.disable()
+        directory = self.config['PROFILE_DIR']
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f'{route}-{time.time_ns()}-{os.getpid()}-{threading.get_ident()}.prof')
+        profile.dump_stats(path)
+        return path
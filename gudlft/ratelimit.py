@@ -0,0 +1,108 @@
+"""Rate limiting and admission control, protecting workers from bursts of requests."""
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+
+class Overloaded(Exception):
+    """Raised when a request cannot be admitted because too many are running and waiting already."""
+
+
+class TokenBucketLimiter:
+    """
+    Token buckets limiting the request rate of each key, such as a client address, a club or an email.
+
+    Each bucket holds up to `burst` tokens and is refilled at `rate` tokens per second; a request
+    takes one token from the bucket of every key it is made under. Buckets are kept in an LRU of
+    `max_keys` entries, so memory stays bounded however many keys are seen: an evicted key starts
+    again with a full bucket, which only lets a client that stayed idle long enough to be evicted
+    through.
+
+    Args:
+        rate (float): Tokens added to a bucket per second; 0 disables the limiter.
+        burst (int): Capacity of a bucket, the requests a key can make at once.
+        max_keys (int): Number of buckets kept.
+        clock (callable): Returns the current time in seconds.
+    """
+
+    def __init__(self, rate, burst, max_keys=10000, clock=time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._buckets = OrderedDict()
+
+    def acquire(self, keys):
+        """
+        Take a token from the bucket of each key, only if every bucket has one.
+
+        Args:
+            keys (list): Hashable keys the request is made under.
+
+        Returns:
+            float: 0 when the request is allowed, otherwise the seconds until it would be.
+        """
+        if not self.rate:
+            return 0
+        now = self.clock()
+        with self._lock:
+            levels = []
+            for key in keys:
+                tokens, updated = self._buckets.get(key, (self.burst, now))
+                levels.append(min(self.burst, tokens + (now - updated) * self.rate))
+            wait = max([(1 - tokens) / self.rate for tokens in levels if tokens < 1], default=0)
+            for key, tokens in zip(keys, levels):
+                self._buckets[key] = (tokens if wait else tokens - 1, now)
+                self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return wait
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+class AdmissionControl:
+    """
+    Caps the number of requests running at once, with a bounded queue of waiting ones.
+
+    A request arriving while `max_active` are running waits for one of them to finish, unless
+    `max_waiting` requests are waiting already. It is then refused at once, as is a request that
+    waited longer than `timeout`, so a burst fails fast instead of piling up on the workers.
+
+    Args:
+        max_active (int): Requests running at once.
+        max_waiting (int): Requests waiting for a slot at once.
+        timeout (float): Seconds a request may wait for a slot.
+    """
+
+    def __init__(self, max_active, max_waiting, timeout):
+        self.max_active = max_active
+        self.max_waiting = max_waiting
+        self.timeout = timeout
+        self._condition = threading.Condition()
+        self.active = 0
+        self.waiting = 0
+
+    @contextmanager
+    def admit(self):
+        """Run the enclosed block once a slot is free, raising `Overloaded` when none can be had."""
+        with self._condition:
+            if self.active >= self.max_active:
+                if self.waiting >= self.max_waiting:
+                    raise Overloaded()
+                self.waiting += 1
+                try:
+                    if not self._condition.wait_for(lambda: self.active < self.max_active, self.timeout):
+                        raise Overloaded()
+                finally:
+                    self.waiting -= 1
+            self.active += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self.active -= 1
+                self._condition.notify()
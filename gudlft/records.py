@@ -0,0 +1,227 @@
+"""Compact typed records for clubs and competitions."""
+import itertools
+from collections.abc import Sequence
+from datetime import datetime
+
+
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def parse_date(value):
+    """Parse a competition date string as stored in the JSON files."""
+    # fromisoformat is much faster than strptime and parses the same values for dates written in DATE_FORMAT
+    if len(value) == 19 and value[10] == ' ':
+        return datetime.fromisoformat(value)
+    return datetime.strptime(value, DATE_FORMAT)
+
+
+class Record:
+    """
+    Base class of the club and competition records.
+
+    Records store their fields in slots, with numbers as integers, instead of dictionaries of
+    strings. They can still be read like the dictionaries of the JSON files: `record['points']`
+    returns the field stored under that JSON key. Keys not known to the record class are kept in
+    `extra`, so that `to_dict` gives back the loaded dictionary, numbers encoded as strings.
+
+    `FIELDS` maps the JSON keys to the attributes holding them, in the order they are written.
+    """
+
+    __slots__ = ('extra',)
+    FIELDS = {}
+    NUMBERS = ()
+
+    def __getitem__(self, key):
+        attribute = self.FIELDS.get(key)
+        if attribute is not None:
+            return getattr(self, attribute)
+        if self.extra is not None and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def __contains__(self, key):
+        return key in self.FIELDS or (self.extra is not None and key in self.extra)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __repr__(self):
+        return f'{type(self).__name__}({self.to_dict()!r})'
+
+    @staticmethod
+    def _extra(data, fields):
+        """Return the entries of `data` not stored in the record fields, or None."""
+        extra = {key: value for key, value in data.items() if key not in fields}
+        return extra or None
+
+    def replace(self, **changes):
+        """Return a copy of the record with the given attributes changed; the record itself is left untouched."""
+        record = object.__new__(type(self))
+        for attribute in Record.__slots__ + type(self).__slots__:
+            setattr(record, attribute, changes.get(attribute, getattr(self, attribute)))
+        return record
+
+    def to_dict(self):
+        """Return the dictionary written to the JSON files for this record."""
+        data = {key: getattr(self, attribute) for key, attribute in self.FIELDS.items()}
+        for key in self.NUMBERS:
+            data[key] = str(data[key])
+        if self.extra is not None:
+            data.update(self.extra)
+        return data
+
+
+class Club(Record):
+    """
+    A club, its points balance and the places it booked in each competition.
+
+    The booked places are the club's entries of the booking ledger, saved with the club under the
+    `bookings` key. They are None when the club booked nothing, sparing an empty dictionary per club.
+
+    Args:
+        name (str): Name of the club.
+        email (str): Email the club secretary logs in with.
+        points (int): Points available to book places.
+        extra (dict): Other fields of the club in the clubs file, or None.
+        booked (dict): Places booked so far, by competition name, or None.
+    """
+
+    __slots__ = ('name', 'email', 'points', 'booked')
+    FIELDS = {'name': 'name', 'email': 'email', 'points': 'points'}
+    NUMBERS = ('points',)
+    LEDGER_KEY = 'bookings'
+
+    def __init__(self, name, email, points, extra=None, booked=None):
+        self.name = name
+        self.email = email
+        self.points = points
+        self.extra = extra
+        self.booked = booked or None
+
+    @classmethod
+    def from_dict(cls, data):
+        """Build a club from its dictionary in the clubs file."""
+        extra = cls._extra(data, cls.FIELDS)
+        booked = None
+        if extra is not None and cls.LEDGER_KEY in extra:
+            booked = {name: int(places) for name, places in extra.pop(cls.LEDGER_KEY).items()}
+            extra = extra or None
+        return cls(data['name'], data['email'], int(data['points']), extra, booked)
+
+    def booked_places(self, competition_name):
+        """Return the number of places the club booked in a competition."""
+        return self.booked.get(competition_name, 0) if self.booked else 0
+
+    def to_dict(self):
+        data = super().to_dict()
+        if self.booked:
+            data[self.LEDGER_KEY] = dict(self.booked)
+        return data
+
+
+class Competition(Record):
+    """
+    A competition and the places left in it.
+
+    Args:
+        name (str): Name of the competition.
+        date (str): Date of the competition, as written in the competitions file.
+        places (int): Number of places left.
+        extra (dict): Other fields of the competition in the competitions file, or None.
+    """
+
+    __slots__ = ('name', 'date', 'starts_at', 'places')
+    FIELDS = {'name': 'name', 'date': 'date', 'numberOfPlaces': 'places'}
+    NUMBERS = ('numberOfPlaces',)
+
+    def __init__(self, name, date, places, extra=None):
+        self.name = name
+        self.date = date
+        self.starts_at = parse_date(date)
+        self.places = places
+        self.extra = extra
+
+    @classmethod
+    def from_dict(cls, data):
+        """Build a competition from its dictionary in the competitions file."""
+        return cls(data['name'], data['date'], int(data['numberOfPlaces']), cls._extra(data, cls.FIELDS))
+
+
+class RecordList(Sequence):
+    """
+    Immutable list of records, held in chunks so that copies with a few records replaced share the others.
+
+    `replace` copies the chunks holding the replaced records and the tuple of chunks, so a copy
+    costs the same however many records there are, where copying a list copies every reference.
+
+    Args:
+        records (iterable): The records, in order.
+    """
+
+    CHUNK_SIZE = 512
+
+    def __init__(self, records=(), _chunks=None, _length=None):
+        if _chunks is None:
+            records = list(records)
+            _chunks = tuple(tuple(records[i:i + self.CHUNK_SIZE]) for i in range(0, len(records), self.CHUNK_SIZE))
+            _length = len(records)
+        self._chunks = _chunks
+        self._length = _length
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._length))]
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError('record index out of range')
+        chunk, offset = divmod(index, self.CHUNK_SIZE)
+        return self._chunks[chunk][offset]
+
+    def __iter__(self):
+        return itertools.chain.from_iterable(self._chunks)
+
+    def __reversed__(self):
+        for chunk in reversed(self._chunks):
+            yield from reversed(chunk)
+
+    def __eq__(self, other):
+        if not isinstance(other, Sequence) or isinstance(other, str):
+            return NotImplemented
+        return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+
+    def __repr__(self):
+        return f'RecordList({list(self)!r})'
+
+    def replace(self, records):
+        """
+        Return a copy with some records replaced.
+
+        Args:
+            records (dict): New records, by position.
+        """
+        chunks = list(self._chunks)
+        changed = {}
+        for position, record in records.items():
+            chunk, offset = divmod(position, self.CHUNK_SIZE)
+            if chunk not in changed:
+                changed[chunk] = list(chunks[chunk])
+            changed[chunk][offset] = record
+        for chunk, values in changed.items():
+            chunks[chunk] = tuple(values)
+        return RecordList(_chunks=tuple(chunks), _length=self._length)
+
+
+def to_json(record):
+    """Serialize records for `json.dump`, which calls this for the objects it cannot encode."""
+    if isinstance(record, Record):
+        return record.to_dict()
+    if isinstance(record, RecordList):
+        return list(record)
+    raise TypeError(f'Object of type {type(record).__name__} is not JSON serializable')
@@ -0,0 +1,390 @@
+"""In-memory registry of clubs and competitions."""
+import hashlib
+import itertools
+import threading
+from bisect import bisect_left
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime
+
+from gudlft.records import Club, Competition, RecordList
+
+
+def normalize_email(email):
+    """Return an email as it is indexed: without surrounding spaces, and case-folded."""
+    return email.strip().casefold()
+
+
+class EmailIndex:
+    """
+    Positions of the clubs by normalized email, with an LRU of the emails recently not found.
+
+    Emails are matched whatever their case and surrounding spaces; when two clubs share an email
+    once normalized, the first one is found. Emails never change, so an index is built once and
+    shared by every snapshot of a registry. Emails that were not found are remembered as they were
+    typed, in an LRU of `max_misses` entries, so a login retried with the same unknown email is
+    refused without normalizing it again, and memory stays bounded however many are tried.
+
+    Args:
+        clubs (list): The clubs to index.
+        max_misses (int): Number of unknown emails remembered.
+    """
+
+    def __init__(self, clubs, max_misses=1024):
+        self._positions = {}
+        for position, club in enumerate(clubs):
+            self._positions.setdefault(normalize_email(club.email), position)
+        self.max_misses = max_misses
+        self._misses = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def position(self, email):
+        """Return the position of the club registered with this email, or None."""
+        # A membership test is atomic, so known emails are found without taking the lock
+        if email in self._misses:
+            with self._lock:
+                if email in self._misses:
+                    self._misses.move_to_end(email)
+                self.hits += 1
+            return None
+        position = self._positions.get(normalize_email(email))
+        if position is None:
+            with self._lock:
+                self.misses += 1
+                self._misses[email] = True
+                while len(self._misses) > self.max_misses:
+                    self._misses.popitem(last=False)
+        return position
+
+    def __len__(self):
+        return len(self._misses)
+
+
+def processed_competition(competition, is_past):
+    """Return a competition as listed on the summary page, flagged with 'is_past'."""
+    return {'name': competition.name, 'date': competition.date, 'numberOfPlaces': competition.places, 'is_past': is_past}
+
+
+def balance_digest(club):
+    """Return a digest of the name and points of a club, the same in every process."""
+    return int.from_bytes(hashlib.blake2b(f'{club.name}\0{club.points}'.encode(), digest_size=16).digest(), 'big')
+
+
+class RegistrySnapshot:
+    """
+    One immutable version of the clubs and competitions, indexed for constant-time lookups.
+
+    A snapshot is never modified once published: bookings publish a new snapshot holding new
+    copies of the records they debit, sharing every other record, the chunks of the record lists
+    holding no debited record, and the indexes with the previous one, so publishing costs the same
+    however many clubs and competitions there are. Requests that read a snapshot therefore see consistent balances throughout,
+    without taking any lock, while bookings proceed.
+
+    Competitions are sorted from the most recent to the oldest. The booking ledger is held by the
+    clubs (`Club.booked`) and indexed by competition, so the places booked by a club, and the
+    clubs booked in a competition, are both found without scanning the bookings.
+    """
+
+    BALANCES_MODULUS = 2 ** 128
+
+    def __init__(self, version, clubs, competitions, _indexes=None, _booked_by_competition=None, _balances=None):
+        self.version = version
+        self.clubs = clubs if isinstance(clubs, RecordList) else RecordList(clubs)
+        self.competitions = competitions if isinstance(competitions, RecordList) else RecordList(competitions)
+        if _indexes is None:
+            # Names, emails and dates never change, so these indexes are shared by every later snapshot:
+            # records are found by position in the lists, and publishing a snapshot builds no index
+            _indexes = (
+                {club.name: position for position, club in enumerate(self.clubs)},
+                {comp.name: position for position, comp in enumerate(self.competitions)},
+                [comp.starts_at for comp in reversed(self.competitions)],
+                EmailIndex(self.clubs))
+        self._club_positions, self._positions, self._ascending_dates, self.emails = _indexes
+        if _booked_by_competition is None:
+            # Places booked in each competition, by club name, held at the position of the competition
+            booked = [None] * len(self.competitions)
+            for club in self.clubs:
+                for name, places in (club.booked or {}).items():
+                    position = self._positions.get(name)
+                    if position is not None:
+                        if booked[position] is None:
+                            booked[position] = {}
+                        booked[position][club.name] = places
+            _booked_by_competition = RecordList(booked)
+        self._booked_by_competition = _booked_by_competition
+        self._balances = _balances
+        self._processed = None
+
+    def with_records(self, version, clubs, competitions):
+        """
+        Return the snapshot following this one, with some records replaced.
+
+        Args:
+            version (int): Version of the new snapshot.
+            clubs (dict): New club records, by name.
+            competitions (dict): New competition records, by name.
+        """
+        club_records = {}
+        # Only the competition entries of the ledger that changed are copied
+        booked = {}
+        for name, club in clubs.items():
+            position = self._club_positions[name]
+            previous = self.clubs[position]
+            club_records[position] = club
+            for competition_name in set(club.booked or ()) | set(previous.booked or ()):
+                places = club.booked_places(competition_name)
+                competition_position = self._positions.get(competition_name)
+                if places == previous.booked_places(competition_name) or competition_position is None:
+                    continue
+                if competition_position not in booked:
+                    booked[competition_position] = dict(self._booked_by_competition[competition_position] or ())
+                if places:
+                    booked[competition_position][name] = places
+                else:
+                    booked[competition_position].pop(name, None)
+        competition_records = {self._positions[name]: comp for name, comp in competitions.items()}
+        balances = self._balances
+        if balances is not None:
+            # Only the digests of the debited clubs change
+            for position, club in club_records.items():
+                balances += balance_digest(club) - balance_digest(self.clubs[position])
+            balances %= self.BALANCES_MODULUS
+        return RegistrySnapshot(
+            version, self.clubs.replace(club_records), self.competitions.replace(competition_records),
+            (self._club_positions, self._positions, self._ascending_dates, self.emails),
+            self._booked_by_competition.replace(booked), balances)
+
+    @property
+    def balances_tag(self):
+        """
+        Digest of the names and points of all the clubs, as shown on the points board.
+
+        Unlike `version`, it is the same in every process holding the same balances, and across
+        restarts. It is computed from every club for the first snapshot it is read from, then
+        updated from the debited clubs only by the snapshots following it.
+        """
+        if self._balances is None:
+            self._balances = sum(balance_digest(club) for club in self.clubs) % self.BALANCES_MODULUS
+        return f'{self._balances:032x}'
+
+    def club_by_email(self, email):
+        """Return the club registered with this email, whatever its case and surrounding spaces, or None."""
+        position = self.emails.position(email)
+        return self.clubs[position] if position is not None else None
+
+    def club_by_name(self, name):
+        """Return the club with this name, or None."""
+        position = self._club_positions.get(name)
+        return self.clubs[position] if position is not None else None
+
+    def competition_by_name(self, name):
+        """Return the competition with this name, or None."""
+        position = self._positions.get(name)
+        return self.competitions[position] if position is not None else None
+
+    def club_bookings(self, name):
+        """Return the places booked by a club, by competition name; the dictionary must not be modified."""
+        club = self.club_by_name(name)
+        return (club.booked or {}) if club is not None else {}
+
+    def competition_bookings(self, name):
+        """Return the places booked in a competition, by club name; the dictionary must not be modified."""
+        position = self._positions.get(name)
+        return (self._booked_by_competition[position] or {}) if position is not None else {}
+
+    def upcoming_count(self, now):
+        """
+        Return how many competitions take place at or after `now`.
+
+        Those competitions come first in the date-ordered `competitions` list, the past ones follow.
+        """
+        return len(self._ascending_dates) - bisect_left(self._ascending_dates, now)
+
+    def processed_competitions(self, now=None):
+        """
+        Return the competitions flagged with 'is_past', as listed on the summary page.
+
+        The list is cached and only rebuilt when a competition moved to the past. It is shared
+        between requests and must not be modified.
+        """
+        upcoming = self.upcoming_count(now or datetime.now())
+        cached = self._processed
+        if cached is None or cached[0] != upcoming:
+            cached = (upcoming, [
+                processed_competition(comp, position >= upcoming) for position, comp in enumerate(self.competitions)])
+            self._processed = cached
+        return cached[1]
+
+    def competition_page(self, cursor=None, size=50, now=None):
+        """
+        Return one page of the processed competitions, upcoming ones first.
+
+        Only the competitions of the page are processed, each flagged as past from its position,
+        so a page costs the same however many competitions there are.
+
+        Args:
+            cursor (str): Name of the last competition of the previous page, None for the first page.
+                          An unknown cursor also starts from the first page.
+            size (int): Maximum number of competitions on the page.
+            now (datetime): Time the competitions are classified against.
+
+        Returns:
+            tuple: The page of competitions and the cursor of the next page, None on the last page.
+        """
+        upcoming = self.upcoming_count(now or datetime.now())
+        position = self._positions.get(cursor)
+        start = position + 1 if position is not None else 0
+        end = min(start + size, len(self.competitions))
+        page = [
+            processed_competition(self.competitions[position], position >= upcoming)
+            for position in range(start, end)]
+        next_cursor = page[-1]['name'] if page and end < len(self.competitions) else None
+        return page, next_cursor
+
+
+class RegistryUpdate:
+    """
+    Bookings applied to new copies of the records, published together when the update ends.
+
+    `club` and `competition` return the latest version of a record, including the bookings
+    already applied by this update, so bookings of the same club or competition add up.
+    `bookings` lists the applied bookings with the debited records.
+    """
+
+    def __init__(self, registry):
+        self._registry = registry
+        self.clubs = {}
+        self.competitions = {}
+        self.bookings = []
+
+    def club(self, club):
+        """Return the latest version of a club."""
+        updated = self.clubs.get(club.name)
+        return updated if updated is not None else self._registry.club_by_name(club.name)
+
+    def competition(self, competition):
+        """Return the latest version of a competition."""
+        updated = self.competitions.get(competition.name)
+        return updated if updated is not None else self._registry.competition_by_name(competition.name)
+
+    def book(self, club, competition, places):
+        """
+        Debit a booking from copies of the latest club and competition records, and return them.
+
+        The places are added to the club's entry of the booking ledger for the competition.
+        """
+        club = self.club(club)
+        competition = self.competition(competition)
+        booked = dict(club.booked or ())
+        booked[competition.name] = booked.get(competition.name, 0) + places
+        if not booked[competition.name]:
+            del booked[competition.name]
+        club = self.clubs[club.name] = club.replace(points=club.points - places, booked=booked or None)
+        competition = self.competitions[competition.name] = competition.replace(places=competition.places - places)
+        self.bookings.append((club, competition, places))
+        return club, competition
+
+
+class Registry:
+    """
+    Holds the loaded clubs and competitions as a series of immutable snapshots.
+
+    Clubs and competitions are held as `Club` and `Competition` records, built from the
+    dictionaries they are given. Readers take the current `RegistrySnapshot` with `snapshot()`, a
+    single attribute read with no lock, and use it for the whole request. Bookings are applied by
+    `update` to copies of the records they debit, and the next snapshot is published once they all
+    succeeded: readers never see a half-applied batch, and a refused batch changes nothing.
+
+    Concurrent updates must touch different clubs and competitions, which the booking engine
+    guarantees with its per-record locks; publishing merges each update into the latest snapshot.
+
+    Lookups made on the registry itself read the latest snapshot. `version` is bumped by every
+    published update, so caches built from the registry can tell when they are stale, and the
+    callables in `listeners` are called with the club and competition of every booking.
+
+    Args:
+        clubs (iterable): Club records, or dictionaries as loaded from the clubs file.
+        competitions (iterable): Competition records, or dictionaries as loaded from the competitions file.
+
+    Both can be iterators, such as those returned by the streaming loader.
+    """
+
+    def __init__(self, clubs, competitions):
+        # next() on a count is atomic, so concurrent bookings always get distinct versions
+        self._versions = itertools.count(1)
+        self._publish_lock = threading.Lock()
+        self.listeners = []
+        clubs = [club if isinstance(club, Club) else Club.from_dict(club) for club in clubs]
+        # Dates are parsed once, by the records
+        competitions = [comp if isinstance(comp, Competition) else Competition.from_dict(comp) for comp in competitions]
+        competitions.sort(key=lambda c: c.starts_at, reverse=True)
+        self._snapshot = RegistrySnapshot(0, clubs, competitions)
+
+    def snapshot(self):
+        """Return the current snapshot of the clubs and competitions."""
+        return self._snapshot
+
+    @property
+    def version(self):
+        return self._snapshot.version
+
+    @property
+    def clubs(self):
+        return self._snapshot.clubs
+
+    @property
+    def competitions(self):
+        return self._snapshot.competitions
+
+    def club_by_email(self, email):
+        """Return the club registered with this email, or None."""
+        return self._snapshot.club_by_email(email)
+
+    def club_by_name(self, name):
+        """Return the club with this name, or None."""
+        return self._snapshot.club_by_name(name)
+
+    def competition_by_name(self, name):
+        """Return the competition with this name, or None."""
+        return self._snapshot.competition_by_name(name)
+
+    def upcoming_count(self, now):
+        """Return how many competitions take place at or after `now`."""
+        return self._snapshot.upcoming_count(now)
+
+    def processed_competitions(self, now=None):
+        """Return the competitions of the latest snapshot flagged with 'is_past'; see `RegistrySnapshot`."""
+        return self._snapshot.processed_competitions(now)
+
+    def competition_page(self, cursor=None, size=50, now=None):
+        """Return one page of the processed competitions of the latest snapshot; see `RegistrySnapshot`."""
+        return self._snapshot.competition_page(cursor, size, now)
+
+    @contextmanager
+    def update(self):
+        """
+        Apply bookings and publish them as a new snapshot.
+
+        Yields a `RegistryUpdate`; its bookings are published when the block exits normally, and
+        dropped if it raises. An update without bookings publishes nothing.
+        """
+        update = RegistryUpdate(self)
+        yield update
+        if not update.bookings:
+            return
+        with self._publish_lock:
+            self._snapshot = self._snapshot.with_records(next(self._versions), update.clubs, update.competitions)
+        for club, competition, _ in update.bookings:
+            for listener in self.listeners:
+                listener(club, competition)
+
+    def book(self, club, competition, places):
+        """
+        Debit a booking from the club's points and the competition's places.
+
+        The records are not modified: the new snapshot holds debited copies, which are returned.
+        """
+        with self.update() as update:
+            return update.book(club, competition, places)
@@ -0,0 +1,134 @@
+"""Crash-safe snapshots of the clubs and competitions files."""
+import json
+import logging
+import os
+import time
+
+from gudlft.loader import iter_records, load_records
+from gudlft.records import to_json
+
+
+logger = logging.getLogger(__name__)
+
+# Suffix of the complete new version of a data file, waiting to replace it
+PENDING_SUFFIX = '.pending'
+
+
+def fsync_directory(path):
+    """Make the renames done in the directory of `path` durable."""
+    fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def write_pending(path, data):
+    """Durably write JSON data next to `path`, ready to replace it. Returns the path written."""
+    pending_path = path + PENDING_SUFFIX
+    with open(pending_path, 'w') as f:
+        json.dump(data, f, indent=4, default=to_json)
+        f.flush()
+        os.fsync(f.fileno())
+    return pending_path
+
+
+def write_atomic(path, data):
+    """
+    Replace a JSON file with new data.
+
+    The data is written and fsynced to a separate file renamed over `path`, so readers and a
+    restart after a crash see either the previous content or the new one, never a partial file.
+    """
+    os.replace(write_pending(path, data), path)
+    fsync_directory(path)
+
+
+def read_list(path, key, extra, record_type=None):
+    """Read the records of a file, built as `record_type` records when one is given."""
+    if record_type is None:
+        return load_records(path, key, extra)
+    return [record_type.from_dict(item) for item in iter_records(path, key, extra)]
+
+
+def read_pair(clubs_path, competitions_path, retries=5, types=None):
+    """
+    Read the clubs and competitions files of the same snapshot generation.
+
+    Both files record the generation of the snapshot they belong to. A reader running between the
+    two renames of `write_pair` sees different generations; it reads again. A file without a
+    generation was written by another program, such as an operator editing the data: it is read
+    along with the other file as it is, with a warning.
+
+    Args:
+        clubs_path (str): Path of the clubs file.
+        competitions_path (str): Path of the competitions file.
+        retries (int): Number of times the files are read again when their generations differ.
+        types (tuple): Record classes building each club and competition with `from_dict` as it is
+                       read, so the dictionaries decoded from the files are never all held at once.
+
+    Returns:
+        tuple: The club and competition lists, and their generation.
+
+    Raises:
+        ValueError: If the files still belong to different generations after `retries` attempts.
+    """
+    for attempt in range(retries + 1):
+        clubs_extra, competitions_extra = {}, {}
+        clubs = read_list(clubs_path, 'clubs', clubs_extra, types and types[0])
+        competitions = read_list(competitions_path, 'competitions', competitions_extra, types and types[1])
+        clubs_generation = clubs_extra.get('generation')
+        competitions_generation = competitions_extra.get('generation')
+        if clubs_generation is None or competitions_generation is None:
+            if clubs_generation != competitions_generation:
+                edited = clubs_path if clubs_generation is None else competitions_path
+                logger.warning('%s has no snapshot generation, it was edited outside of the app: reading it as it is', edited)
+            return clubs, competitions, clubs_generation or competitions_generation or 0
+        if clubs_generation == competitions_generation:
+            return clubs, competitions, clubs_generation
+        time.sleep(0.01 * (attempt + 1))
+    raise ValueError(f'{clubs_path} and {competitions_path} belong to different snapshots')
+
+
+def write_pair(clubs_path, competitions_path, clubs, competitions, generation):
+    """
+    Atomically replace both files with a snapshot of the given generation.
+
+    Both new files are written and fsynced before either replaces the previous one, so a crash
+    leaves either the previous snapshot, or a pending clubs file completing the new one, which
+    `recover_pair` renames into place.
+    """
+    clubs_pending = write_pending(clubs_path, {'clubs': clubs, 'generation': generation})
+    competitions_pending = write_pending(competitions_path, {'competitions': competitions, 'generation': generation})
+    os.replace(competitions_pending, competitions_path)
+    os.replace(clubs_pending, clubs_path)
+    fsync_directory(clubs_path)
+    if os.path.dirname(os.path.abspath(clubs_path)) != os.path.dirname(os.path.abspath(competitions_path)):
+        fsync_directory(competitions_path)
+
+
+def recover_pair(clubs_path, competitions_path):
+    """
+    Finish or discard a `write_pair` interrupted by a crash.
+
+    If the competitions file was replaced but not the clubs file, the pending clubs file of the
+    same generation is renamed into place. Pending files of a snapshot that replaced neither file
+    are removed.
+    """
+    clubs_pending = clubs_path + PENDING_SUFFIX
+    competitions_pending = competitions_path + PENDING_SUFFIX
+    if os.path.exists(clubs_pending) and not os.path.exists(competitions_pending):
+        clubs_extra, competitions_extra = {}, {}
+        load_records(competitions_path, 'competitions', competitions_extra)
+        try:
+            load_records(clubs_pending, 'clubs', clubs_extra)
+        except (ValueError, KeyError):
+            # Never completed, so the competitions file was never replaced
+            clubs_extra = {}
+        if clubs_extra and clubs_extra.get('generation') == competitions_extra.get('generation', 0):
+            os.replace(clubs_pending, clubs_path)
+            fsync_directory(clubs_path)
+            return
+    for path in (clubs_pending, competitions_pending):
+        if os.path.exists(path):
+            os.remove(path)
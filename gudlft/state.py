@@ -0,0 +1,153 @@
+"""Services and data of one application instance, kept in `app.extensions`."""
+import threading
+
+from gudlft.assets import load_manifest
+from gudlft.booking import BookingEngine
+from gudlft.cache import FragmentCache, PointsBoard
+from gudlft.compression import ResponseCompressor
+from gudlft.metrics import Counter, Metrics, RequestProfiler
+from gudlft.ratelimit import AdmissionControl, TokenBucketLimiter
+from gudlft.registry import Registry
+from gudlft.storage import create_storage
+
+
+class AppState:
+    """
+    The storage backend, registry, caches, limits and metrics of one application.
+
+    Caches, limits and metrics are created with the app. The storage backend, the registry and the
+    booking engine are only created on first access: creating an app reads no data, and the first
+    request needing the clubs and competitions loads them, concurrent requests waiting for it.
+    `warm_up` loads them in the background instead, ahead of the first request.
+
+    Args:
+        config (dict): Application configuration.
+        static_folder (str): Folder of the static assets, holding the manifest of the built ones.
+    """
+
+    LAZY = ('storage', 'registry', 'booking_engine')
+
+    def __init__(self, config, static_folder):
+        self.config = config
+        self.points_board = PointsBoard()
+        self.fragments = FragmentCache()
+        self.metrics = Metrics()
+        self.metrics.add_collector(self.cache_metrics)
+        self.profiler = RequestProfiler(config)
+        self.compressor = ResponseCompressor(config['COMPRESS_MIN_SIZE'], config['COMPRESS_LEVEL'])
+        self.rate_limiter = TokenBucketLimiter(
+            config['RATE_LIMIT_PER_SECOND'], config['RATE_LIMIT_BURST'], config['RATE_LIMIT_MAX_KEYS'])
+        self.admission = AdmissionControl(
+            config['BOOKING_MAX_CONCURRENCY'], config['BOOKING_MAX_QUEUE'], config['BOOKING_QUEUE_TIMEOUT'])
+        self.rejections = Counter(
+            'gudlft_rejected_requests_total', 'Requests refused by rate limiting or admission control, by route and reason.',
+            ('route', 'reason'))
+        self.metrics.add_collector(self.rejections.render)
+        # Built static assets, by source path; url_for('static') links to them once `flask build-assets` has been run
+        self.asset_manifest = load_manifest(static_folder)
+        self.built_assets = set(self.asset_manifest.values())
+        self._load_lock = threading.Lock()
+
+    def __getattr__(self, name):
+        # Only called while the attribute is missing, loaded attributes are then read like any other
+        if name in self.LAZY:
+            self.load()
+            return self.__dict__[name]
+        raise AttributeError(name)
+
+    @property
+    def loaded(self):
+        """Whether the clubs and competitions have been loaded."""
+        return 'registry' in self.__dict__
+
+    def load(self):
+        """Open the storage backend and load the clubs and competitions, unless it is done already."""
+        with self._load_lock:
+            if self.loaded:
+                return
+            storage = create_storage(self.config)
+            # Index clubs and competitions; competitions are kept sorted from most recent to oldest
+            registry = Registry(*storage.load())
+            storage.bind(registry)
+            self.storage = storage
+            self.use_registry(registry, storage)
+
+    def refresh(self):
+        """
+        Pick up the changes other processes made to the stored data, once it is loaded.
+
+        Bookings are applied to the registry; data replaced as a whole, such as by an import, is
+        loaded again into a new registry.
+        """
+        if not self.loaded or not self.storage.refresh(self.registry):
+            return
+        with self._load_lock:
+            # Another request may have reloaded it while this one waited
+            if self.storage.refresh(self.registry):
+                registry = Registry(*self.storage.load())
+                self.storage.bind(registry)
+                self.use_registry(registry, self.storage)
+
+    def use_registry(self, registry, storage=None):
+        """
+        Serve the clubs and competitions of a registry, booked through a new booking engine.
+
+        Args:
+            registry (Registry): The registry to serve.
+            storage (Storage): Backend checking bookings against shared data, if any (see `BookingEngine`).
+        """
+        registry.listeners.append(self.invalidate_fragments)
+        self.booking_engine = BookingEngine(registry, storage)
+        # Set last: `loaded` is only true once everything is in place
+        self.registry = registry
+
+    def warm_up(self):
+        """Load the clubs and competitions in a background thread, returning the thread."""
+        thread = threading.Thread(target=self.load, name='gudlft-warm-up', daemon=True)
+        thread.start()
+        return thread
+
+    def close(self):
+        """Release the files and connections held by the storage backend, if it was opened."""
+        storage = self.__dict__.get('storage')
+        if storage is not None:
+            storage.close()
+
+    def invalidate_fragments(self, club, competition):
+        """Drop the cached rows showing the club and competition of a booking."""
+        self.fragments.invalidate(('club', club['name']))
+        self.fragments.invalidate(('competition', competition['name']))
+
+    def cache_metrics(self):
+        """Return the fragment, compression and unknown email cache counters in the Prometheus text format."""
+        stats = self.fragments.stats()
+        lines = [
+            '# HELP gudlft_fragment_cache_hits_total Rendered rows served from the fragment cache.',
+            '# TYPE gudlft_fragment_cache_hits_total counter',
+            f"gudlft_fragment_cache_hits_total {stats['hits']}",
+            '# HELP gudlft_fragment_cache_misses_total Rows rendered because they were not cached.',
+            '# TYPE gudlft_fragment_cache_misses_total counter',
+            f"gudlft_fragment_cache_misses_total {stats['misses']}",
+            '# HELP gudlft_fragment_cache_entries Rows and tables held by the fragment cache.',
+            '# TYPE gudlft_fragment_cache_entries gauge',
+            f"gudlft_fragment_cache_entries{{kind=\"fragment\"}} {stats['fragments']}",
+            f"gudlft_fragment_cache_entries{{kind=\"table\"}} {stats['tables']}",
+            '# HELP gudlft_compression_cache_hits_total Responses sent with a body compressed for an earlier request.',
+            '# TYPE gudlft_compression_cache_hits_total counter',
+            f"gudlft_compression_cache_hits_total {self.compressor.hits}",
+            '# HELP gudlft_compression_cache_misses_total Tagged responses compressed because they were not cached.',
+            '# TYPE gudlft_compression_cache_misses_total counter',
+            f"gudlft_compression_cache_misses_total {self.compressor.misses}",
+        ]
+        # Reading the metrics must not load the data
+        if self.loaded:
+            emails = self.registry.snapshot().emails
+            lines += [
+                '# HELP gudlft_unknown_email_cache_hits_total Logins refused with an email remembered as unknown.',
+                '# TYPE gudlft_unknown_email_cache_hits_total counter',
+                f"gudlft_unknown_email_cache_hits_total {emails.hits}",
+                '# HELP gudlft_unknown_email_cache_misses_total Logins with an email looked up and not found.',
+                '# TYPE gudlft_unknown_email_cache_misses_total counter',
+                f"gudlft_unknown_email_cache_misses_total {emails.misses}",
+            ]
+        return lines
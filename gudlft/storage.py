@@ -0,0 +1,422 @@
+"""Storage backends holding the clubs and competitions between restarts."""
+import os
+import sqlite3
+import threading
+
+from gudlft.group_commit import GroupCommitter
+from gudlft.journal import BookingJournal
+from gudlft.loader import load_records
+from gudlft.records import Club, Competition
+from gudlft.snapshot import read_pair, recover_pair, write_pair
+
+
+class Storage:
+    """
+    Base storage backend.
+
+    Bookings are checked and applied to the in-memory registry, then handed to `persist_bookings`
+    once the booking locks are released. Backends shared between processes override `book` to
+    check and apply bookings against the shared state instead.
+
+    Bookings are passed as lists of (club, competition, places) tuples, applied all or nothing.
+
+    When `group_commit` is set, the bookings persisted by concurrent requests are coalesced and
+    written together by `write_bookings`.
+    """
+
+    group_commit = None
+
+    def load(self):
+        """Return the club and competition records to build the registry from, as lists or iterators."""
+        return self.load_clubs(), self.load_competitions()
+
+    def load_clubs(self):
+        raise NotImplementedError
+
+    def load_competitions(self):
+        raise NotImplementedError
+
+    def save(self, clubs, competitions):
+        """Replace the stored clubs and competitions."""
+        raise NotImplementedError
+
+    def book(self, registry, bookings, check):
+        """
+        Check bookings and apply them to the registry, all or nothing.
+
+        Args:
+            registry (Registry): The registry serving the clubs and competitions.
+            bookings (list): The (club, competition, places) tuples to book, in order.
+            check (callable): Called with the position, club, competition and places of each booking
+                              once the previous ones are applied; raises if the booking is refused.
+
+        Returns:
+            list: The (club, competition, places) tuples booked, with the debited records.
+        """
+        # A refused booking leaves the update unpublished, so the ones before it are dropped too
+        with registry.update() as update:
+            for position, (club, competition, places) in enumerate(bookings):
+                club, competition = update.club(club), update.competition(competition)
+                check(position, club, competition, places)
+                update.book(club, competition, places)
+        return update.bookings
+
+    def persist_bookings(self, registry, bookings):
+        """Make bookings applied by `book` durable, returning once they are."""
+        if self.group_commit is None:
+            self.write_bookings(registry, bookings)
+        else:
+            self.group_commit.commit(registry, bookings)
+
+    def write_bookings(self, registry, bookings):
+        """Durably write bookings, in a single write."""
+        self.save(registry.clubs, registry.competitions)
+
+    def refresh(self, registry):
+        """
+        Bring the registry up to date with changes made by other processes.
+
+        Returns:
+            bool: True when the changes cannot be applied to the registry, which must then be loaded again.
+        """
+        return False
+
+    def bind(self, registry):
+        """Serve `load_clubs` and `load_competitions` from the registry, for backends that hold no separate copy."""
+
+    def signature(self):
+        """Return a value that changes when the stored clubs are modified outside of the registry."""
+        return None
+
+    def close(self):
+        """Release files and connections held by the backend."""
+
+
+class JSONStorage(Storage):
+    """
+    Stores clubs and competitions in the JSON files and rewrites both on every booking.
+
+    Both files are replaced atomically and tagged with the generation of the snapshot they belong
+    to, so a reader never sees a partial file and `load` always gets a matching pair, even after a
+    crash in the middle of a save (see `write_pair`).
+
+    Paths are read from the configuration on every access, so they can be changed at runtime.
+    Concurrent bookings are group committed, as set by `GROUP_COMMIT_WINDOW` (seconds, 0 by
+    default) and `GROUP_COMMIT_MAX_BATCH`: one rewrite persists all the bookings of a batch.
+
+    Args:
+        config (dict): Application configuration providing `CLUBS_DATA_PATH` and `COMPETITIONS_DATA_PATH`.
+    """
+
+    def __init__(self, config):
+        self.config = config
+        # Serializes full rewrites of the JSON files between concurrent bookings
+        self._save_lock = threading.Lock()
+        self._generation = 0
+        self.group_commit = GroupCommitter(
+            self.write_bookings,
+            window=config.get('GROUP_COMMIT_WINDOW', 0.0),
+            max_batch=config.get('GROUP_COMMIT_MAX_BATCH', 100))
+
+    def load(self):
+        clubs_path, competitions_path = self.config['CLUBS_DATA_PATH'], self.config['COMPETITIONS_DATA_PATH']
+        with self._save_lock:
+            recover_pair(clubs_path, competitions_path)
+            # Records are built as the files are read, without first holding every dictionary
+            clubs, competitions, self._generation = read_pair(clubs_path, competitions_path, types=(Club, Competition))
+        return clubs, competitions
+
+    def load_clubs(self):
+        return load_records(self.config['CLUBS_DATA_PATH'], 'clubs')
+
+    def load_competitions(self):
+        return load_records(self.config['COMPETITIONS_DATA_PATH'], 'competitions')
+
+    def signature(self):
+        stat = os.stat(self.config['CLUBS_DATA_PATH'])
+        return stat.st_mtime_ns, stat.st_ino, stat.st_size
+
+    def save(self, clubs, competitions):
+        with self._save_lock:
+            self._generation += 1
+            write_pair(self.config['CLUBS_DATA_PATH'], self.config['COMPETITIONS_DATA_PATH'],
+                       clubs, competitions, self._generation)
+
+
+class JournalStorage(JSONStorage):
+    """
+    Keeps the JSON files as snapshots and appends bookings to a write-ahead journal.
+
+    See `BookingJournal` for the journal format and compaction.
+    """
+
+    def __init__(self, config):
+        super().__init__(config)
+        self.journal = BookingJournal(
+            config['JOURNAL_PATH'],
+            config['CLUBS_DATA_PATH'],
+            config['COMPETITIONS_DATA_PATH'],
+            max_bytes=config['JOURNAL_COMPACT_BYTES'],
+            max_age=config['JOURNAL_COMPACT_SECONDS'])
+        self._clubs = []
+        self._competitions = []
+        self._registry = None
+
+    def load(self):
+        clubs, competitions = self.journal.recover()
+        self._clubs = [Club.from_dict(club) for club in clubs]
+        self._competitions = [Competition.from_dict(comp) for comp in competitions]
+        return self._clubs, self._competitions
+
+    def bind(self, registry):
+        self._registry = registry
+
+    def load_clubs(self):
+        # The snapshot on disk lags behind the journal, the registry holds the up to date records
+        return self._registry.clubs if self._registry is not None else self._clubs
+
+    def load_competitions(self):
+        return self._registry.competitions if self._registry is not None else self._competitions
+
+    def signature(self):
+        # Compaction rewrites the snapshot files without changing the data
+        return None
+
+    def save(self, clubs, competitions):
+        self.journal.checkpoint(clubs, competitions)
+
+    def write_bookings(self, registry, bookings):
+        self.journal.append_many([
+            (club['name'], competition['name'], places) for club, competition, places in bookings
+        ])
+
+    def close(self):
+        self.journal.close()
+
+
+class SQLiteStorage(Storage):
+    """
+    Stores clubs, competitions and bookings in an SQLite database in WAL mode.
+
+    Several worker processes can share the same database: a booking is checked against the rows
+    and debited in one write transaction, and each process replays the bookings committed by the
+    others into its registry on `refresh`. The JSON files are imported when the database is empty.
+
+    The `ledger` table holds the running total of places booked by each club in each competition,
+    updated in the booking transaction, so the per-competition cap is checked with one lookup.
+
+    `save`, as run by `flask import-json`, replaces the rows rather than adding bookings, and bumps
+    the data generation kept in the `meta` table. A process that sees a new generation, or a booking
+    of a club or competition it does not know, has `refresh` ask for its registry to be reloaded.
+
+    Args:
+        path (str): Path of the database file.
+        config (dict): Application configuration, used to import the JSON files.
+        timeout (float): Seconds to wait for the write lock held by another process.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS clubs (
+            name TEXT PRIMARY KEY,
+            email TEXT NOT NULL UNIQUE,
+            points INTEGER NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS competitions (
+            name TEXT PRIMARY KEY,
+            date TEXT NOT NULL,
+            number_of_places INTEGER NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS competitions_by_date ON competitions (date);
+        CREATE TABLE IF NOT EXISTS bookings (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            club TEXT NOT NULL,
+            competition TEXT NOT NULL,
+            places INTEGER NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS ledger (
+            club TEXT NOT NULL,
+            competition TEXT NOT NULL,
+            places INTEGER NOT NULL,
+            PRIMARY KEY (club, competition)
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value INTEGER NOT NULL
+        );
+    """
+
+    def __init__(self, path, config, timeout=30):
+        self.path = path
+        self.config = config
+        self.timeout = timeout
+        self._local = threading.local()
+        self._refresh_lock = threading.Lock()
+        self._last_booking_id = 0
+        self._generation = 0
+        db = self._connection()
+        db.executescript(self.SCHEMA)
+        # Databases created before the ledger get it from their booking history, once
+        db.execute(
+            'INSERT INTO ledger (club, competition, places) '
+            'SELECT club, competition, SUM(places) FROM bookings WHERE NOT EXISTS (SELECT 1 FROM ledger) '
+            'GROUP BY club, competition')
+
+    def _connection(self):
+        """Return this thread's connection, opening a new one after a fork."""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            connection.row_factory = sqlite3.Row
+            connection.execute('PRAGMA journal_mode=WAL')
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    @staticmethod
+    def _club(row, booked=None):
+        return Club(row['name'], row['email'], row['points'], booked=booked)
+
+    @staticmethod
+    def _competition(row):
+        return Competition(row['name'], row['date'], row['number_of_places'])
+
+    def load(self):
+        db = self._connection()
+        if db.execute('SELECT COUNT(*) FROM clubs').fetchone()[0] == 0:
+            json_storage = JSONStorage(self.config)
+            self.save(json_storage.load_clubs(), json_storage.load_competitions())
+
+        # Read everything in one transaction so the bookings seen so far match the rows loaded
+        db.execute('BEGIN')
+        try:
+            clubs = self.load_clubs()
+            competitions = self.load_competitions()
+            self._last_booking_id = db.execute('SELECT COALESCE(MAX(id), 0) FROM bookings').fetchone()[0]
+            self._generation = self._read_generation(db)
+        finally:
+            db.execute('COMMIT')
+        return clubs, competitions
+
+    @staticmethod
+    def _read_generation(db):
+        row = db.execute("SELECT value FROM meta WHERE key = 'generation'").fetchone()
+        return row[0] if row is not None else 0
+
+    def load_clubs(self):
+        db = self._connection()
+        booked = {}
+        for row in db.execute('SELECT club, competition, places FROM ledger'):
+            booked.setdefault(row['club'], {})[row['competition']] = row['places']
+        rows = db.execute('SELECT name, email, points FROM clubs ORDER BY rowid')
+        return [self._club(row, booked.get(row['name'])) for row in rows]
+
+    def load_competitions(self):
+        rows = self._connection().execute('SELECT name, date, number_of_places FROM competitions ORDER BY rowid')
+        return [self._competition(row) for row in rows]
+
+    def save(self, clubs, competitions):
+        clubs = [club if isinstance(club, Club) else Club.from_dict(club) for club in clubs]
+        db = self._connection()
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            db.executemany(
+                'INSERT OR REPLACE INTO clubs (name, email, points) VALUES (?, ?, ?)',
+                [(c['name'], c['email'], int(c['points'])) for c in clubs])
+            db.executemany(
+                'INSERT OR REPLACE INTO competitions (name, date, number_of_places) VALUES (?, ?, ?)',
+                [(c['name'], c['date'], int(c['numberOfPlaces'])) for c in competitions])
+            db.execute('DELETE FROM ledger')
+            db.executemany(
+                'INSERT INTO ledger (club, competition, places) VALUES (?, ?, ?)',
+                [(club['name'], name, places) for club in clubs for name, places in (club.booked or {}).items()])
+            # Tells the other processes their registry no longer matches the rows
+            db.execute(
+                "INSERT INTO meta (key, value) VALUES ('generation', 1) "
+                'ON CONFLICT (key) DO UPDATE SET value = value + 1')
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        db.execute('COMMIT')
+
+    def book(self, registry, bookings, check):
+        db = self._connection()
+        # Take the database write lock before reading, so no other process can book in between
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            for position, (club, competition, places) in enumerate(bookings):
+                club_row = db.execute(
+                    'SELECT name, email, points FROM clubs WHERE name = ?', (club['name'],)).fetchone()
+                competition_row = db.execute(
+                    'SELECT name, date, number_of_places FROM competitions WHERE name = ?',
+                    (competition['name'],)).fetchone()
+                booked_row = db.execute(
+                    'SELECT places FROM ledger WHERE club = ? AND competition = ?',
+                    (club['name'], competition['name'])).fetchone()
+                booked = {competition['name']: booked_row['places']} if booked_row is not None else None
+                check(position, self._club(club_row, booked), self._competition(competition_row), places)
+                db.execute('UPDATE clubs SET points = points - ? WHERE name = ?', (places, club['name']))
+                db.execute(
+                    'UPDATE competitions SET number_of_places = number_of_places - ? WHERE name = ?',
+                    (places, competition['name']))
+                db.execute(
+                    'INSERT INTO bookings (club, competition, places) VALUES (?, ?, ?)',
+                    (club['name'], competition['name'], places))
+                db.execute(
+                    'INSERT INTO ledger (club, competition, places) VALUES (?, ?, ?) '
+                    'ON CONFLICT (club, competition) DO UPDATE SET places = places + excluded.places',
+                    (club['name'], competition['name'], places))
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        db.execute('COMMIT')
+        self.refresh(registry)
+        return [(registry.club_by_name(club.name), registry.competition_by_name(competition.name), places)
+                for club, competition, places in bookings]
+
+    def persist_bookings(self, registry, bookings):
+        # Committed by `book`
+        pass
+
+    def refresh(self, registry):
+        with self._refresh_lock:
+            db = self._connection()
+            # Read in one transaction so the bookings seen match the generation
+            db.execute('BEGIN')
+            try:
+                if self._read_generation(db) != self._generation:
+                    return True
+                rows = db.execute(
+                    'SELECT id, club, competition, places FROM bookings WHERE id > ? ORDER BY id',
+                    (self._last_booking_id,)).fetchall()
+            finally:
+                db.execute('COMMIT')
+            bookings = [
+                (registry.club_by_name(row['club']), registry.competition_by_name(row['competition']), row['places'])
+                for row in rows]
+            if any(club is None or competition is None for club, competition, _ in bookings):
+                return True
+            # Published as one snapshot, so requests never see part of the bookings of another process
+            with registry.update() as update:
+                for club, competition, places in bookings:
+                    update.book(club, competition, places)
+            if rows:
+                self._last_booking_id = rows[-1]['id']
+            return False
+
+    def close(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+
+def create_storage(config):
+    """Create the storage backend selected by the `PERSISTENCE_MODE` setting."""
+    mode = config['PERSISTENCE_MODE']
+    if mode == 'snapshot':
+        return JSONStorage(config)
+    if mode == 'journal':
+        return JournalStorage(config)
+    if mode == 'sqlite':
+        return SQLiteStorage(config['SQLITE_PATH'], config)
+    raise ValueError(f"Unknown persistence mode: {mode}")
@@ -0,0 +1,57 @@
+"""Production setup of the Jinja templates: precompiled at startup, with a bytecode cache on disk."""
+import os
+import tempfile
+
+from jinja2 import FileSystemBytecodeCache
+
+
+class AtomicBytecodeCache(FileSystemBytecodeCache):
+    """
+    Bytecode cache whose files are written to a temporary file and then renamed into place.
+
+    Workers starting together may compile the same template at once; none of them can then load a
+    cache file another one is still writing.
+    """
+
+    def __init__(self, directory=None):
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+        super().__init__(directory)
+
+    def dump_bytecode(self, bucket):
+        path = self._get_cache_filename(bucket)
+        fd, temporary_path = tempfile.mkstemp(dir=self.directory, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                bucket.write_bytecode(f)
+            os.replace(temporary_path, path)
+        except BaseException:
+            os.remove(temporary_path)
+            raise
+
+
+def precompile_templates(app, cache_dir=None):
+    """
+    Compile every template of the app before it serves requests.
+
+    Templates are no longer checked for changes, and their compiled code is kept in a bytecode
+    cache on local disk: the first worker to start compiles them, and every later start, or
+    restart, loads the compiled code instead. A template edited on disk gets a new cache entry,
+    but is only picked up by workers started after the edit.
+
+    Args:
+        app (flask.Flask): The application, before it serves its first request.
+        cache_dir (str): Directory of the bytecode cache, Jinja's per-user directory in the
+                         system temp directory by default.
+
+    Returns:
+        list: The names of the templates loaded.
+    """
+    app.config['TEMPLATES_AUTO_RELOAD'] = False
+    env = app.jinja_env
+    env.auto_reload = False
+    env.bytecode_cache = AtomicBytecodeCache(cache_dir)
+    names = env.list_templates()
+    for name in names:
+        env.get_template(name)
+    return names
@@ -1,29 +1,65 @@
-from flask import current_app, Flask, render_template, request, redirect, flash, url_for, make_response
-import json
+from flask import Flask, Response, jsonify, render_template, request, redirect, flash, url_for, make_response, abort, get_template_attribute, get_flashed_messages, stream_with_context, Markup, g, session, send_from_directory, current_app
 from datetime import datetime
+from werkzeug.middleware.proxy_fix import ProxyFix
+import functools
+import hashlib
+import math
+import mimetypes
 import os
+import time
+
+from gudlft.assets import IMMUTABLE_CACHE_CONTROL, build_assets, precompressed_variant
+from gudlft.booking import MAX_PLACES_PER_COMPETITION, BookingError
+from gudlft.ratelimit import Overloaded
+from gudlft.registry import normalize_email
+from gudlft.state import AppState
+from gudlft.storage import JSONStorage
+from gudlft.templating import precompile_templates
+
+
+def template_digest(folder):
+    """Return a digest of the template files, the same in every worker running the same templates."""
+    digest = hashlib.sha1()
+    for directory, _, files in sorted(os.walk(folder)):
+        for name in sorted(files):
+            with open(os.path.join(directory, name), 'rb') as f:
+                digest.update(name.encode() + b'\0' + f.read())
+    return digest.hexdigest()
+
+
+# Entity tags are derived from the values shown and the templates showing them, so every worker gives
+# a page the same tag, and a deployment changing how pages are rendered changes their tags
+etag_salt = template_digest(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'templates'))
+
+# View functions, declared with `route` and registered on every app built by `create_app`
+routes = []
+
+
+def route(rule, **options):
+    """Declare a view function, like `Flask.route`, for the apps built by `create_app`."""
+    def decorator(view):
+        routes.append((rule, view, options))
+        return view
+    return decorator
+
+
+def app_state():
+    """Return the storage, registry, caches and metrics of the app handling the current request."""
+    return current_app.extensions['gudlft']
 
 
 def loadClubs():
-    """Load club data from the JSON file"""
-    with open(current_app.config['CLUBS_DATA_PATH']) as c:
-        listOfClubs = json.load(c)['clubs']
-        return listOfClubs
+    """Load club data from the storage backend"""
+    return app_state().storage.load_clubs()
 
 def loadCompetitions():
-    """Load competition data from the JSON file"""
-    with open(current_app.config['COMPETITIONS_DATA_PATH']) as comps:
-        listOfCompetitions = json.load(comps)['competitions']
-        return listOfCompetitions
+    """Load competition data from the storage backend"""
+    return app_state().storage.load_competitions()
 
 
 def save_data(clubs, competitions):
-    """Save updated clubs and competitions data to their respective JSON files."""
-    with open(current_app.config['CLUBS_DATA_PATH'], 'w') as c:
-        json.dump({'clubs': clubs}, c, indent=4)
-    
-    with open(current_app.config['COMPETITIONS_DATA_PATH'], 'w') as c:
-        json.dump({'competitions': competitions}, c, indent=4)
+    """Save updated clubs and competitions data to the storage backend."""
+    app_state().storage.save(clubs, competitions)
 
 
 def process_competitions(competitions):
@@ -31,7 +67,7 @@ def process_competitions(competitions):
     Processes a list of competitions to determine if each competition is in the past or future.
     
     Args:
-        competitions (list): A list of dictionaries, where each dictionary represents a competition
+        competitions (list): A list of competition records
                              
     Returns:
         list: A list of dictionaries, each containing the competition details along with an 'is_past' key
@@ -40,115 +76,591 @@ def process_competitions(competitions):
     current_timestamp = datetime.now()
     processed_competitions = []
     for comp in competitions:
-        comp_date = datetime.strptime(comp['date'], '%Y-%m-%d %H:%M:%S')
-        is_past = comp_date < current_timestamp
+        is_past = comp.starts_at < current_timestamp
         processed_competitions.append({
-            'name': comp['name'],
-            'date': comp['date'],
-            'numberOfPlaces': comp['numberOfPlaces'],
+            'name': comp.name,
+            'date': comp.date,
+            'numberOfPlaces': comp.places,
             'is_past': is_past
         })
     return processed_competitions
 
 
-app = Flask(__name__)
-app.secret_key = 'something_special'
-app.debug = True
+def render_club_rows(clubs, key):
+    """
+    Render the rows of the club points table, reusing the fragments cached for unchanged clubs.
+
+    Args:
+        clubs (list): The clubs to list.
+        key (tuple): Identifies the version of the data the clubs come from.
+    """
+    club_row = get_template_attribute('rows.html', 'club_row')
+    fragments = app_state().fragments
+
+    def build():
+        return Markup('').join(
+            fragments.fragment(('club', club['name']), (club['points'],), lambda club=club: club_row(club))
+            for club in clubs)
+    return fragments.table(('clubs',) + key, build)
+
+
+def competition_row_fragments(club_name, competitions):
+    """Yield the rows of the competitions table for a club, reusing the fragments cached for unchanged competitions."""
+    competition_row = get_template_attribute('rows.html', 'competition_row')
+    fragments = app_state().fragments
+    for comp in competitions:
+        yield fragments.fragment(
+            ('competition', comp['name']),
+            (club_name, comp['date'], comp['numberOfPlaces'], comp['is_past']),
+            lambda comp=comp: competition_row(comp, club_name))
+
+
+def render_summary(club, club_name, cursor=None, snapshot=None):
+    """
+    Render the summary page of a club with one page of competitions.
+
+    With `STREAM_COMPETITIONS` enabled, the page is streamed and rows are sent as they are rendered.
+    Otherwise the rows are joined into a table cached per club, page and data version.
+
+    Args:
+        club (dict): The club shown in the page header.
+        club_name (str): Name used in the booking links.
+        cursor (str): Cursor of the page of competitions to show, None for the first page.
+        snapshot (RegistrySnapshot): The registry snapshot read by the request, the latest one by default.
+    """
+    state = app_state()
+    registry = state.registry
+    snapshot = snapshot or registry.snapshot()
+    now = datetime.now()
+    competitions, next_cursor = snapshot.competition_page(cursor, current_app.config['COMPETITIONS_PAGE_SIZE'], now)
+    context = {'club': club, 'club_name': club_name, 'next_cursor': next_cursor}
+
+    if current_app.config['STREAM_COMPETITIONS']:
+        # Pop the flashed messages now, the session is saved before the body is streamed
+        get_flashed_messages()
+        current_app.update_template_context(context)
+        context['competition_rows'] = competition_row_fragments(club_name, competitions)
+        stream = current_app.jinja_env.get_template('welcome.html').stream(context)
+        return Response(stream_with_context(stream))
+
+    key = ('competitions', club_name, cursor, id(registry), snapshot.version, snapshot.upcoming_count(now))
+    table = state.fragments.table(key, lambda: Markup('').join(competition_row_fragments(club_name, competitions)))
+    return render_template('welcome.html', competition_rows=[table], **context)
+
+
+def make_etag(*parts):
+    """Return an entity tag identifying a page rendered from the given values."""
+    return hashlib.sha1(repr((etag_salt,) + parts).encode()).hexdigest()[:20]
+
+
+def cache_control():
+    """Return the Cache-Control header of the pages served with an entity tag."""
+    max_age = current_app.config['SHARED_CACHE_MAX_AGE']
+    if max_age:
+        # Browsers revalidate every time, shared caches serve their copy for up to max_age seconds
+        return f'public, max-age=0, s-maxage={max_age}'
+    return 'public, no-cache'
+
+
+def conditional_page(etag, render):
+    """
+    Serve a page with an entity tag, answering 304 without rendering when the client has it already.
+
+    Pages holding flashed messages are personal to the request: they are always rendered, and
+    are neither tagged nor cacheable.
+
+    Args:
+        etag (str): Entity tag of the page, as returned by `make_etag`.
+        render (callable): Renders the page.
+    """
+    if '_flashes' in session:
+        return render()
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+    else:
+        response = make_response(render())
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = cache_control()
+    return response
+
+
+def span(name):
+    """Time a part of the current request, reported per route on the /metrics endpoint."""
+    return app_state().metrics.span(request.endpoint, name)
+
+
+def refuse(message, status, retry_after, reason):
+    """Build the response refusing a request over its rate or beyond the booking queue, and count it."""
+    app_state().rejections.inc((request.endpoint, reason))
+    if request.is_json:
+        response = api_error(message, status)
+    else:
+        response = make_response(message, status, {'Content-Type': 'text/plain; charset=utf-8'})
+    response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+    return response
+
 
-# Set paths for data files based on the environment
-if os.getenv('FLASK_ENV') == 'testing':
-    app.config['CLUBS_DATA_PATH'] = 'tests/data/test_clubs.json'
-    app.config['COMPETITIONS_DATA_PATH'] = 'tests/data/test_competitions.json'
-else:
-    app.config['CLUBS_DATA_PATH'] = 'clubs.json'
-    app.config['COMPETITIONS_DATA_PATH'] = 'competitions.json'
+def throttled(keys=lambda form: [], booking=False):
+    """
+    Rate limit a view per client address and per the keys it is called under, and cap concurrent bookings.
 
-with app.app_context():
-    competitions = loadCompetitions()
-    clubs = loadClubs()
+    A request that used up the tokens of its address or of one of its keys is refused with 429.
+    Booking views then run under the booking concurrency cap: a booking arriving while the queue
+    of waiting ones is full, or waiting too long in it, is refused with 503. Both carry a
+    Retry-After header.
+
+    Args:
+        keys (callable): Returns the keys of a request, such as ('club', name), from its form.
+        booking (bool): Whether the view books places.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            state = app_state()
+            retry_after = state.rate_limiter.acquire([('address', request.remote_addr)] + keys(request.form))
+            if retry_after:
+                return refuse('Too many requests, please try again later.', 429, retry_after, 'rate_limited')
+            if not booking:
+                return view(*args, **kwargs)
+            try:
+                with state.admission.admit():
+                    return view(*args, **kwargs)
+            except Overloaded:
+                return refuse('Too many bookings in progress, please try again later.', 503, 1, 'overloaded')
+        return wrapper
+    return decorator
+
+
+def configure(app):
+    """Set the default configuration of an app, read from the environment where it can be overridden."""
+    # Set paths for data files based on the environment
+    if os.getenv('FLASK_ENV') == 'testing':
+        app.config['CLUBS_DATA_PATH'] = 'tests/data/test_clubs.json'
+        app.config['COMPETITIONS_DATA_PATH'] = 'tests/data/test_competitions.json'
+        app.config['JOURNAL_PATH'] = 'tests/data/test_bookings.journal'
+        app.config['SQLITE_PATH'] = 'tests/data/test_gudlft.db'
+    else:
+        app.config['CLUBS_DATA_PATH'] = 'clubs.json'
+        app.config['COMPETITIONS_DATA_PATH'] = 'competitions.json'
+        app.config['JOURNAL_PATH'] = 'bookings.journal'
+        app.config['SQLITE_PATH'] = 'gudlft.db'
 
-    # Sort competitions by date from most recent to oldest
-    competitions = sorted(competitions, key=lambda x: datetime.strptime(x['date'], '%Y-%m-%d %H:%M:%S'), reverse=True)
+    # Data paths can be overridden from the environment, e.g. to serve a generated benchmark dataset
+    for key in ('CLUBS_DATA_PATH', 'COMPETITIONS_DATA_PATH', 'JOURNAL_PATH', 'SQLITE_PATH'):
+        app.config[key] = os.getenv('GUDLFT_' + key, app.config[key])
+
+    # 'snapshot' rewrites the JSON files on every booking, 'journal' appends bookings to a write-ahead journal,
+    # 'sqlite' keeps the data in a database shared by all worker processes
+    app.config['PERSISTENCE_MODE'] = os.getenv('GUDLFT_PERSISTENCE_MODE', 'snapshot')
+    app.config['JOURNAL_COMPACT_BYTES'] = 1024 * 1024
+    app.config['JOURNAL_COMPACT_SECONDS'] = 300
+
+    # Load the clubs and competitions in the background as soon as the app is created, rather than on the first request
+    app.config['WARM_UP'] = os.getenv('GUDLFT_WARM_UP') == '1'
+
+    # Bookings persisted within this many seconds of each other, up to the batch size, share one durable write
+    app.config['GROUP_COMMIT_WINDOW'] = float(os.getenv('GUDLFT_GROUP_COMMIT_WINDOW', '0'))
+    app.config['GROUP_COMMIT_MAX_BATCH'] = 100
+
+    # Competitions listed per summary page, and whether summary pages are streamed row by row
+    app.config['COMPETITIONS_PAGE_SIZE'] = 50
+    app.config['STREAM_COMPETITIONS'] = os.getenv('GUDLFT_STREAM_COMPETITIONS') == '1'
+
+    # Largest batch accepted by the booking API, and largest page of competitions it lists
+    app.config['API_MAX_BATCH'] = 100
+    app.config['API_MAX_PAGE_SIZE'] = 200
+
+    # Seconds shared caches such as a reverse proxy may serve the board and competition pages without revalidating
+    app.config['SHARED_CACHE_MAX_AGE'] = int(os.getenv('GUDLFT_SHARED_CACHE_MAX_AGE', '0'))
+
+    # Rendered pages and JSON responses of at least this many bytes are compressed, at this gzip/brotli level
+    app.config['COMPRESS_MIN_SIZE'] = int(os.getenv('GUDLFT_COMPRESS_MIN_SIZE', '500'))
+    app.config['COMPRESS_LEVEL'] = int(os.getenv('GUDLFT_COMPRESS_LEVEL', '6'))
+
+    # Outside debug mode (FLASK_ENV=development or FLASK_DEBUG=1) templates are compiled at startup,
+    # through a bytecode cache kept in this directory (a per-user temp directory by default), and never reloaded
+    app.config['PRECOMPILE_TEMPLATES'] = not app.debug
+    app.config['TEMPLATE_CACHE_DIR'] = os.getenv('GUDLFT_TEMPLATE_CACHE_DIR')
+
+    # Requests per second and burst allowed per client address, club and email on /showSummary and the booking
+    # routes (a rate of 0 disables the limit), and number of addresses, clubs and emails tracked at most
+    app.config['RATE_LIMIT_PER_SECOND'] = float(os.getenv('GUDLFT_RATE_LIMIT_PER_SECOND', '5'))
+    app.config['RATE_LIMIT_BURST'] = int(os.getenv('GUDLFT_RATE_LIMIT_BURST', '20'))
+    app.config['RATE_LIMIT_MAX_KEYS'] = 10000
+    # Reverse proxies in front of the app: client addresses, which requests are rate limited by, are then
+    # read from the X-Forwarded-For header set by this many proxies instead of the address of the last one
+    app.config['TRUSTED_PROXIES'] = int(os.getenv('GUDLFT_TRUSTED_PROXIES', '0'))
+
+    # Bookings processed at once, and bookings allowed to wait for a slot, for up to this many seconds
+    app.config['BOOKING_MAX_CONCURRENCY'] = int(os.getenv('GUDLFT_BOOKING_MAX_CONCURRENCY', '32'))
+    app.config['BOOKING_MAX_QUEUE'] = int(os.getenv('GUDLFT_BOOKING_MAX_QUEUE', '64'))
+    app.config['BOOKING_QUEUE_TIMEOUT'] = float(os.getenv('GUDLFT_BOOKING_QUEUE_TIMEOUT', '2'))
+
+    # Threads serving read-only requests and booking requests when served through asgi.py
+    app.config['ASGI_READ_WORKERS'] = int(os.getenv('GUDLFT_ASGI_READ_WORKERS', '16'))
+    app.config['ASGI_WRITE_WORKERS'] = int(os.getenv('GUDLFT_ASGI_WRITE_WORKERS', '4'))
+
+    # Fraction of requests profiled with cProfile (0 disables profiling), and where their stats are dumped
+    app.config['PROFILE_SAMPLE_RATE'] = float(os.getenv('GUDLFT_PROFILE_SAMPLE_RATE', '0'))
+    app.config['PROFILE_DIR'] = os.getenv('GUDLFT_PROFILE_DIR', 'profiles')
+
+
+def build_static_assets():
+    """Minify, fingerprint and precompress the static assets."""
+    manifest = build_assets(current_app.static_folder)
+    print(f'Built {len(manifest)} assets into {current_app.static_folder}/dist')
+
+
+def export_json():
+    """Export the stored clubs and competitions to the JSON data files."""
+    storage = app_state().storage
+    if isinstance(storage, JSONStorage):
+        # The files are the backend's own snapshots: in journal mode this checkpoints the journal, so
+        # the files record the bookings they include and those are not replayed again at the next start
+        storage.save(loadClubs(), loadCompetitions())
+    else:
+        JSONStorage(current_app.config).save(loadClubs(), loadCompetitions())
 
-@app.route('/')
+
+def import_json():
+    """Replace the stored clubs and competitions with the content of the JSON data files."""
+    json_storage = JSONStorage(current_app.config)
+    save_data(json_storage.load_clubs(), json_storage.load_competitions())
+
+
+def start_request_timer():
+    """Start timing the request, and profiling it when it is sampled."""
+    g.request_started = time.perf_counter()
+    g.profile = app_state().profiler.start()
+
+
+def record_request_timing(response):
+    """
+    Record the request latency for the /metrics endpoint.
+
+    Streamed responses are timed up to the start of the body.
+    """
+    state = app_state()
+    route = request.endpoint or 'unmatched'
+    if g.get('profile') is not None:
+        state.profiler.stop(g.profile, route)
+    if 'request_started' in g:
+        state.metrics.observe_request(route, request.method, response.status_code, time.perf_counter() - g.request_started)
+    return response
+
+
+def compress_response(response):
+    """Compress the body with the best encoding the client accepts, when it is large enough."""
+    if request.endpoint == 'static':
+        # Static files are sent as stored, or precompressed by `serve_static`, with their own validators
+        return response
+    return app_state().compressor.compress(response, request.accept_encodings)
+
+
+def fingerprint_static_urls(endpoint, values):
+    """Link static files to their built copy, when there is one."""
+    if endpoint == 'static':
+        values['filename'] = app_state().asset_manifest.get(values.get('filename'), values.get('filename'))
+
+
+def serve_static(filename):
+    """
+    Serve a static file.
+
+    Built assets are served from their precompressed variant when the client accepts it, with
+    headers letting clients and proxies cache them for good: their name changes with their content.
+    """
+    if filename not in app_state().built_assets:
+        return current_app.send_static_file(filename)
+    static_folder = current_app.static_folder
+    variant, encoding = precompressed_variant(static_folder, filename, request.accept_encodings)
+    response = send_from_directory(static_folder, variant or filename, mimetype=mimetypes.guess_type(filename)[0])
+    if encoding is not None:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+    return response
+
+
+def refresh_registry():
+    """Pick up bookings and imports made by other worker processes."""
+    # A registry not loaded yet is loaded up to date by the first request reading it
+    app_state().refresh()
+
+@route('/')
 def index():
     """Render the main page with the club points table."""
-    clubs = loadClubs()
-    return render_template('index.html', clubs=clubs)
+    # Reload the clubs only after a booking or an edit of the stored data; the key is the same in every worker
+    state = app_state()
+    with span('lookup'):
+        key = (state.registry.snapshot().balances_tag, state.storage.signature())
 
-@app.route('/showSummary',methods=['POST'])
+    def render():
+        clubs = state.points_board.clubs(key, loadClubs)
+        return render_template('index.html', club_rows=render_club_rows(clubs, key))
+    with span('render'):
+        return conditional_page(make_etag('index', key), render)
+
+@route('/showSummary',methods=['POST'])
+@throttled(lambda form: [('email', normalize_email(form.get('email', '')))])
 def showSummary():
     """Show a summary for the selected club, if it exists."""
-    try:
-        club = [club for club in clubs if club['email'] == request.form['email']][0]
-        processed_competitions = process_competitions(competitions)
-        return render_template('welcome.html', club=club, competitions=processed_competitions)
-    except IndexError:
-        return make_response(render_template('index.html', clubs=clubs, error="Sorry, that email was not found."), 400)
+    with span('lookup'):
+        snapshot = app_state().registry.snapshot()
+        club = snapshot.club_by_email(request.form['email'])
+    with span('render'):
+        if club is None:
+            # The points table is left out, so a failed login costs the same however many clubs there are
+            return make_response(render_template('index.html', error="Sorry, that email was not found."), 400)
+        return render_summary(club, club['name'], snapshot=snapshot)
 
-@app.route('/book/<competition>/<club>')
+@route('/competitions/<club>')
+def showCompetitions(club):
+    """Show the page of competitions following the one given by the cursor."""
+    registry = app_state().registry
+    with span('lookup'):
+        snapshot = registry.snapshot()
+        foundClub = snapshot.club_by_name(club)
+    if foundClub is None:
+        abort(404)
+    cursor = request.args.get('cursor')
+    # Tagged with the values shown rather than the data version, which differs between workers
+    competitions, next_cursor = snapshot.competition_page(cursor, current_app.config['COMPETITIONS_PAGE_SIZE'])
+    etag = make_etag('competitions', foundClub.to_dict(), cursor, competitions, next_cursor)
+    with span('render'):
+        return conditional_page(etag, lambda: render_summary(foundClub, club, cursor, snapshot))
+
+@route('/book/<competition>/<club>')
 def book(competition,club):
     """Render booking page if both club and competition are found."""
-    foundClub = next((c for c in clubs if c['name'] == club), None)
-    foundCompetition = next((c for c in competitions if c['name'] == competition), None)
+    with span('lookup'):
+        snapshot = app_state().registry.snapshot()
+        foundClub = snapshot.club_by_name(club)
+        foundCompetition = snapshot.competition_by_name(competition)
     
-    if foundClub and foundCompetition:
-        processed_competitions = process_competitions([foundCompetition])
-        return render_template('booking.html',club=foundClub,competition=processed_competitions[0])
-    else:
-        flash("Something went wrong-please try again")
-        processed_competitions = process_competitions(competitions)
-        return render_template('welcome.html', club=club, competitions=processed_competitions)
+    with span('render'):
+        if foundClub and foundCompetition:
+            processed_competitions = process_competitions([foundCompetition])
+            # The page only shows this club and competition, so it is tagged with their values rather than the data version
+            etag = make_etag('book', foundClub.to_dict(), processed_competitions[0])
+            return conditional_page(
+                etag, lambda: render_template('booking.html', club=foundClub, competition=processed_competitions[0]))
+        else:
+            flash("Something went wrong-please try again")
+            return render_summary(club, club, snapshot=snapshot)
 
 
-@app.route('/purchasePlaces',methods=['POST'])
+@route('/purchasePlaces',methods=['POST'])
+@throttled(lambda form: [('club', form.get('club'))], booking=True)
 def purchasePlaces():
     """Handle place purchase requests, enforcing limits on the number of places and club points."""
-    competition = [c for c in competitions if c['name'] == request.form['competition']][0]
-    club = [c for c in clubs if c['name'] == request.form['club']][0]
+    state = app_state()
+    registry = state.registry
+    with span('lookup'):
+        competition = registry.competition_by_name(request.form['competition'])
+        club = registry.club_by_name(request.form['club'])
+    if competition is None or club is None:
+        abort(400)
 
     placesRequired = int(request.form['places'])
-    club_points = int(club['points'])
-    competition_places = int(competition['numberOfPlaces'])
-
-    # Cannot book places for past competitions
-    if 'date' in competition:
-        competition_date = datetime.strptime(competition['date'], '%Y-%m-%d %H:%M:%S')
-        if competition_date < datetime.now():
-            return make_response(render_template('booking.html', club=club, competition=competition, error='Cannot book places for past competitions'), 400)
-
-    # Check for valid number of places
-    if placesRequired <= 0:
-        return make_response(render_template('booking.html', club=club, competition=competition, error='You must book at least 1 place.'), 400)
-
-    # Cannot book more places than available
-    if placesRequired > competition_places:
-        error_message = "Cannot book more places than are available."
-        return make_response(render_template('booking.html', club=club, competition=competition, error=error_message), 400)
-
-    # Cannot book more than 12 places
-    if placesRequired > 12:
-        response = make_response(render_template('booking.html', club=club, competition=competition, error='Cannot book more than 12 places per competition'), 400)
-        return response
 
-    # Cannot use more than points allowed
-    if placesRequired > club_points:
-        response = make_response(render_template('booking.html', club=club, competition=competition, error='Not enough points'), 400)
-        return response
-
-    # All checks passed, proceed with booking
-    competition['numberOfPlaces'] = competition_places - placesRequired
-    club['points'] = str(club_points - placesRequired)
+    # Check the booking rules and debit points and places atomically; the debited records are returned
+    try:
+        with span('validation'):
+            club, competition = state.booking_engine.book(club, competition, placesRequired)
+    except BookingError as error:
+        with span('render'):
+            return make_response(render_template('booking.html', club=club, competition=competition, error=str(error)), 400)
 
     # Save updates
-    save_data(clubs, competitions)
+    with span('persistence'):
+        state.storage.persist_bookings(registry, [(club, competition, placesRequired)])
     
     flash('Great-booking complete!')
     
-    processed_competitions = process_competitions(competitions)
-    return render_template('welcome.html', club=club, competitions=processed_competitions)
+    with span('render'):
+        return render_summary(club, club['name'])
 
-@app.route('/logout')
+@route('/logout')
 def logout():
     """Handle user logout and redirect to the main page."""
-    return redirect(url_for('index'))
\ No newline at end of file
+    return redirect(url_for('index'))
+
+@route('/metrics')
+def showMetrics():
+    """Expose request latencies and cache counters in the Prometheus text format."""
+    return Response(app_state().metrics.render(), mimetype='text/plain; version=0.0.4')
+
+
+def api_error(message, status=400, position=None):
+    """Build a JSON error response, pointing at the refused booking of a batch when there is one."""
+    body = {'error': message}
+    if position is not None:
+        body['position'] = position
+    return make_response(jsonify(body), status)
+
+
+def club_balance(club):
+    """Return the JSON representation of a club's balance."""
+    return {'name': club.name, 'points': club.points}
+
+
+def competition_availability(comp):
+    """Return the JSON representation of a processed competition."""
+    return {'name': comp['name'], 'date': comp['date'], 'numberOfPlaces': comp['numberOfPlaces'], 'isPast': comp['is_past']}
+
+
+@route('/api/competitions')
+def apiCompetitions():
+    """List competitions as JSON, one page at a time, upcoming ones first."""
+    size = request.args.get('size', current_app.config['COMPETITIONS_PAGE_SIZE'], type=int)
+    if size < 1:
+        return api_error('The page size must be at least 1.')
+    # Larger pages are cut down, so a single request cannot list the whole history
+    size = min(size, current_app.config['API_MAX_PAGE_SIZE'])
+    competitions, next_cursor = app_state().registry.snapshot().competition_page(request.args.get('cursor'), size)
+    return jsonify({
+        'competitions': [competition_availability(comp) for comp in competitions],
+        'nextCursor': next_cursor
+    })
+
+@route('/api/clubs')
+def apiClubs():
+    """List the points balance of every club as JSON."""
+    return jsonify({'clubs': [club_balance(club) for club in app_state().registry.clubs]})
+
+@route('/api/clubs/<club>')
+def apiClub(club):
+    """Return the points balance of a club as JSON."""
+    foundClub = app_state().registry.club_by_name(club)
+    if foundClub is None:
+        return api_error('Unknown club.', 404)
+    return jsonify(club_balance(foundClub))
+
+@route('/api/clubs/<club>/bookings')
+def apiClubBookings(club):
+    """List the places a club booked in each competition, from the booking ledger."""
+    snapshot = app_state().registry.snapshot()
+    if snapshot.club_by_name(club) is None:
+        return api_error('Unknown club.', 404)
+    booked = snapshot.club_bookings(club)
+    return jsonify({
+        'club': club,
+        'bookings': [{'competition': name, 'places': places} for name, places in booked.items()],
+        'maxPlacesPerCompetition': MAX_PLACES_PER_COMPETITION
+    })
+
+@route('/api/competitions/<competition>/bookings')
+def apiCompetitionBookings(competition):
+    """List the places each club booked in a competition, from the booking ledger."""
+    snapshot = app_state().registry.snapshot()
+    if snapshot.competition_by_name(competition) is None:
+        return api_error('Unknown competition.', 404)
+    booked = snapshot.competition_bookings(competition)
+    return jsonify({
+        'competition': competition,
+        'bookings': [{'club': name, 'places': places} for name, places in booked.items()],
+        'totalPlaces': sum(booked.values())
+    })
+
+@route('/api/bookings', methods=['POST'])
+@throttled(booking=True)
+def apiBookings():
+    """
+    Book a batch of places for one or several clubs.
+
+    The request body is {"bookings": [{"club": ..., "competition": ..., "places": ...}, ...]}. The
+    batch is applied all or nothing, with the same rules as purchasePlaces, and persisted in a
+    single write. A refused batch returns the error and the position of the booking that failed.
+    """
+    payload = request.get_json(silent=True)
+    items = payload.get('bookings') if isinstance(payload, dict) else None
+    if not isinstance(items, list) or not items:
+        return api_error('Expected a non-empty list of bookings.')
+    max_batch = current_app.config['API_MAX_BATCH']
+    if len(items) > max_batch:
+        return api_error(f"Cannot book more than {max_batch} items per request.")
+
+    state = app_state()
+    registry = state.registry
+    bookings = []
+    for position, item in enumerate(items):
+        if not isinstance(item, dict):
+            return api_error('Each booking must be an object.', position=position)
+        if not isinstance(item.get('club'), str) or not isinstance(item.get('competition'), str):
+            return api_error('The club and competition must be given by name.', position=position)
+        club = registry.club_by_name(item.get('club'))
+        competition = registry.competition_by_name(item.get('competition'))
+        if club is None or competition is None:
+            return api_error('Unknown club or competition.', position=position)
+        places = item.get('places')
+        if type(places) is not int:
+            return api_error('The number of places must be an integer.', position=position)
+        bookings.append((club, competition, places))
+
+    try:
+        with span('validation'):
+            bookings = state.booking_engine.book_many(bookings)
+    except BookingError as error:
+        return api_error(str(error), position=error.position)
+
+    with span('persistence'):
+        state.storage.persist_bookings(registry, bookings)
+
+    clubs = {club['name']: club for club, _, _ in bookings}
+    return jsonify({
+        'booked': [{'club': club['name'], 'competition': competition['name'], 'places': places}
+                   for club, competition, places in bookings],
+        'clubs': [club_balance(club) for club in clubs.values()]
+    })
+
+
+def create_app(config=None):
+    """
+    Create an app serving the clubs and competitions given by its configuration.
+
+    The configuration is read from the environment (see `configure`), then overridden by `config`.
+    Creating the app reads no data: the clubs and competitions are loaded by the first request
+    needing them, or in the background from the start when `WARM_UP` is set. Several apps, each
+    with its own data, storage and caches, can be served by one process.
+
+    Args:
+        config (dict): Settings overriding the defaults, e.g. the data paths of another dataset.
+
+    Returns:
+        flask.Flask: The app, its storage, registry, caches and metrics in `app.extensions['gudlft']`.
+    """
+    app = Flask(__name__)
+    app.secret_key = 'something_special'
+    configure(app)
+    app.config.update(config or {})
+
+    if app.config['TRUSTED_PROXIES']:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['TRUSTED_PROXIES'], x_proto=app.config['TRUSTED_PROXIES'])
+
+    if app.config['PRECOMPILE_TEMPLATES']:
+        precompile_templates(app, app.config['TEMPLATE_CACHE_DIR'])
+
+    state = app.extensions['gudlft'] = AppState(app.config, app.static_folder)
+
+    app.cli.command('build-assets')(build_static_assets)
+    app.cli.command('export-json')(export_json)
+    app.cli.command('import-json')(import_json)
+
+    app.before_request(start_request_timer)
+    app.before_request(refresh_registry)
+    app.after_request(record_request_timing)
+    app.after_request(compress_response)
+    app.url_defaults(fingerprint_static_urls)
+
+    for rule, view, options in routes:
+        app.add_url_rule(rule, view_func=view, **options)
+    app.view_functions['static'] = serve_static
+
+    if app.config['WARM_UP']:
+        state.warm_up()
+    return app
+
+
+# The app served by `flask run`, WSGI servers (server:app) and asgi.py
+app = create_app()
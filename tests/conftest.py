@@ -1,3 +1,4 @@
+import json
 import os
 import sys
 from datetime import datetime, timedelta
@@ -11,27 +12,59 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from server import app as flask_app
+from server import create_app
+from gudlft.registry import Registry
 from flask_testing import LiveServerTestCase
 from selenium import webdriver
 
 # Test Server
 BASE_URL = 'http://127.0.0.1:8943/'
 
+# Data files of the test apps, restored after the test session
+TEST_CONFIG = {
+    'CLUBS_DATA_PATH': 'tests/data/test_clubs.json',
+    'COMPETITIONS_DATA_PATH': 'tests/data/test_competitions.json',
+    'JOURNAL_PATH': 'tests/data/test_bookings.journal',
+    'SQLITE_PATH': 'tests/data/test_gudlft.db'
+}
+
+# Default content of the datasets written by the `dataset` fixture
+DATASET_CLUBS = [{'name': 'Simply Lift', 'email': 'john@simplylift.co', 'points': '13'}]
+DATASET_COMPETITIONS = [{'name': 'Fall Classic', 'date': '2099-10-22 13:30:00', 'numberOfPlaces': '23'}]
+
+@pytest.fixture
+def dataset(tmp_path):
+    """
+    Provide a function writing a clubs/competitions pair into tmp_path, or one of its subdirectories,
+    and returning the app settings pointing at it, the journal and database included.
+    """
+    def write(clubs=DATASET_CLUBS, competitions=DATASET_COMPETITIONS, directory=None, generation=None):
+        root = tmp_path / directory if directory else tmp_path
+        root.mkdir(exist_ok=True)
+        stamp = {} if generation is None else {'generation': generation}
+        (root / 'clubs.json').write_text(json.dumps(dict({'clubs': clubs}, **stamp)))
+        (root / 'competitions.json').write_text(json.dumps(dict({'competitions': competitions}, **stamp)))
+        return {
+            'CLUBS_DATA_PATH': str(root / 'clubs.json'),
+            'COMPETITIONS_DATA_PATH': str(root / 'competitions.json'),
+            'JOURNAL_PATH': str(root / 'bookings.journal'),
+            'SQLITE_PATH': str(root / 'gudlft.db')
+        }
+    return write
+
 class CustomLiveServerTestCase(LiveServerTestCase):
     """A customized live server test case class for handling integration tests with Selenium."""
     def create_app(self):
         """Set up application configuration specifically for testing."""
-        flask_app.config.update({
-            'TESTING': True,
-            'LIVESERVER_PORT': 8943,
-            'FLASK_ENV': 'testing',
-            'SECRET_KEY': 'verysecret',
-            'SERVER_NAME': 'localhost.localdomain:8943',
-            'CLUBS_DATA_PATH': 'tests/data/test_clubs.json',
-            'COMPETITIONS_DATA_PATH': 'tests/data/test_competitions.json'
-        })
-        return flask_app
+        return create_app(dict(
+            TEST_CONFIG,
+            TESTING=True,
+            LIVESERVER_PORT=8943,
+            FLASK_ENV='testing',
+            SECRET_KEY='verysecret',
+            SERVER_NAME='localhost.localdomain:8943',
+            # Tests fire many requests from one address, rate limiting is tested on its own
+            RATE_LIMIT_PER_SECOND=0))
 
     def setUp(self):
         """Initialize the WebDriver before each test."""
@@ -41,11 +74,18 @@ class CustomLiveServerTestCase(LiveServerTestCase):
         """Close the WebDriver after each test."""
         self.driver.quit()
 
+def mock_registry(app, clubs, competitions):
+    """Replace the registry and booking engine of the app with ones serving the given mocked clubs and competitions."""
+    state = app.extensions['gudlft']
+    # Load the test data first, so that bookings are still persisted by the test storage
+    state.load()
+    state.use_registry(Registry(clubs, competitions))
+
 @pytest.fixture(scope='session', autouse=True)
 def backup_and_restore_data():
     # Locations of the original data files and their backups
-    clubs_data_path = flask_app.config['CLUBS_DATA_PATH']
-    competitions_data_path = flask_app.config['COMPETITIONS_DATA_PATH']
+    clubs_data_path = TEST_CONFIG['CLUBS_DATA_PATH']
+    competitions_data_path = TEST_CONFIG['COMPETITIONS_DATA_PATH']
     backup_clubs_data_path = clubs_data_path + '.bak'
     backup_competitions_data_path = competitions_data_path + '.bak'
 
@@ -65,9 +105,21 @@ def backup_and_restore_data():
     os.remove(backup_competitions_data_path)
 
 @pytest.fixture(scope='function')
-def app():
-    """Fixture to configure the Flask application for tests without starting the server."""
-    return CustomLiveServerTestCase().create_app()
+def app(tmp_path):
+    """Fixture to create a Flask application for tests without starting the server, serving a copy of the test data."""
+    app = CustomLiveServerTestCase().create_app()
+    # The data is only loaded by the first request, so the app can still be pointed at other files
+    for key, path in TEST_CONFIG.items():
+        app.config[key] = str(tmp_path / os.path.basename(path))
+        if os.path.exists(path) and key.endswith('_DATA_PATH'):
+            shutil.copy(path, app.config[key])
+    yield app
+    app.extensions['gudlft'].close()
+
+@pytest.fixture(scope='function')
+def state(app):
+    """Provide the storage, registry, caches and metrics of the test application."""
+    return app.extensions['gudlft']
 
 @pytest.fixture(scope="function")
 def app_context(app):
@@ -91,28 +143,32 @@ def browser():
     driver.quit()
 
 @pytest.fixture
-def mock_iron_temple(mocker):
+def mock_data(app):
+    """Provide a function injecting arbitrary mocked clubs and competitions into the server."""
+    def _mock(clubs, competitions):
+        mock_registry(app, clubs, competitions)
+    return _mock
+
+@pytest.fixture
+def mock_iron_temple(app):
     """Prepare and inject mocked club (Iron Temple) and competition data (Spring Festival)"""
     mocked_clubs = [{'name': 'Iron Temple', 'email': 'admin@irontemple.com', 'points': 4}]
-    mocker.patch('server.clubs', new=mocked_clubs)
 
     mocked_competitions = [{'name': 'Spring Festival', 'numberOfPlaces': 5, 'date': '2028-12-31 10:00:00'}]
-    mocker.patch('server.competitions', new=mocked_competitions)
+    mock_registry(app, mocked_clubs, mocked_competitions)
 
 @pytest.fixture
-def mock_simply_lift(mocker):
+def mock_simply_lift(app):
     """Prepare and inject mocked club (Simply Lift) and competition data (Fall Classic)"""
     mocked_clubs = [{'name': 'Simply Lift', 'email': 'john@simplylift.co', 'points': 24}]
-    mocker.patch('server.clubs', new=mocked_clubs)
 
     mocked_competitions = [{'name': 'Fall Classic', 'numberOfPlaces': 30, 'date': '2026-12-31 10:00:00'}]
-    mocker.patch('server.competitions', new=mocked_competitions)
+    mock_registry(app, mocked_clubs, mocked_competitions)
 
 @pytest.fixture
-def mock_iron_temple_with_past_competition(mocker):
+def mock_iron_temple_with_past_competition(app):
     """Prepare and inject mocked club (Iron Temple) and competition data with a past competition."""
     mocked_clubs = [{'name': 'Iron Temple', 'email': 'admin@irontemple.com', 'points': 4}]
-    mocker.patch('server.clubs', new=mocked_clubs)
 
     # Get current date and future date
     current_datetime = datetime.now()
@@ -123,7 +179,7 @@ def mock_iron_temple_with_past_competition(mocker):
         {'name': 'Spring Festival', 'numberOfPlaces': 5, 'date': future_datetime.strftime('%Y-%m-%d %H:%M:%S')},
         {'name': 'Historic Match', 'numberOfPlaces': 10, 'date': past_date.strftime('%Y-%m-%d %H:%M:%S')}
     ]
-    mocker.patch('server.competitions', new=mocked_competitions)
+    mock_registry(app, mocked_clubs, mocked_competitions)
 
 @pytest.fixture
 def mock_load_clubs(mocker):
@@ -132,21 +188,19 @@ def mock_load_clubs(mocker):
     return mocker.patch('server.loadClubs', return_value=clubs_data)
 
 @pytest.fixture
-def mock_energy_club(mocker):
+def mock_energy_club(app):
     """Prepare and inject mocked club (Energy Club) and competition data (Energy Open)"""
     mocked_clubs = [{'name': 'Energy Club', 'email': 'contact@energyclub.com', 'points': 15}]
-    mocker.patch('server.clubs', new=mocked_clubs)
 
     mocked_competitions = [{'name': 'Energy Open', 'numberOfPlaces': 25, 'date': '2028-12-31 10:00:00'}]
-    mocker.patch('server.competitions', new=mocked_competitions)
+    mock_registry(app, mocked_clubs, mocked_competitions)
 
 @pytest.fixture
-def mock_availability_limitation(mocker):
+def mock_availability_limitation(app):
     """Setup mocked data for a specific competition and club to test availability limitations."""
     mocked_clubs = [{'name': 'Simply Lift', 'email': 'john@simplylift.co', 'points': '13'}]
     mocked_competitions = [{'name': 'Avail Festival', 'date': '2027-10-27 11:00:00', 'numberOfPlaces': '4'}]
-    mocker.patch('server.clubs', new=mocked_clubs)
-    mocker.patch('server.competitions', new=mocked_competitions)
+    mock_registry(app, mocked_clubs, mocked_competitions)
 
 @pytest.fixture
 def navigate_to_booking(browser):
@@ -0,0 +1,100 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+THREADS = 16
+BOOKINGS = 2000
+
+
+@pytest.fixture
+def stress_data(app, mocker, mock_data, tmp_path):
+    """Serve generated clubs and competitions, persisting them to temporary files."""
+    clubs = [{'name': f'Club {i}', 'email': f'club{i}@test.com', 'points': '1000'} for i in range(40)]
+    clubs.append({'name': 'Small Club', 'email': 'small@test.com', 'points': '20'})
+    competitions = [
+        {'name': 'Sold Out Open', 'date': '2099-01-01 10:00:00', 'numberOfPlaces': '300'},
+        {'name': 'Large Open', 'date': '2099-02-01 10:00:00', 'numberOfPlaces': '100000'}
+    ]
+    mock_data(clubs, competitions)
+    mocker.patch.dict(app.config, {
+        'CLUBS_DATA_PATH': str(tmp_path / 'clubs.json'),
+        'COMPETITIONS_DATA_PATH': str(tmp_path / 'competitions.json')
+    })
+    return clubs, competitions
+
+
+def run_bookings(app, bookings):
+    """Post every (club, competition) booking of one place from a pool of threads and return the status codes."""
+    def worker(chunk):
+        client = app.test_client()
+        return [
+            client.post('/purchasePlaces', data={'club': club, 'competition': competition, 'places': 1}).status_code
+            for club, competition in chunk
+        ]
+
+    chunks = [bookings[i::THREADS] for i in range(THREADS)]
+    with ThreadPoolExecutor(max_workers=THREADS) as executor:
+        return [status for statuses in executor.map(worker, chunks) for status in statuses]
+
+
+def test_concurrent_bookings_never_oversell(app, state, stress_data):
+    """
+    Fire thousands of concurrent bookings at a competition with 300 places and check that exactly 300 succeed.
+    """
+    clubs, _ = stress_data
+    bookings = [(clubs[i % 40]['name'], 'Sold Out Open') for i in range(BOOKINGS)]
+
+    statuses = run_bookings(app, bookings)
+
+    assert statuses.count(200) == 300
+    assert statuses.count(400) == BOOKINGS - 300
+    assert state.registry.competition_by_name('Sold Out Open')['numberOfPlaces'] == 0
+    assert sum(1000 - state.registry.club_by_name(club['name']).points for club in clubs[:40]) == 300
+
+    with open(app.config['COMPETITIONS_DATA_PATH']) as f:
+        saved = {c['name']: c for c in json.load(f)['competitions']}
+    assert int(saved['Sold Out Open']['numberOfPlaces']) == 0
+
+
+def test_concurrent_bookings_never_overdraw_points(app, state, stress_data):
+    """
+    Fire concurrent bookings for a club with 20 points across two competitions and check that exactly 20 succeed.
+    """
+    bookings = [('Small Club', 'Sold Out Open' if i % 2 else 'Large Open') for i in range(BOOKINGS)]
+
+    statuses = run_bookings(app, bookings)
+
+    assert statuses.count(200) == 20
+    assert state.registry.club_by_name('Small Club').points == 0
+    competitions = state.registry.competitions
+    assert sum(c.places for c in competitions) == 300 + 100000 - 20
+
+
+def test_snapshots_read_during_bookings_are_consistent(app, state, stress_data):
+    """
+    Read snapshots while concurrent bookings run and check that every one debits as many points as places.
+    """
+    clubs, _ = stress_data
+    bookings = [(clubs[i % 40]['name'], 'Large Open') for i in range(400)]
+    finished = threading.Event()
+
+    def reader():
+        readings = 0
+        while not finished.is_set():
+            snapshot = state.registry.snapshot()
+            points = sum(1000 - snapshot.club_by_name(club['name']).points for club in clubs[:40])
+            assert points == 100000 - snapshot.competition_by_name('Large Open').places
+            readings += 1
+            time.sleep(0.001)
+        return readings
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        readers = [executor.submit(reader) for _ in range(2)]
+        statuses = run_bookings(app, bookings)
+        finished.set()
+        assert all(future.result() > 0 for future in readers)
+
+    assert statuses.count(200) == 400
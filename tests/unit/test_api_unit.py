@@ -0,0 +1,131 @@
+import pytest
+
+
+@pytest.fixture
+def mock_api_data(mock_data):
+    """Prepare and inject two clubs and an upcoming and a past competition."""
+    mock_data(
+        [
+            {'name': 'Iron Temple', 'email': 'admin@irontemple.com', 'points': '4'},
+            {'name': 'Simply Lift', 'email': 'john@simplylift.co', 'points': '13'}
+        ],
+        [
+            {'name': 'Spring Festival', 'numberOfPlaces': '25', 'date': '2099-03-27 10:00:00'},
+            {'name': 'Historic Match', 'numberOfPlaces': '20', 'date': '2020-05-15 09:30:00'}
+        ]
+    )
+
+
+def test_api_lists_competitions_and_clubs(client, mock_api_data):
+    """
+    Test that competitions and club balances are listed as JSON.
+    """
+    competitions = client.get('/api/competitions').get_json()
+    assert competitions == {
+        'competitions': [
+            {'name': 'Spring Festival', 'date': '2099-03-27 10:00:00', 'numberOfPlaces': 25, 'isPast': False},
+            {'name': 'Historic Match', 'date': '2020-05-15 09:30:00', 'numberOfPlaces': 20, 'isPast': True}
+        ],
+        'nextCursor': None
+    }
+    assert client.get('/api/clubs/Iron Temple').get_json() == {'name': 'Iron Temple', 'points': 4}
+    assert client.get('/api/clubs/Unknown Club').status_code == 404
+
+
+def test_api_books_a_batch_with_one_write(client, state, mock_api_data, mocker):
+    """
+    Test that a batch of bookings is applied and persisted in a single write.
+    """
+    save = mocker.patch.object(state.storage, 'save')
+
+    response = client.post('/api/bookings', json={'bookings': [
+        {'club': 'Iron Temple', 'competition': 'Spring Festival', 'places': 3},
+        {'club': 'Simply Lift', 'competition': 'Spring Festival', 'places': 10}
+    ]})
+
+    assert response.status_code == 200
+    assert response.get_json()['clubs'] == [{'name': 'Iron Temple', 'points': 1}, {'name': 'Simply Lift', 'points': 3}]
+    assert state.registry.competition_by_name('Spring Festival').places == 12
+    assert save.call_count == 1
+
+
+@pytest.mark.parametrize("bookings, expected_message, expected_position", [
+    # The second booking overdraws the points left by the first one
+    ([('Iron Temple', 'Spring Festival', 3), ('Iron Temple', 'Spring Festival', 2)], 'Not enough points', 1),
+    ([('Simply Lift', 'Spring Festival', 1), ('Simply Lift', 'Historic Match', 1)], 'Cannot book places for past competitions', 1),
+    ([('Simply Lift', 'Spring Festival', 13)], 'Cannot book more than 12 places per competition', 0),
+    # The cap counts the places booked earlier in the batch
+    ([('Simply Lift', 'Spring Festival', 8), ('Simply Lift', 'Spring Festival', 5)], 'Cannot book more than 12 places per competition', 1),
+    ([('Simply Lift', 'Spring Festival', 0)], 'You must book at least 1 place.', 0),
+])
+def test_api_batch_is_all_or_nothing(client, state, mock_api_data, mocker, bookings, expected_message, expected_position):
+    """
+    Test that a batch breaking a booking rule is refused as a whole and reports the refused booking.
+    """
+    save = mocker.patch.object(state.storage, 'save')
+
+    response = client.post('/api/bookings', json={'bookings': [
+        {'club': club, 'competition': competition, 'places': places} for club, competition, places in bookings
+    ]})
+
+    assert response.status_code == 400
+    assert response.get_json() == {'error': expected_message, 'position': expected_position}
+    assert state.registry.club_by_name('Iron Temple').points == 4
+    assert state.registry.club_by_name('Simply Lift').points == 13
+    assert state.registry.competition_by_name('Spring Festival').places == 25
+    save.assert_not_called()
+
+
+def test_api_competition_page_size_is_checked(app, client, mock_api_data, mocker):
+    """
+    Test that page sizes below 1 are refused, and sizes above the maximum are cut down to it.
+    """
+    mocker.patch.dict(app.config, {'API_MAX_PAGE_SIZE': 1})
+
+    for size in (0, -1):
+        response = client.get(f'/api/competitions?size={size}')
+        assert response.status_code == 400
+        assert response.get_json() == {'error': 'The page size must be at least 1.'}
+
+    page = client.get('/api/competitions?size=1000').get_json()
+    assert [comp['name'] for comp in page['competitions']] == ['Spring Festival']
+    assert page['nextCursor'] == 'Spring Festival'
+
+
+def test_api_rejects_malformed_batches(client, mock_api_data):
+    """
+    Test that malformed batches are refused before anything is booked.
+    """
+    assert client.post('/api/bookings', json={'bookings': []}).status_code == 400
+    response = client.post('/api/bookings', json={'bookings': [{'club': 'Iron Temple', 'competition': 'Unknown', 'places': 1}]})
+    assert response.get_json() == {'error': 'Unknown club or competition.', 'position': 0}
+    response = client.post('/api/bookings', json={'bookings': [{'club': 'Iron Temple', 'competition': 'Spring Festival', 'places': '1'}]})
+    assert response.status_code == 400
+    response = client.post('/api/bookings', json={'bookings': [{'club': ['Iron Temple'], 'competition': 'Spring Festival', 'places': 1}]})
+    assert response.status_code == 400
+    assert response.get_json() == {'error': 'The club and competition must be given by name.', 'position': 0}
+
+
+def test_api_lists_bookings_from_the_ledger(client, mock_api_data):
+    """
+    Test that the places booked by a club, and in a competition, are listed from the booking ledger.
+    """
+    client.post('/api/bookings', json={'bookings': [
+        {'club': 'Iron Temple', 'competition': 'Spring Festival', 'places': 1},
+        {'club': 'Simply Lift', 'competition': 'Spring Festival', 'places': 4},
+        {'club': 'Iron Temple', 'competition': 'Spring Festival', 'places': 2}
+    ]})
+
+    assert client.get('/api/clubs/Iron Temple/bookings').get_json() == {
+        'club': 'Iron Temple',
+        'bookings': [{'competition': 'Spring Festival', 'places': 3}],
+        'maxPlacesPerCompetition': 12
+    }
+    competition = client.get('/api/competitions/Spring Festival/bookings').get_json()
+    assert sorted(competition['bookings'], key=lambda b: b['club']) == [
+        {'club': 'Iron Temple', 'places': 3}, {'club': 'Simply Lift', 'places': 4}]
+    assert competition['totalPlaces'] == 7
+    assert client.get('/api/clubs/Simply Lift/bookings').get_json()['bookings'] == [
+        {'competition': 'Spring Festival', 'places': 4}]
+    assert client.get('/api/competitions/Historic Match/bookings').get_json()['bookings'] == []
+    assert client.get('/api/competitions/Unknown/bookings').status_code == 404
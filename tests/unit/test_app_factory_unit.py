@@ -0,0 +1,145 @@
+import json
+import time
+
+from server import create_app
+
+
+def test_create_app_loads_data_on_first_access(dataset, tmp_path):
+    """
+    Test that creating the app reads no data, and that the first request needing the clubs loads them.
+    """
+    config = dataset()
+    app = create_app(dict(config, CLUBS_DATA_PATH=str(tmp_path / 'missing.json')))
+    state = app.extensions['gudlft']
+    assert not state.loaded
+
+    # Pages not reading the clubs leave them unloaded
+    client = app.test_client()
+    assert client.get('/metrics').status_code == 200
+    assert not state.loaded
+
+    app.config['CLUBS_DATA_PATH'] = config['CLUBS_DATA_PATH']
+    assert client.get('/api/clubs').get_json() == {'clubs': [{'name': 'Simply Lift', 'points': 13}]}
+    assert state.loaded
+    state.close()
+
+
+def test_apps_with_different_data_coexist(dataset):
+    """
+    Test that apps created in one process serve and book their own data.
+    """
+    app_a = create_app(dataset(directory='a'))
+    app_b = create_app(dataset([{'name': 'Iron Temple', 'email': 'admin@irontemple.com', 'points': '4'}], directory='b'))
+
+    response = app_a.test_client().post('/purchasePlaces', data={'club': 'Simply Lift', 'competition': 'Fall Classic', 'places': 2})
+    assert response.status_code == 200
+
+    assert app_a.test_client().get('/api/clubs').get_json() == {'clubs': [{'name': 'Simply Lift', 'points': 11}]}
+    assert app_b.test_client().get('/api/clubs').get_json() == {'clubs': [{'name': 'Iron Temple', 'points': 4}]}
+    assert app_b.extensions['gudlft'].registry.competition_by_name('Fall Classic').places == 23
+    app_a.extensions['gudlft'].close()
+    app_b.extensions['gudlft'].close()
+
+
+def test_warm_up_loads_data_in_background(dataset):
+    """
+    Test that with WARM_UP the data is loaded by a background thread, ahead of the first request.
+    """
+    app = create_app(dict(dataset(), WARM_UP=True))
+    state = app.extensions['gudlft']
+
+    deadline = time.monotonic() + 5
+    while not state.loaded and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert state.loaded
+    assert state.registry.club_by_name('Simply Lift').points == 13
+    state.close()
+
+
+def test_export_json_in_journal_mode_does_not_replay_bookings(dataset):
+    """
+    Test that exporting the JSON files in journal mode does not apply the journal a second time at the next start.
+    """
+    config = dict(dataset(), PERSISTENCE_MODE='journal')
+    app = create_app(config)
+    response = app.test_client().post('/purchasePlaces', data={'club': 'Simply Lift', 'competition': 'Fall Classic', 'places': 3})
+    assert response.status_code == 200
+    result = app.test_cli_runner().invoke(args=['export-json'])
+    assert result.exit_code == 0, result.output
+    app.extensions['gudlft'].close()
+
+    restarted = create_app(config)
+    registry = restarted.extensions['gudlft'].registry
+    assert registry.club_by_name('Simply Lift').points == 10
+    assert registry.club_by_name('Simply Lift').booked_places('Fall Classic') == 3
+    assert registry.competition_by_name('Fall Classic').places == 20
+    restarted.extensions['gudlft'].close()
+
+
+def test_trusted_proxies_rate_limit_forwarded_addresses(dataset):
+    """
+    Test that with TRUSTED_PROXIES, clients behind the proxy are rate limited by their forwarded address rather than the proxy's.
+    """
+    app = create_app(dict(dataset(), TRUSTED_PROXIES=1, RATE_LIMIT_PER_SECOND=0.01, RATE_LIMIT_BURST=1))
+    client = app.test_client()
+
+    def login(address, email):
+        return client.post('/showSummary', data={'email': email}, headers={'X-Forwarded-For': address}).status_code
+
+    # Each email is limited too, so each login uses another one
+    assert login('203.0.113.1', 'john@simplylift.co') == 200
+    assert login('203.0.113.2', 'unknown@test.com') == 400
+    assert login('203.0.113.1', 'other@test.com') == 429
+    app.extensions['gudlft'].close()
+
+
+def test_workers_give_pages_the_same_etag(dataset):
+    """
+    Test that apps sharing a database, as workers do, tag identical pages alike, before and after a booking.
+    """
+    config = dict(dataset(), PERSISTENCE_MODE='sqlite')
+    workers = [create_app(config).test_client() for _ in range(2)]
+
+    def etags(path):
+        return [worker.get(path).headers['ETag'] for worker in workers]
+
+    first = etags('/')
+    assert first[0] == first[1]
+    assert len(set(etags('/competitions/Simply Lift'))) == 1
+
+    workers[0].post('/purchasePlaces', data={'club': 'Simply Lift', 'competition': 'Fall Classic', 'places': 2})
+
+    after = etags('/')
+    assert after[0] == after[1] != first[0]
+    assert len(set(etags('/competitions/Simply Lift'))) == 1
+    for worker in workers:
+        worker.application.extensions['gudlft'].close()
+
+
+def test_workers_pick_up_json_imports(dataset):
+    """
+    Test that a worker sharing the database picks up clubs changed and added by `flask import-json`.
+    """
+    config = dict(dataset(), PERSISTENCE_MODE='sqlite')
+    worker = create_app(config)
+    assert worker.test_client().get('/api/clubs/Simply Lift').get_json()['points'] == 13
+
+    clubs = [{'name': 'Simply Lift', 'email': 'john@simplylift.co', 'points': '99'},
+             {'name': 'New Club', 'email': 'new@test.com', 'points': '10'}]
+    with open(config['CLUBS_DATA_PATH'], 'w') as f:
+        json.dump({'clubs': clubs}, f)
+    importer = create_app(config)
+    assert importer.test_cli_runner().invoke(args=['import-json']).exit_code == 0
+    # Booked by a process started after the import, and so knowing the new club
+    response = importer.test_client().post('/purchasePlaces', data={'club': 'New Club', 'competition': 'Fall Classic', 'places': 1})
+    assert response.status_code == 200
+
+    client = worker.test_client()
+    assert client.get('/api/clubs/Simply Lift').get_json()['points'] == 99
+    assert client.get('/api/clubs/New Club').get_json()['points'] == 9
+    response = client.post('/purchasePlaces', data={'club': 'Simply Lift', 'competition': 'Fall Classic', 'places': 1})
+    assert response.status_code == 200
+    assert importer.test_client().get('/api/clubs/Simply Lift').get_json()['points'] == 98
+    worker.extensions['gudlft'].close()
+    importer.extensions['gudlft'].close()
@@ -0,0 +1,65 @@
+import asyncio
+import threading
+from urllib.parse import urlencode
+
+from gudlft.asgi import AsyncApp
+
+
+def asgi_request(asgi_app, method, path, form=None):
+    """Send one HTTP request to an ASGI app and return the status, headers and body of the response."""
+    body = urlencode(form).encode() if form else b''
+    host = (asgi_app.wsgi_app.config['SERVER_NAME'] or 'localhost').encode()
+    scope = {
+        'type': 'http', 'method': method, 'path': path, 'query_string': b'', 'http_version': '1.1',
+        'headers': [(b'host', host), (b'content-type', b'application/x-www-form-urlencoded'),
+                    (b'content-length', str(len(body)).encode())],
+        'server': ('localhost', 5000), 'client': ('127.0.0.1', 50000), 'scheme': 'http'
+    }
+    messages = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': body, 'more_body': False}
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(asgi_app(scope, receive, send))
+    start, response_body = messages
+    return start['status'], dict(start['headers']), response_body['body'].decode()
+
+
+def test_asgi_app_serves_the_routes(app, mock_iron_temple):
+    """
+    Test that pages and bookings are served through the ASGI adapter like through WSGI.
+    """
+    asgi_app = AsyncApp(app)
+
+    status, headers, body = asgi_request(asgi_app, 'POST', '/showSummary', {'email': 'admin@irontemple.com'})
+    assert status == 200
+    assert headers[b'content-type'].startswith(b'text/html')
+    assert 'Spring Festival' in body
+
+    status, _, body = asgi_request(asgi_app, 'POST', '/purchasePlaces', {'club': 'Iron Temple', 'competition': 'Spring Festival', 'places': 1})
+    assert status == 200
+    assert 'Great-booking complete!' in body
+    asgi_app.close()
+
+
+def test_bookings_run_apart_from_reads(app, state, mock_iron_temple, mocker):
+    """
+    Test that booking requests run on the write threads and pages on the read threads.
+    """
+    threads = {}
+    book = state.booking_engine.book
+    mocker.patch.object(state.booking_engine, 'book',
+                        side_effect=lambda *args: threads.setdefault('book', threading.current_thread().name) and book(*args))
+    mocker.patch.object(state.points_board, 'clubs',
+                        side_effect=lambda key, load: threads.setdefault('index', threading.current_thread().name) and [])
+    asgi_app = AsyncApp(app)
+
+    asgi_request(asgi_app, 'POST', '/purchasePlaces', {'club': 'Iron Temple', 'competition': 'Spring Festival', 'places': 1})
+    asgi_request(asgi_app, 'GET', '/')
+
+    assert threads['book'].startswith('gudlft-write')
+    assert threads['index'].startswith('gudlft-read')
+    asgi_app.close()
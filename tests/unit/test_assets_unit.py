@@ -0,0 +1,76 @@
+import gzip
+
+import pytest
+
+from flask import url_for
+
+from gudlft.assets import build_assets, load_manifest, minify_css
+
+
+@pytest.fixture
+def built_static(app, state, mocker, tmp_path):
+    """Serve a static folder holding one stylesheet, built with `build_assets`."""
+    (tmp_path / 'vendor').mkdir()
+    (tmp_path / 'vendor' / 'theme.css').write_text('/*! Theme v1 */\nbody {\n    color: red; /* text */\n}\n')
+    manifest = build_assets(str(tmp_path))
+    mocker.patch.object(state, 'asset_manifest', new=manifest)
+    mocker.patch.object(state, 'built_assets', new=set(manifest.values()))
+    static_folder = app.static_folder
+    app.static_folder = str(tmp_path)
+    yield tmp_path, manifest
+    app.static_folder = static_folder
+
+
+def test_minify_css_keeps_license_comments():
+    """
+    Test that comments and whitespace are removed, except license comments.
+    """
+    css = '/*! License */\n.a ,  .b > p {\n    margin : 0 ;\n    /* note */\n    color: #fff;\n}\n'
+    assert minify_css(css) == '/*! License */\n.a,.b>p{margin:0;color:#fff}'
+
+
+def test_build_assets_fingerprints_and_precompresses(built_static):
+    """
+    Test that built assets are named after their content, minified, gzipped and listed in the manifest.
+    """
+    static_folder, manifest = built_static
+    built = manifest['vendor/theme.css']
+    assert built.startswith('dist/vendor/theme.') and built.endswith('.css')
+
+    data = (static_folder / built).read_bytes()
+    assert data == b'/*! Theme v1 */\nbody{color:red}'
+    assert gzip.decompress((static_folder / (built + '.gz')).read_bytes()) == data
+    assert load_manifest(str(static_folder)) == manifest
+
+    # A new build of unchanged sources gives the same names
+    assert build_assets(str(static_folder)) == manifest
+
+
+def test_static_urls_link_to_built_assets(app, built_static):
+    """
+    Test that url_for('static') links to the built copy of an asset, and to the source of unbuilt files.
+    """
+    _, manifest = built_static
+    with app.test_request_context():
+        assert url_for('static', filename='vendor/theme.css') == '/static/' + manifest['vendor/theme.css']
+        assert url_for('static', filename='logo.png') == '/static/logo.png'
+
+
+def test_built_assets_served_precompressed_and_immutable(client, built_static):
+    """
+    Test that a built asset is served gzipped to clients accepting it, with immutable cache headers.
+    """
+    _, manifest = built_static
+    url = '/static/' + manifest['vendor/theme.css']
+
+    response = client.get(url, headers={'Accept-Encoding': 'gzip, deflate'})
+    assert response.status_code == 200
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert response.headers['Content-Type'].startswith('text/css')
+    assert response.headers['Cache-Control'] == 'public, max-age=31536000, immutable'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert gzip.decompress(response.data) == b'/*! Theme v1 */\nbody{color:red}'
+
+    plain = client.get(url)
+    assert 'Content-Encoding' not in plain.headers
+    assert plain.data == b'/*! Theme v1 */\nbody{color:red}'
@@ -0,0 +1,64 @@
+import gzip
+
+from flask import Response
+from werkzeug.datastructures import Accept
+
+from gudlft.compression import ResponseCompressor
+
+
+def make_clubs(count):
+    return [{'name': f'Club {i}', 'email': f'club{i}@test.com', 'points': '10'} for i in range(count)]
+
+
+def test_compressor_skips_small_and_unaccepted_responses():
+    """
+    Test that bodies below the threshold, or sent to clients not accepting any encoding, are left alone.
+    """
+    compressor = ResponseCompressor(min_size=100)
+    small = compressor.compress(Response('x' * 99), Accept([('gzip', 1)]))
+    assert 'Content-Encoding' not in small.headers
+    unaccepted = compressor.compress(Response('x' * 1000), Accept([('identity', 1)]))
+    assert 'Content-Encoding' not in unaccepted.headers
+    assert 'Accept-Encoding' in unaccepted.headers['Vary']
+
+    png = compressor.compress(Response(b'x' * 1000, mimetype='image/png'), Accept([('gzip', 1)]))
+    assert 'Content-Encoding' not in png.headers
+
+
+def test_index_compressed_once_per_version(client, state, mock_data):
+    """
+    Test that the board is gzipped for clients accepting it, and compressed once until the data changes.
+    """
+    mock_data(make_clubs(1), [{'name': 'Spring Festival', 'date': '2099-03-27 10:00:00', 'numberOfPlaces': '25'}])
+    compressor = state.compressor
+    plain = client.get('/')
+    first = client.get('/', headers={'Accept-Encoding': 'gzip'})
+    second = client.get('/', headers={'Accept-Encoding': 'gzip'})
+
+    assert 'Content-Encoding' not in plain.headers
+    assert first.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(first.data) == plain.data
+    assert len(first.data) < len(plain.data)
+    assert second.data == first.data
+    assert (compressor.misses, compressor.hits) == (1, 1)
+
+    # The compressed page gets a weak ETag, which still validates the page
+    assert first.headers['ETag'] == 'W/' + plain.headers['ETag']
+    cached = client.get('/', headers={'Accept-Encoding': 'gzip', 'If-None-Match': first.headers['ETag']})
+    assert cached.status_code == 304
+    # The 304 carries the same validators as the compressed page it stands for
+    assert cached.headers['ETag'] == first.headers['ETag']
+    assert 'Accept-Encoding' in cached.headers['Vary']
+    plain_cached = client.get('/', headers={'If-None-Match': plain.headers['ETag']})
+    assert plain_cached.headers['ETag'] == plain.headers['ETag']
+
+
+def test_posted_pages_compressed(client, mock_data):
+    """
+    Test that pages without an ETag, such as the club summary, are compressed too.
+    """
+    mock_data(make_clubs(1), [
+        {'name': f'Competition {i}', 'date': '2099-03-27 10:00:00', 'numberOfPlaces': '25'} for i in range(50)])
+    response = client.post('/showSummary', data={'email': 'club0@test.com'}, headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert b'Competition 49' in gzip.decompress(response.data)
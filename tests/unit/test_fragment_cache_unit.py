@@ -0,0 +1,46 @@
+from gudlft.cache import FragmentCache
+
+
+def test_fragment_cache_counts_hits_and_misses():
+    """
+    Test that a fragment is rendered once per key and served from the cache afterwards.
+    """
+    cache = FragmentCache()
+    renders = []
+
+    def render():
+        renders.append(1)
+        return '<tr></tr>'
+
+    cache.fragment(('club', 'Iron Temple'), ('4',), render)
+    cache.fragment(('club', 'Iron Temple'), ('4',), render)
+    cache.fragment(('club', 'Iron Temple'), ('2',), render)
+
+    assert len(renders) == 2
+    assert cache.stats()['hits'] == 1
+    assert cache.stats()['misses'] == 2
+
+
+def test_fragment_cache_invalidates_only_the_touched_group():
+    """
+    Test that invalidating a competition only drops the rows rendered for it.
+    """
+    cache = FragmentCache()
+    cache.fragment(('competition', 'Spring Festival'), ('Iron Temple',), lambda: 'spring')
+    cache.fragment(('competition', 'Fall Classic'), ('Iron Temple',), lambda: 'fall')
+
+    cache.invalidate(('competition', 'Spring Festival'))
+
+    assert cache.stats()['fragments'] == 1
+    assert cache.fragment(('competition', 'Fall Classic'), ('Iron Temple',), lambda: 'rerendered') == 'fall'
+
+
+def test_summary_rows_rerendered_after_booking(client, state, mock_iron_temple):
+    """
+    Test that the summary page shows the places left after a booking, re-rendering only the booked competition's row.
+    """
+    client.post('/showSummary', data={'email': 'admin@irontemple.com'})
+    response = client.post('/purchasePlaces', data={'club': 'Iron Temple', 'competition': 'Spring Festival', 'places': 2})
+
+    assert '<td>3</td>' in response.get_data(as_text=True)
+    assert state.fragments.stats()['misses'] == 4, "Only the booked row and the summary table should be rendered again"
@@ -0,0 +1,67 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from gudlft.group_commit import GroupCommitter
+
+
+def test_concurrent_commits_share_writes():
+    """
+    Test that bookings committed concurrently are written in fewer writes, each booking exactly once.
+    """
+    writes = []
+    committer = GroupCommitter(lambda registry, bookings: writes.append(list(bookings)), window=0.05, max_batch=10)
+
+    with ThreadPoolExecutor(max_workers=20) as executor:
+        list(executor.map(lambda i: committer.commit(None, [i]), range(40)))
+
+    assert sorted(booking for batch in writes for booking in batch) == list(range(40))
+    assert len(writes) < 40
+    assert max(len(batch) for batch in writes) <= 10
+
+
+def test_commit_returns_only_once_written():
+    """
+    Test that a commit blocks until the write of its batch has finished.
+    """
+    release = threading.Event()
+    written = []
+
+    def write(registry, bookings):
+        release.wait()
+        written.extend(bookings)
+
+    committer = GroupCommitter(write)
+    thread = threading.Thread(target=committer.commit, args=(None, ['booking']))
+    thread.start()
+    thread.join(0.1)
+    assert thread.is_alive()
+
+    release.set()
+    thread.join(1)
+    assert written == ['booking']
+
+
+def test_write_error_is_raised_to_every_commit_of_the_batch():
+    """
+    Test that every request sharing a failed write gets its error.
+    """
+    def write(registry, bookings):
+        raise OSError('disk full')
+
+    committer = GroupCommitter(write, window=0.05)
+    errors = []
+
+    def commit(i):
+        try:
+            committer.commit(None, [i])
+        except OSError as error:
+            errors.append(error)
+
+    with ThreadPoolExecutor(max_workers=5) as executor:
+        list(executor.map(commit, range(5)))
+
+    assert len(errors) == 5
+    with pytest.raises(OSError):
+        committer.commit(None, ['again'])
@@ -0,0 +1,64 @@
+from urllib.parse import quote
+
+
+def test_index_answers_not_modified_until_data_changes(client, mock_energy_club, mock_load_clubs):
+    """
+    Test that the board is answered with 304 and no rendering while its ETag matches, and re-sent after a booking.
+    """
+    first = client.get('/')
+    etag = first.headers['ETag']
+    assert first.headers['Cache-Control'] == 'public, no-cache'
+
+    cached = client.get('/', headers={'If-None-Match': etag})
+    assert cached.status_code == 304
+    assert cached.data == b''
+    assert cached.headers['ETag'] == etag
+    assert mock_load_clubs.call_count == 1, "A 304 answer should not load the clubs"
+
+    client.post('/purchasePlaces', data={'club': 'Energy Club', 'competition': 'Energy Open', 'places': 1})
+    updated = client.get('/', headers={'If-None-Match': etag})
+    assert updated.status_code == 200
+    assert updated.headers['ETag'] != etag
+
+
+def test_book_page_etag_follows_its_club_and_competition(client, mock_data):
+    """
+    Test that the booking page keeps its ETag when other records change, and gets a new one when its own change.
+    """
+    mock_data(
+        [{'name': 'Iron Temple', 'email': 'admin@irontemple.com', 'points': '10'},
+         {'name': 'Simply Lift', 'email': 'john@simplylift.co', 'points': '10'}],
+        [{'name': 'Spring Festival', 'date': '2099-03-27 10:00:00', 'numberOfPlaces': '25'},
+         {'name': 'Fall Classic', 'date': '2099-10-22 13:30:00', 'numberOfPlaces': '13'}])
+    url = f"/book/{quote('Spring Festival')}/{quote('Iron Temple')}"
+    etag = client.get(url).headers['ETag']
+
+    client.post('/purchasePlaces', data={'club': 'Simply Lift', 'competition': 'Fall Classic', 'places': 1})
+    assert client.get(url, headers={'If-None-Match': etag}).status_code == 304
+
+    client.post('/purchasePlaces', data={'club': 'Iron Temple', 'competition': 'Spring Festival', 'places': 1})
+    response = client.get(url, headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+
+
+def test_pages_with_flashed_messages_are_not_cached(client, mock_iron_temple):
+    """
+    Test that a page showing a flashed message is always rendered and carries no ETag.
+    """
+    etag = client.get('/').headers['ETag']
+    with client.session_transaction() as session:
+        session['_flashes'] = [('message', 'Welcome back')]
+
+    response = client.get('/', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert 'ETag' not in response.headers
+    assert 'Welcome back' in response.get_data(as_text=True)
+
+
+def test_shared_cache_max_age(client, mock_iron_temple, mocker, app):
+    """
+    Test that a configured shared cache lifetime lets proxies keep the page while browsers revalidate.
+    """
+    mocker.patch.dict(app.config, {'SHARED_CACHE_MAX_AGE': 30})
+    assert client.get('/').headers['Cache-Control'] == 'public, max-age=0, s-maxage=30'
@@ -14,4 +14,21 @@ def test_index_club_points_display(client, mock_load_clubs):
     page_content = response.get_data(as_text=True)
     for club in expected_clubs:
         assert club['name'] in page_content, f"Club name {club['name']} not found in the response"
-        assert str(club['points']) in page_content, f"Club points {club['points']} for {club['name']} not found in the response"
\ No newline at end of file
+        assert str(club['points']) in page_content, f"Club points {club['points']} for {club['name']} not found in the response"
+
+def test_index_club_points_cached_until_data_changes(client, state, mock_energy_club, mock_load_clubs, mocker):
+    """
+    Test that the points board is loaded once, and reloaded only after a booking or an edit of the stored data.
+    """
+    client.get('/')
+    client.get('/')
+    assert mock_load_clubs.call_count == 1, "The clubs should not be reloaded while nothing changed"
+
+    client.post('/purchasePlaces', data={'club': 'Energy Club', 'competition': 'Energy Open', 'places': 1})
+    client.get('/')
+    assert mock_load_clubs.call_count == 2, "The clubs should be reloaded after a booking"
+
+    mocker.patch.object(state.storage, 'signature', return_value=('edited',))
+    client.get('/')
+    client.get('/')
+    assert mock_load_clubs.call_count == 3, "The clubs should be reloaded once after the data files are edited"
@@ -0,0 +1,107 @@
+import pytest
+
+from gudlft.journal import BookingJournal, read_snapshot
+
+
+@pytest.fixture
+def snapshot_paths(dataset):
+    """Paths of the journal and of the default dataset it is applied to."""
+    config = dataset()
+    return config['JOURNAL_PATH'], config['CLUBS_DATA_PATH'], config['COMPETITIONS_DATA_PATH']
+
+
+def test_journal_replays_bookings_after_restart(snapshot_paths):
+    """
+    Test that bookings appended to the journal are applied on top of the snapshot at the next startup.
+    """
+    journal = BookingJournal(*snapshot_paths)
+    journal.recover()
+    journal.append('Simply Lift', 'Fall Classic', 2)
+    journal.append('Simply Lift', 'Fall Classic', 3)
+    journal.close()
+
+    clubs, competitions = BookingJournal(*snapshot_paths).recover()
+    assert clubs[0]['points'] == '8'
+    assert clubs[0]['bookings'] == {'Fall Classic': 5}
+    assert competitions[0]['numberOfPlaces'] == 18
+
+
+def test_journal_ignores_truncated_record(snapshot_paths):
+    """
+    Test that a record cut short by a crash during an append is not replayed.
+    """
+    journal = BookingJournal(*snapshot_paths)
+    journal.recover()
+    journal.append('Simply Lift', 'Fall Classic', 2)
+    journal.close()
+    with open(snapshot_paths[0], 'a') as f:
+        f.write('{"seq":2,"club":"Simply')
+
+    clubs, _ = BookingJournal(*snapshot_paths).recover()
+    assert clubs[0]['points'] == '11'
+
+
+def test_journal_appends_after_truncated_record(snapshot_paths):
+    """
+    Test that a booking made after recovering from a truncated record is replayed at the next restart.
+    """
+    journal = BookingJournal(*snapshot_paths)
+    journal.recover()
+    journal.append('Simply Lift', 'Fall Classic', 2)
+    journal.close()
+    with open(snapshot_paths[0], 'a') as f:
+        f.write('{"seq":2,"club":"Simply')
+
+    journal = BookingJournal(*snapshot_paths)
+    journal.recover()
+    journal.append('Simply Lift', 'Fall Classic', 3)
+    journal.close()
+
+    clubs, competitions = BookingJournal(*snapshot_paths).recover()
+    assert clubs[0]['points'] == '8'
+    assert competitions[0]['numberOfPlaces'] == 18
+
+
+def test_journal_compaction_folds_bookings_into_snapshot(snapshot_paths):
+    """
+    Test that reaching the size threshold compacts the journal into the snapshot files without replaying twice.
+    """
+    journal_path, clubs_path, competitions_path = snapshot_paths
+    journal = BookingJournal(journal_path, clubs_path, competitions_path, max_bytes=1)
+    journal.recover()
+    journal.append('Simply Lift', 'Fall Classic', 4)
+    journal.close()
+
+    clubs, sequence = read_snapshot(clubs_path, 'clubs')
+    assert clubs[0]['points'] == '9'
+    assert sequence == 1
+
+    clubs, competitions = BookingJournal(*snapshot_paths).recover()
+    assert clubs[0]['points'] == '9'
+    assert competitions[0]['numberOfPlaces'] == 19
+
+
+
+
+def test_journal_failed_compaction_keeps_its_bookings(snapshot_paths, mocker):
+    """
+    Test that the bookings of a compaction that failed are folded in by the next one rather than overwritten.
+    """
+    journal_path, clubs_path, competitions_path = snapshot_paths
+    mocker.patch('gudlft.journal.write_snapshot', side_effect=OSError('No space left on device'))
+    journal = BookingJournal(journal_path, clubs_path, competitions_path, max_bytes=1)
+    journal.recover()
+    journal.append('Simply Lift', 'Fall Classic', 1)
+    journal.wait_for_compaction()
+    assert isinstance(journal.compaction_error, OSError)
+    mocker.stopall()
+
+    for _ in range(2):
+        journal.append('Simply Lift', 'Fall Classic', 1)
+        journal.wait_for_compaction()
+    journal.close()
+
+    assert journal.compaction_error is None
+    clubs, competitions = BookingJournal(*snapshot_paths).recover()
+    assert clubs[0]['points'] == '10'
+    assert competitions[0]['numberOfPlaces'] == 20
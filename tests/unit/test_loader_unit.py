@@ -0,0 +1,62 @@
+import json
+
+import pytest
+
+from gudlft.loader import iter_records, load_records
+
+
+@pytest.fixture
+def clubs_file(tmp_path):
+    """Write a clubs file with records containing braces, escapes and nested values."""
+    clubs = [
+        {'name': 'Simply Lift', 'email': 'john@simplylift.co', 'points': '13'},
+        {'name': 'Iron {Temple}', 'email': 'admin@irontemple.com', 'points': '4'},
+        {'name': 'She "Lifts"', 'email': 'kate@shelifts.co.uk', 'points': '12', 'tags': [{'a': '}'}, 1.5, None]},
+    ]
+    path = tmp_path / 'clubs.json'
+    path.write_text(json.dumps({'clubs': clubs, 'sequence': 42}, indent=4))
+    return path, clubs
+
+
+@pytest.mark.parametrize('chunk_size', [1, 7, 64, 1 << 20])
+def test_streamed_records_match_json_load(clubs_file, chunk_size):
+    """
+    Test that the streaming loader returns the same records as json.load, whatever the chunk boundaries.
+    """
+    path, clubs = clubs_file
+    extra = {}
+
+    assert load_records(str(path), 'clubs', extra, chunk_size=chunk_size) == clubs
+    assert extra == {'sequence': 42}
+
+
+def test_records_are_yielded_one_at_a_time(clubs_file):
+    """
+    Test that records can be consumed before the rest of the file is read.
+    """
+    path, clubs = clubs_file
+
+    assert next(iter_records(str(path), 'clubs', chunk_size=16)) == clubs[0]
+
+
+def test_missing_or_empty_array(tmp_path):
+    """
+    Test that an empty array loads as no records and a missing key raises KeyError.
+    """
+    path = tmp_path / 'competitions.json'
+    path.write_text('{"competitions": [ ]}')
+
+    assert load_records(str(path), 'competitions') == []
+    with pytest.raises(KeyError):
+        load_records(str(path), 'clubs')
+
+
+def test_malformed_file_raises(tmp_path):
+    """
+    Test that a truncated file raises a JSON decoding error.
+    """
+    path = tmp_path / 'clubs.json'
+    path.write_text('{"clubs": [{"name": "Simply Lift"}, {"name": ')
+
+    with pytest.raises(json.JSONDecodeError):
+        load_records(str(path), 'clubs', chunk_size=8)
@@ -0,0 +1,48 @@
+from gudlft.metrics import Histogram
+
+
+def test_histogram_renders_cumulative_buckets():
+    """
+    Test that histogram buckets are cumulative and end with the total count and sum.
+    """
+    histogram = Histogram('latency_seconds', 'Latency.', ('route',), buckets=(0.1, 1.0))
+    histogram.observe(('index',), 0.05)
+    histogram.observe(('index',), 0.5)
+    histogram.observe(('index',), 2.0)
+
+    lines = histogram.render()
+
+    assert 'latency_seconds_bucket{route="index",le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{route="index",le="1.0"} 2' in lines
+    assert 'latency_seconds_bucket{route="index",le="+Inf"} 3' in lines
+    assert 'latency_seconds_sum{route="index"} 2.55' in lines
+    assert 'latency_seconds_count{route="index"} 3' in lines
+
+
+def test_metrics_endpoint_reports_routes_and_spans(client, mock_iron_temple):
+    """
+    Test that the /metrics endpoint reports the latency, spans and status of the routes served.
+    """
+    client.post('/purchasePlaces', data={'club': 'Iron Temple', 'competition': 'Spring Festival', 'places': 1})
+    response = client.get('/metrics')
+    body = response.get_data(as_text=True)
+
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+    assert 'gudlft_request_duration_seconds_count{route="purchasePlaces",method="POST"} 1' in body
+    for name in ('lookup', 'validation', 'persistence', 'render'):
+        assert f'gudlft_request_span_seconds_count{{route="purchasePlaces",span="{name}"}} 1' in body
+    assert 'gudlft_responses_total{route="purchasePlaces",status="200"} 1' in body
+    assert 'gudlft_fragment_cache_misses_total' in body
+
+
+def test_sampled_requests_are_profiled(app, client, mock_iron_temple, mocker, tmp_path):
+    """
+    Test that a cProfile stats file is dumped for each sampled request.
+    """
+    profile_dir = tmp_path / 'profiles'
+    mocker.patch.dict(app.config, {'PROFILE_SAMPLE_RATE': 1.0, 'PROFILE_DIR': str(profile_dir)})
+
+    client.get('/')
+
+    assert [path.name.startswith('index-') for path in profile_dir.iterdir()] == [True]
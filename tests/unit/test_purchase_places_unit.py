@@ -39,6 +39,27 @@ def test_purchase_places_limitation(client, mock_simply_lift):
     assert response.status_code == 400, "Expected HTTP status code 400"
 
 
+def test_purchase_places_limitation_across_bookings(client, state, mock_data):
+    """
+    Test to ensure that the 12 places limit counts the places the club already booked in the competition.
+    """
+    mock_data([{'name': 'Simply Lift', 'email': 'john@simplylift.co', 'points': 24}],
+              [{'name': 'Fall Classic', 'numberOfPlaces': 30, 'date': '2099-12-31 10:00:00'}])
+
+    def purchase(places):
+        return client.post('/purchasePlaces', data={'club': 'Simply Lift', 'competition': 'Fall Classic', 'places': places})
+
+    assert purchase(8).status_code == 200
+
+    response = purchase(5)
+    assert 'Cannot book more than 12 places per competition' in response.get_data(as_text=True)
+    assert response.status_code == 400, "Expected HTTP status code 400"
+    assert state.registry.club_by_name('Simply Lift').points == 16
+
+    assert purchase(4).status_code == 200
+    assert state.registry.club_by_name('Simply Lift').booked_places('Fall Classic') == 12
+
+
 @pytest.mark.parametrize(
     "club_name, competition_name, requested_places, expected_status, expected_message",
     [
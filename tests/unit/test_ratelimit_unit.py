@@ -0,0 +1,123 @@
+import threading
+import time
+
+import pytest
+
+from gudlft.ratelimit import AdmissionControl, Overloaded, TokenBucketLimiter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_token_bucket_allows_burst_then_refills():
+    """
+    Test that a key can make `burst` requests at once, then one more per 1/rate seconds.
+    """
+    clock = FakeClock()
+    limiter = TokenBucketLimiter(rate=2, burst=3, clock=clock)
+
+    assert [limiter.acquire(['club']) for _ in range(3)] == [0, 0, 0]
+    assert limiter.acquire(['club']) == pytest.approx(0.5)
+    assert limiter.acquire(['other']) == 0
+
+    clock.now = 0.5
+    assert limiter.acquire(['club']) == 0
+    assert limiter.acquire(['club']) > 0
+
+
+def test_token_bucket_takes_tokens_only_when_every_key_has_one():
+    """
+    Test that a request refused by one of its keys leaves the buckets of its other keys untouched.
+    """
+    limiter = TokenBucketLimiter(rate=1, burst=1, clock=FakeClock())
+    assert limiter.acquire([('address', '10.0.0.1'), ('club', 'Iron Temple')]) == 0
+    assert limiter.acquire([('address', '10.0.0.2'), ('club', 'Iron Temple')]) > 0
+    assert limiter.acquire([('address', '10.0.0.2'), ('club', 'Simply Lift')]) == 0
+
+
+def test_token_bucket_memory_is_bounded():
+    """
+    Test that the least recently seen keys are evicted past `max_keys`.
+    """
+    limiter = TokenBucketLimiter(rate=1, burst=1, max_keys=100, clock=FakeClock())
+    for i in range(1000):
+        limiter.acquire([('address', i)])
+    assert len(limiter) == 100
+
+
+def test_admission_control_fails_fast_when_queue_is_full():
+    """
+    Test that requests beyond the running and waiting bounds are refused at once, and waiting ones time out.
+    """
+    admission = AdmissionControl(max_active=1, max_waiting=1, timeout=0.05)
+    release = threading.Event()
+
+    def run():
+        with admission.admit():
+            release.wait()
+
+    holder = threading.Thread(target=run)
+    holder.start()
+    while admission.active == 0:
+        time.sleep(0.001)
+
+    # The only slot is taken: the request waits for it, and gives up after the timeout
+    with pytest.raises(Overloaded):
+        with admission.admit():
+            pass
+
+    # While a request waits, the next one is refused at once
+    admission.timeout = 5
+    waiter = threading.Thread(target=run)
+    waiter.start()
+    while admission.waiting == 0:
+        time.sleep(0.001)
+    started = time.perf_counter()
+    with pytest.raises(Overloaded):
+        with admission.admit():
+            pass
+    assert time.perf_counter() - started < 1
+
+    release.set()
+    holder.join()
+    waiter.join()
+    assert (admission.active, admission.waiting) == (0, 0)
+
+
+def test_summary_rate_limited_per_email(client, state, mock_iron_temple, mocker):
+    """
+    Test that /showSummary answers 429 once an email used up its burst, and counts the refusal.
+    """
+    mocker.patch.object(state, 'rate_limiter', new=TokenBucketLimiter(rate=0.01, burst=2))
+
+    statuses = [client.post('/showSummary', data={'email': 'admin@irontemple.com'}).status_code for _ in range(2)]
+    # The email is counted whatever its case and surrounding spaces
+    refused = client.post('/showSummary', data={'email': ' Admin@IronTemple.com'})
+
+    assert statuses == [200, 200]
+    assert refused.status_code == 429
+    assert int(refused.headers['Retry-After']) >= 1
+    assert 'gudlft_rejected_requests_total{route="showSummary",reason="rate_limited"} 1' in client.get('/metrics').get_data(as_text=True)
+
+
+def test_bookings_refused_when_booking_queue_is_full(client, state, mock_iron_temple, mocker):
+    """
+    Test that bookings arriving while the booking queue is full are refused with 503.
+    """
+    mocker.patch.object(state, 'admission', new=AdmissionControl(max_active=0, max_waiting=0, timeout=0))
+
+    response = client.post('/purchasePlaces', data={'club': 'Iron Temple', 'competition': 'Spring Festival', 'places': 1})
+    api_response = client.post('/api/bookings', json={'bookings': [{'club': 'Iron Temple', 'competition': 'Spring Festival', 'places': 1}]})
+
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '1'
+    assert api_response.status_code == 503
+    assert api_response.get_json() == {'error': 'Too many bookings in progress, please try again later.'}
+    assert state.registry.club_by_name('Iron Temple').points == 4
+    metrics = client.get('/metrics').get_data(as_text=True)
+    assert 'gudlft_rejected_requests_total{route="purchasePlaces",reason="overloaded"} 1' in metrics
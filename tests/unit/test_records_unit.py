@@ -0,0 +1,56 @@
+from datetime import datetime
+
+import pytest
+
+from gudlft.records import Club, Competition, RecordList
+
+
+def test_records_round_trip_to_the_json_format():
+    """
+    Test that records give back the dictionaries they were built from, unknown fields included.
+    """
+    club = {'name': 'Simply Lift', 'email': 'john@simplylift.co', 'points': '13', 'city': 'Lyon'}
+    competition = {'name': 'Fall Classic', 'date': '2027-10-22 13:30:00', 'numberOfPlaces': '23'}
+
+    assert Club.from_dict(club).to_dict() == club
+    assert list(Club.from_dict(club).to_dict()) == list(club)
+    assert Competition.from_dict(competition).to_dict() == competition
+
+    booked = dict(club, bookings={'Fall Classic': 3})
+    assert Club.from_dict(booked).booked == {'Fall Classic': 3}
+    assert Club.from_dict(booked).extra == {'city': 'Lyon'}
+    assert Club.from_dict(booked).to_dict() == booked
+
+
+def test_records_are_typed_and_readable_by_json_key():
+    """
+    Test that numbers are stored as integers, the date is parsed, and fields can be read by their JSON key.
+    """
+    club = Club.from_dict({'name': 'Simply Lift', 'email': 'john@simplylift.co', 'points': '13', 'city': 'Lyon'})
+    competition = Competition.from_dict({'name': 'Fall Classic', 'date': '2027-10-22 13:30:00', 'numberOfPlaces': '23'})
+
+    assert club.points == 13
+    assert club['points'] == 13
+    assert club['city'] == 'Lyon'
+    assert club.get('country') is None
+    assert competition['numberOfPlaces'] == 23
+    assert competition.starts_at == datetime(2027, 10, 22, 13, 30)
+    with pytest.raises(KeyError):
+        competition['city']
+    with pytest.raises(AttributeError):
+        club.country = 'France'
+
+
+def test_record_list_replace_shares_unchanged_chunks():
+    """
+    Test that replacing records returns a new list sharing the chunks it did not change, and leaves the original as it was.
+    """
+    records = RecordList(range(2000))
+    replaced = records.replace({3: 'a', 1999: 'b'})
+
+    assert list(records) == list(range(2000))
+    assert replaced[3] == 'a' and replaced[-1] == 'b' and replaced[4] == 4
+    assert len(replaced) == 2000
+    assert replaced._chunks[1] is records._chunks[1]
+    assert list(reversed(replaced))[:2] == ['b', 1998]
+    assert replaced[2:5] == [2, 'a', 4]
@@ -0,0 +1,179 @@
+from datetime import datetime
+
+import pytest
+
+from gudlft.registry import EmailIndex, Registry
+
+
+def make_registry():
+    clubs = [
+        {'name': 'Simply Lift', 'email': 'john@simplylift.co', 'points': '13'},
+        {'name': 'Iron Temple', 'email': 'admin@irontemple.com', 'points': '4'}
+    ]
+    competitions = [
+        {'name': 'Historic Match', 'date': '2020-05-15 09:30:00', 'numberOfPlaces': '20'},
+        {'name': 'Fall Classic', 'date': '2027-10-22 13:30:00', 'numberOfPlaces': '23'}
+    ]
+    return Registry(clubs, competitions)
+
+
+def test_registry_lookups():
+    """
+    Test that clubs are found by email and name, competitions by name, and unknown keys return None.
+    """
+    registry = make_registry()
+    assert registry.club_by_email('john@simplylift.co')['name'] == 'Simply Lift'
+    assert registry.club_by_name('Iron Temple')['email'] == 'admin@irontemple.com'
+    assert registry.competition_by_name('Fall Classic')['numberOfPlaces'] == 23
+    assert registry.club_by_email('nonexistentemail@test.com') is None
+    assert registry.competition_by_name('Unknown Festival') is None
+
+
+def test_registry_finds_clubs_by_normalized_email():
+    """
+    Test that clubs are found by email whatever its case and surrounding spaces, in every later snapshot.
+    """
+    registry = make_registry()
+    emails = registry.snapshot().emails
+    assert registry.club_by_email('  John@SimplyLift.CO ')['name'] == 'Simply Lift'
+
+    registry.book(registry.club_by_name('Simply Lift'), registry.competition_by_name('Fall Classic'), 3)
+
+    assert registry.club_by_email('JOHN@simplylift.co')['points'] == 10
+    # The index is built once and shared by the snapshots following a booking
+    assert registry.snapshot().emails is emails
+
+
+def test_email_index_remembers_bounded_number_of_misses():
+    """
+    Test that unknown emails are remembered in an LRU of `max_misses` entries, and known ones never are.
+    """
+    registry = make_registry()
+    index = EmailIndex(registry.clubs, max_misses=10)
+    for i in range(100):
+        assert index.position(f'unknown{i}@test.com') is None
+    assert index.position('unknown99@test.com') is None
+    assert index.position('John@simplylift.co') == 0
+
+    assert len(index) == 10
+    assert (index.hits, index.misses) == (1, 100)
+
+
+def test_registry_competitions_sorted_by_date():
+    """
+    Test that competitions are ordered from the most recent to the oldest.
+    """
+    registry = make_registry()
+    assert [c['name'] for c in registry.competitions] == ['Fall Classic', 'Historic Match']
+
+
+def test_registry_book_keeps_indexes_consistent():
+    """
+    Test that a booking is visible through the indexes and the lists written back to disk.
+    """
+    registry = make_registry()
+    club = registry.club_by_name('Simply Lift')
+    competition = registry.competition_by_name('Fall Classic')
+
+    registry.book(club, competition, 3)
+
+    assert registry.club_by_email('john@simplylift.co')['points'] == 10
+    assert registry.competition_by_name('Fall Classic')['numberOfPlaces'] == 20
+    assert registry.clubs[0].points == 10
+
+
+def test_registry_processed_competitions_flags_past_competitions():
+    """
+    Test that competitions before the given time are flagged as past, and the others as upcoming.
+    """
+    registry = make_registry()
+    processed = registry.processed_competitions(now=datetime(2024, 1, 1))
+    assert [(c['name'], c['is_past']) for c in processed] == [('Fall Classic', False), ('Historic Match', True)]
+
+    processed = registry.processed_competitions(now=datetime(2028, 1, 1))
+    assert [c['is_past'] for c in processed] == [True, True]
+
+
+def test_registry_processed_competitions_rebuilt_only_on_change():
+    """
+    Test that the processed view is reused until a booking changes the data.
+    """
+    registry = make_registry()
+    now = datetime(2024, 1, 1)
+    first = registry.processed_competitions(now=now)
+    assert registry.processed_competitions(now=now) is first
+
+    registry.book(registry.club_by_name('Simply Lift'), registry.competition_by_name('Fall Classic'), 1)
+    updated = registry.processed_competitions(now=now)
+    assert updated is not first
+    assert updated[0]['numberOfPlaces'] == 22
+
+
+def test_registry_snapshot_unchanged_by_booking():
+    """
+    Test that a snapshot taken before a booking keeps the balances it was taken with.
+    """
+    registry = make_registry()
+    snapshot = registry.snapshot()
+    club = snapshot.club_by_name('Simply Lift')
+
+    booked_club, booked_competition = registry.book(club, snapshot.competition_by_name('Fall Classic'), 3)
+
+    assert club.points == 13
+    assert snapshot.club_by_name('Simply Lift').points == 13
+    assert snapshot.competition_by_name('Fall Classic').places == 23
+    assert booked_club.points == 10 and booked_competition.places == 20
+    assert registry.snapshot().club_by_name('Simply Lift') is booked_club
+    assert registry.snapshot().version == snapshot.version + 1
+
+
+def test_registry_update_published_only_when_complete():
+    """
+    Test that an update interrupted by an error publishes none of its bookings.
+    """
+    registry = make_registry()
+    snapshot = registry.snapshot()
+
+    with pytest.raises(ValueError):
+        with registry.update() as update:
+            update.book(registry.club_by_name('Simply Lift'), registry.competition_by_name('Fall Classic'), 3)
+            raise ValueError('refused')
+
+    assert registry.snapshot() is snapshot
+    assert registry.club_by_name('Simply Lift').points == 13
+
+
+def test_registry_ledger_indexed_by_club_and_competition():
+    """
+    Test that bookings add up in the ledger, which is readable per club and per competition.
+    """
+    registry = make_registry()
+    fall_classic = registry.competition_by_name('Fall Classic')
+    registry.book(registry.club_by_name('Simply Lift'), fall_classic, 2)
+    registry.book(registry.club_by_name('Simply Lift'), fall_classic, 3)
+    registry.book(registry.club_by_name('Iron Temple'), fall_classic, 1)
+
+    snapshot = registry.snapshot()
+    assert snapshot.club_bookings('Simply Lift') == {'Fall Classic': 5}
+    assert snapshot.competition_bookings('Fall Classic') == {'Simply Lift': 5, 'Iron Temple': 1}
+    assert snapshot.competition_bookings('Historic Match') == {}
+
+    # Rebuilt from the clubs, as after a restart
+    reloaded = Registry(registry.clubs, registry.competitions).snapshot()
+    assert reloaded.competition_bookings('Fall Classic') == {'Simply Lift': 5, 'Iron Temple': 1}
+
+
+def test_registry_competition_page_processes_only_its_competitions():
+    """
+    Test that a page flags its competitions as past or upcoming without processing the whole list.
+    """
+    snapshot = make_registry().snapshot()
+
+    page, next_cursor = snapshot.competition_page(size=1, now=datetime(2024, 1, 1))
+    assert [(c['name'], c['is_past']) for c in page] == [('Fall Classic', False)]
+    assert next_cursor == 'Fall Classic'
+
+    page, next_cursor = snapshot.competition_page('Fall Classic', size=1, now=datetime(2024, 1, 1))
+    assert [(c['name'], c['is_past']) for c in page] == [('Historic Match', True)]
+    assert next_cursor is None
+    assert snapshot._processed is None
@@ -1,3 +1,4 @@
+import pytest
 from flask import url_for
 
 
@@ -21,3 +22,72 @@ def test_show_summary_invalid_email(client, mock_simply_lift):
     response = client.post('/showSummary', data={'email': 'nonexistentemail@test.com'})
     assert response.status_code == 400
     assert "Sorry, that email was not found." in response.get_data(as_text=True), "Expected error message not found"
+
+
+def test_show_summary_email_case_insensitive(client, mock_simply_lift):
+    """
+    Test that a club logs in with its email whatever its case and surrounding spaces.
+    """
+    response = client.post('/showSummary', data={'email': ' John@SimplyLift.co '})
+    assert response.status_code == 200
+    assert 'Welcome, john@simplylift.co' in response.get_data(as_text=True)
+
+
+def test_show_summary_invalid_email_leaves_out_points_table(client, mock_iron_temple):
+    """
+    Test that a failed login answers without rendering the club points table, and counts the unknown email.
+    """
+    for _ in range(2):
+        response = client.post('/showSummary', data={'email': 'nonexistentemail@test.com'})
+        page = response.get_data(as_text=True)
+        assert response.status_code == 400
+        assert 'Club Points Overview' not in page
+        assert 'Iron Temple' not in page
+        assert 'See the club points table' in page
+
+    metrics = client.get('/metrics').get_data(as_text=True)
+    assert 'gudlft_unknown_email_cache_misses_total 1' in metrics
+    assert 'gudlft_unknown_email_cache_hits_total 1' in metrics
+
+
+@pytest.fixture
+def mock_many_competitions(mock_data):
+    """Prepare and inject mocked club (Simply Lift) and five competitions, two of them in the past."""
+    competitions = [
+        {'name': f'Competition {year}', 'numberOfPlaces': '10', 'date': f'{year}-06-01 10:00:00'}
+        for year in (2018, 2019, 2097, 2098, 2099)
+    ]
+    mock_data([{'name': 'Simply Lift', 'email': 'john@simplylift.co', 'points': '13'}], competitions)
+
+
+def test_show_summary_paginates_competitions(app, client, mock_many_competitions, mocker):
+    """
+    Test that the summary lists upcoming competitions first and loads the older ones page by page.
+    """
+    mocker.patch.dict(app.config, {'COMPETITIONS_PAGE_SIZE': 2})
+
+    page = client.post('/showSummary', data={'email': 'john@simplylift.co'}).get_data(as_text=True)
+    assert 'Competition 2099' in page and 'Competition 2098' in page
+    assert 'Competition 2097' not in page
+    assert '/competitions/Simply%20Lift?cursor=Competition+2098' in page
+
+    page = client.get('/competitions/Simply Lift?cursor=Competition 2098').get_data(as_text=True)
+    assert 'Competition 2097' in page and 'Competition 2019' in page
+    assert 'Competition 2098' not in page
+
+    page = client.get('/competitions/Simply Lift?cursor=Competition 2019').get_data(as_text=True)
+    assert 'Competition 2018' in page
+    assert 'Show older competitions' not in page
+
+
+def test_show_summary_streamed(app, client, mock_many_competitions, mocker):
+    """
+    Test that the summary page is streamed when streaming is enabled.
+    """
+    mocker.patch.dict(app.config, {'STREAM_COMPETITIONS': True})
+
+    response = client.post('/showSummary', data={'email': 'john@simplylift.co'})
+    assert response.is_streamed
+    page = response.get_data(as_text=True)
+    assert 'Welcome, john@simplylift.co' in page
+    assert all(f'Competition {year}' in page for year in (2018, 2019, 2097, 2098, 2099))
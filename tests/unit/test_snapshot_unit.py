@@ -0,0 +1,104 @@
+import json
+import os
+
+import pytest
+
+from gudlft.records import Club, Competition
+from gudlft.snapshot import read_pair, recover_pair, write_pair
+
+CLUBS = [{'name': 'Simply Lift', 'email': 'john@simplylift.co', 'points': '13'}]
+COMPETITIONS = [{'name': 'Fall Classic', 'date': '2027-10-22 13:30:00', 'numberOfPlaces': '23'}]
+
+
+@pytest.fixture
+def paths(dataset):
+    """Paths of a clubs/competitions snapshot of generation 1."""
+    config = dataset(CLUBS, COMPETITIONS, generation=1)
+    return config['CLUBS_DATA_PATH'], config['COMPETITIONS_DATA_PATH']
+
+
+def test_write_pair_replaces_both_files(paths):
+    """
+    Test that a snapshot is read back with its generation, leaving no pending file behind.
+    """
+    clubs_path, competitions_path = paths
+    write_pair(clubs_path, competitions_path, [dict(CLUBS[0], points='10')], COMPETITIONS, 2)
+
+    clubs, competitions, generation = read_pair(clubs_path, competitions_path)
+
+    assert clubs[0]['points'] == '10'
+    assert competitions == COMPETITIONS
+    assert generation == 2
+    assert sorted(os.listdir(os.path.dirname(clubs_path))) == ['clubs.json', 'competitions.json']
+
+
+def test_read_pair_builds_records_as_it_reads(paths, mocker):
+    """
+    Test that with record types, the files are read as records one item at a time, never as whole lists of dictionaries.
+    """
+    load_records = mocker.patch('gudlft.snapshot.load_records')
+
+    clubs, competitions, generation = read_pair(*paths, types=(Club, Competition))
+
+    assert isinstance(clubs[0], Club) and clubs[0].points == 13
+    assert isinstance(competitions[0], Competition) and competitions[0].places == 23
+    assert generation == 1
+    load_records.assert_not_called()
+
+
+def test_read_pair_refuses_files_of_different_snapshots(paths):
+    """
+    Test that clubs and competitions files of different generations are not read as a snapshot.
+    """
+    clubs_path, competitions_path = paths
+    with open(competitions_path, 'w') as f:
+        json.dump({'competitions': COMPETITIONS, 'generation': 2}, f)
+
+    with pytest.raises(ValueError):
+        read_pair(clubs_path, competitions_path, retries=0)
+
+
+def test_read_pair_reads_a_file_edited_outside_of_the_app(paths, caplog):
+    """
+    Test that a file without a generation, as written by an operator, is read with the other file and a warning.
+    """
+    clubs_path, competitions_path = paths
+    edited = COMPETITIONS + [{'name': 'Spring Festival', 'date': '2099-03-27 10:00:00', 'numberOfPlaces': '25'}]
+    with open(competitions_path, 'w') as f:
+        json.dump({'competitions': edited}, f)
+
+    clubs, competitions, generation = read_pair(clubs_path, competitions_path, retries=0)
+
+    assert (clubs, competitions, generation) == (CLUBS, edited, 1)
+    assert 'edited outside of the app' in caplog.text
+
+
+def test_recover_completes_an_interrupted_write(paths):
+    """
+    Test that a crash after the competitions file was replaced is completed from the pending clubs file.
+    """
+    clubs_path, competitions_path = paths
+    with open(competitions_path, 'w') as f:
+        json.dump({'competitions': COMPETITIONS, 'generation': 2}, f)
+    with open(clubs_path + '.pending', 'w') as f:
+        json.dump({'clubs': [dict(CLUBS[0], points='10')], 'generation': 2}, f)
+
+    recover_pair(clubs_path, competitions_path)
+    clubs, _, generation = read_pair(clubs_path, competitions_path, retries=0)
+
+    assert clubs[0]['points'] == '10'
+    assert generation == 2
+
+
+def test_recover_discards_a_write_that_replaced_nothing(paths):
+    """
+    Test that a crash while the new files were being written keeps the previous snapshot.
+    """
+    clubs_path, competitions_path = paths
+    with open(clubs_path + '.pending', 'w') as f:
+        f.write('{"clubs": [{"name": "Simply')
+
+    recover_pair(clubs_path, competitions_path)
+
+    assert read_pair(clubs_path, competitions_path, retries=0) == (CLUBS, COMPETITIONS, 1)
+    assert not os.path.exists(clubs_path + '.pending')
@@ -0,0 +1,81 @@
+import pytest
+
+from gudlft.booking import BookingEngine, BookingError
+from gudlft.registry import Registry
+from gudlft.storage import JSONStorage, SQLiteStorage
+
+
+@pytest.fixture
+def config(dataset):
+    """Configuration pointing at the default dataset and a database in a temporary directory."""
+    return dataset()
+
+
+def start_worker(config):
+    """Open the database and build a registry and booking engine, as a worker process does at startup."""
+    storage = SQLiteStorage(config['SQLITE_PATH'], config)
+    registry = Registry(*storage.load())
+    return storage, registry, BookingEngine(registry, storage)
+
+
+def test_sqlite_storage_imports_json_files(config):
+    """
+    Test that an empty database is filled from the JSON files.
+    """
+    storage, registry, _ = start_worker(config)
+    assert registry.club_by_email('john@simplylift.co').points == 13
+    assert [comp.to_dict() for comp in storage.load_competitions()] == [{'name': 'Fall Classic', 'date': '2099-10-22 13:30:00', 'numberOfPlaces': '23'}]
+
+
+def test_sqlite_storage_shares_bookings_between_workers(config):
+    """
+    Test that a booking made by one worker is checked against and visible to another worker sharing the database.
+    """
+    storage_a, registry_a, engine_a = start_worker(config)
+    storage_b, registry_b, engine_b = start_worker(config)
+
+    engine_a.book(registry_a.club_by_name('Simply Lift'), registry_a.competition_by_name('Fall Classic'), 10)
+
+    # Worker B still has the old balance and ledger in memory, but the booking is checked against the database
+    with pytest.raises(BookingError, match='Cannot book more than 12 places per competition'):
+        engine_b.book(registry_b.club_by_name('Simply Lift'), registry_b.competition_by_name('Fall Classic'), 5)
+
+    storage_b.refresh(registry_b)
+    assert registry_b.club_by_name('Simply Lift').points == 3
+    assert registry_b.club_by_name('Simply Lift').booked_places('Fall Classic') == 10
+    # A worker started later reads the ledger from the database
+    assert start_worker(config)[1].club_by_name('Simply Lift').booked_places('Fall Classic') == 10
+    assert registry_b.competition_by_name('Fall Classic').places == 13
+
+
+def test_sqlite_storage_exports_to_json(config, tmp_path):
+    """
+    Test that the database content can be written back to the JSON format.
+    """
+    storage, registry, engine = start_worker(config)
+    engine.book(registry.club_by_name('Simply Lift'), registry.competition_by_name('Fall Classic'), 2)
+
+    export_config = dict(config, CLUBS_DATA_PATH=str(tmp_path / 'export_clubs.json'),
+                         COMPETITIONS_DATA_PATH=str(tmp_path / 'export_competitions.json'))
+    JSONStorage(export_config).save(storage.load_clubs(), storage.load_competitions())
+
+    exported = JSONStorage(export_config)
+    assert exported.load_clubs()[0]['points'] == '11'
+    assert exported.load_clubs()[0]['bookings'] == {'Fall Classic': 2}
+    assert exported.load_competitions()[0]['numberOfPlaces'] == '21'
+
+
+def test_sqlite_storage_refused_batch_is_rolled_back(config):
+    """
+    Test that a batch refused by the booking rules leaves the database untouched.
+    """
+    storage, registry, engine = start_worker(config)
+    club = registry.club_by_name('Simply Lift')
+    competition = registry.competition_by_name('Fall Classic')
+
+    with pytest.raises(BookingError) as error:
+        engine.book_many([(club, competition, 10), (club, competition, 10)])
+
+    assert error.value.position == 1
+    assert storage.load_clubs()[0].points == 13
+    assert registry.club_by_name('Simply Lift').points == 13
@@ -0,0 +1,30 @@
+from flask import Flask
+
+from gudlft.templating import precompile_templates
+
+
+def test_precompile_templates_fills_bytecode_cache(tmp_path):
+    """
+    Test that every template is compiled at startup into the bytecode cache, and no longer checked for changes.
+    """
+    app = Flask('server', root_path='.')
+    cache_dir = tmp_path / 'jinja'
+
+    names = precompile_templates(app, str(cache_dir))
+
+    assert {'base.html', 'index.html', 'welcome.html', 'booking.html'} <= set(names)
+    assert app.jinja_env.auto_reload is False
+    assert len(list(cache_dir.glob('__jinja2_*.cache'))) == len(names)
+
+
+def test_precompiled_templates_loaded_from_cache(tmp_path, mocker):
+    """
+    Test that a worker started with a filled cache loads the compiled code instead of compiling the templates.
+    """
+    cache_dir = str(tmp_path / 'jinja')
+    precompile_templates(Flask('server', root_path='.'), cache_dir)
+
+    app = Flask('server', root_path='.')
+    compile_ = mocker.spy(app.jinja_env, 'compile')
+    precompile_templates(app, cache_dir)
+    assert compile_.call_count == 0